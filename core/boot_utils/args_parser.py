@@ -12,5 +12,11 @@ def setup_start_parser():
                         action="store_false", dest="rss_features")
     parser.add_argument("--count-open-files", help="Count the number of files currently opened by the process",
                         action="store_true", dest="count_open_files")
+    parser.add_argument("--warm-config-cache", help="Load the config of every server in cache when the bot starts",
+                        action="store_true", dest="warm_config_cache")
+    parser.add_argument("--seed-users-cache", help="Save every visible member in the users cache when the bot starts",
+                        action="store_true", dest="seed_users_cache")
+    parser.add_argument("--max-messages-per-guild", type=int, help="Maximum number of cached messages per server",
+                        dest="max_messages_per_guild")
 
     return parser
@@ -10,8 +10,10 @@ from aiohttp import ClientSession
 from discord.ext import commands
 
 from core.boot_utils.conf_loader import get_secrets_dict
+from core.caching.message_cache import IndexedConnectionState
 from core.database import DatabaseConnectionManager, DatabaseQueryHandler
 from core.emojis_manager import EmojisManager
+from core.render_pool import RenderPool
 from core.tasks_handler import TaskHandler
 from core.tips import TipsManager
 
@@ -51,7 +53,7 @@ class Axobot(commands.bot.AutoShardedBot):
     """Bot class, with everything needed to run it"""
 
     def __init__(self, case_insensitive: bool = False, status: discord.Status | None = None, database_online: bool = True, \
-            beta: bool = False, zombie_mode: bool = False):
+            beta: bool = False, zombie_mode: bool = False, max_messages_per_guild: int | None = None):
         # pylint: disable=assigning-non-slot
         # defining allowed default mentions
         allowed_mentions = discord.AllowedMentions(everyone=False, roles=False)
@@ -62,7 +64,8 @@ class Axobot(commands.bot.AutoShardedBot):
         intents.integrations = False
         # we now initialize the bot class
         super().__init__(command_prefix=get_prefix, case_insensitive=case_insensitive, max_messages=100_000,
-                         status=status, allowed_mentions=allowed_mentions, intents=intents, enable_debug_events=True)
+                         max_messages_per_guild=max_messages_per_guild, status=status,
+                         allowed_mentions=allowed_mentions, intents=intents, enable_debug_events=True)
         self.database_online = database_online  # if the mysql database works
         self.beta = beta # if the bot is in beta mode
         self.entity_id: int = 0 # ID of the bot for the statistics database
@@ -75,11 +78,14 @@ class Axobot(commands.bot.AutoShardedBot):
         self.rss_enabled: bool = True # if rss is enabled
         self.stats_enabled: bool = True # if the stats system is enabled (for grafana mainly)
         self.files_count_enabled: bool = False # if the files count stats system is enabled
+        self.config_warmup_enabled: bool = False # if every server config should be loaded when the bot starts
+        self.users_cache_seeding_enabled: bool = False # if every visible member should be cached when the bot starts
         self.internal_loop_enabled: bool = True # if internal loop is enabled
         self.zws = "\u200B"  # here's a zero width space
         self.secrets = get_secrets_dict() # other misc credentials
         self.zombie_mode: bool = zombie_mode # if we should listen without sending any message
         self.task_handler = TaskHandler(self)
+        self.render_pool = RenderPool()
         self.emojis_manager = EmojisManager(self)
         self.tips_manager = TipsManager(self)
         self._options_list: dict[str, "AllRepresentation"] | None = None
@@ -88,6 +94,16 @@ class Axobot(commands.bot.AutoShardedBot):
         self.tree.on_error = self.on_app_cmd_error
         self.app_commands_list: Optional[list[discord.app_commands.AppCommand]] = None
 
+    def _get_state(self, **options: Any):
+        "Use a connection state with an indexed messages cache"
+        return IndexedConnectionState(
+            dispatch=self.dispatch,
+            handlers=self._handlers,
+            hooks=self._hooks,
+            http=self.http,
+            **options,
+        )
+
     async def on_error(self, event_method: Exception | str, *_args, **_kwargs): # type: ignore
         "Called when an event raises an uncaught exception"
         if isinstance(event_method, str) and event_method.startswith("on_") and event_method != "on_error":
@@ -241,16 +257,16 @@ class Axobot(commands.bot.AutoShardedBot):
         "Reload a module"
         await self.reload_extension(f"modules.{module_name}.{module_name}")
 
-    @property
-    def cnx_axobot(self):
-        """Connection to the default database
-        Used for almost everything"""
-        return self.db.get_connection("axobot")
-
     def close_database_cnx(self):
         "Close any opened database connection"
         self.db.disconnect_all()
 
+    async def close(self):
+        "Close the bot connection to Discord, then stop the database and image rendering workers"
+        await super().close()
+        self.db.shutdown()
+        self.render_pool.shutdown()
+
     async def get_config(self, guild_id: discord.Guild | int, option: str):
         """Get a configuration option for a specific guild
         Fallbacks to the default values if the guild is not found"""
@@ -332,16 +348,14 @@ class Axobot(commands.bot.AutoShardedBot):
 
     async def get_message_from_cache(self, message_id: int) -> discord.Message | None:
         "Get a message from the cache"
-        for msg in self.cached_messages:
-            if msg.id == message_id:
-                return msg
-        return None
+        # pylint: disable=protected-access
+        return self._connection._get_message(message_id) # pyright: ignore[reportPrivateUsage]
 
     async def add_message_to_cache(self, message: discord.Message):
         "Force add a message to the cache"
-        if await self.get_message_from_cache(message.id) is None:
-            # pylint: disable=protected-access
-            self._connection._messages.append(message) # pyright: ignore[reportPrivateUsage, reportOptionalMemberAccess]
+        # pylint: disable=protected-access
+        if (messages := self._connection._messages) is not None and message not in messages: # pyright: ignore
+            messages.append(message)
 
     @property
     def display_avatar(self) -> discord.Asset | None:
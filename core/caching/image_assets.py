@@ -0,0 +1,99 @@
+import os
+from io import BytesIO
+from typing import Callable, Hashable
+
+from PIL import Image, ImageFont
+
+ImageKey = tuple[str, tuple[int, int] | None, str | None, Image.Resampling | None]
+
+
+class ImageAssetsRegistry:
+    """Decoded images and parsed fonts, loaded once and shared by every image generator of the current process
+
+    Cached images are shared: they may be pasted or used as masks, but must be copied before being edited.
+    Render jobs run in worker processes, so each worker has its own registry, filled by the render pool initializers
+    or lazily on first use."""
+
+    def __init__(self):
+        self._images: dict[ImageKey, Image.Image] = {}
+        self._generated_images: dict[Hashable, Image.Image] = {}
+        self._font_files: dict[str, bytes] = {}
+        self._fonts: dict[tuple[str, int], ImageFont.FreeTypeFont] = {}
+
+    def get_image(self, path: str, size: tuple[int, int] | None = None, mode: str | None = None,
+                  resample: Image.Resampling | None = None) -> Image.Image:
+        "Get an image file, decoded, converted to the given mode and resized to the given size"
+        key = (path, size, mode, resample)
+        if (image := self._images.get(key)) is None:
+            with Image.open(path) as file:
+                image = file.convert(mode) if mode is not None else file.copy()
+            if size is not None and image.size != size:
+                image = image.resize(size) if resample is None else image.resize(size, resample=resample)
+            self._images[key] = image
+        return image
+
+    def get_generated_image(self, key: Hashable, factory: Callable[[], Image.Image]) -> Image.Image:
+        "Get a static image built by code (like a mask or a gradient), generating it on first use"
+        if (image := self._generated_images.get(key)) is None:
+            image = self._generated_images[key] = factory()
+        return image
+
+    def get_font(self, path: str, size: int) -> ImageFont.FreeTypeFont:
+        "Get a font at a given size, raising ValueError if the font file doesn't exist"
+        if (font := self._fonts.get((path, size))) is None:
+            if (font_file := self._font_files.get(path)) is None:
+                try:
+                    with open(path, "rb") as file:
+                        font_file = self._font_files[path] = file.read()
+                except OSError:
+                    raise ValueError(f"Font {path} not found") from None
+            font = self._fonts[(path, size)] = ImageFont.truetype(BytesIO(font_file), size)
+        return font
+
+    def fit_font(self, path: str, max_size: int, min_size: int, box_size: tuple[int, int],
+                 measure: Callable[[ImageFont.FreeTypeFont], tuple[int, int]]) -> ImageFont.FreeTypeFont:
+        """Find the biggest font size between min_size and max_size for which the measured text fits in the box
+        The font at min_size is returned if no size fits.
+
+        Text size grows almost linearly with the font size, so the search starts from a proportional estimate, then
+        finds the exact size with a binary search around it, usually in 2 or 3 measurements."""
+        def fits(size: int):
+            width, height = measure(self.get_font(path, size))
+            return width <= box_size[0] and height <= box_size[1]
+
+        width, height = measure(self.get_font(path, max_size))
+        if (width <= box_size[0] and height <= box_size[1]) or max_size <= min_size:
+            return self.get_font(path, max_size)
+        ratio = min(box_size[0] / max(width, 1), box_size[1] / max(height, 1))
+        estimate = min(max(int(max_size * ratio), min_size), max_size - 1)
+        # find a range [low, high] where low fits (or is min_size) and high doesn't fit
+        step = 1
+        if fits(estimate):
+            low, high = estimate, estimate + step
+            while high < max_size and fits(high):
+                low, step = high, step * 2
+                high = min(low + step, max_size)
+        else:
+            low, high = estimate - step, estimate
+            while low > min_size and not fits(low):
+                high, step = low, step * 2
+                low = max(high - step, min_size)
+            low = max(low, min_size)
+        # binary search of the biggest size that fits, between low (included) and high (excluded)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if fits(middle):
+                low = middle
+            else:
+                high = middle
+        return self.get_font(path, low)
+
+    def preload_images(self, paths: list[str], size: tuple[int, int] | None = None, mode: str | None = None,
+                       resample: Image.Resampling | None = None):
+        "Load several image files at once, ignoring the missing ones"
+        for path in paths:
+            if os.path.isfile(path):
+                self.get_image(path, size, mode, resample)
+
+
+image_assets = ImageAssetsRegistry()
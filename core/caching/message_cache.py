@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Any, Iterable
+
+import discord
+from discord.state import AutoShardedConnectionState
+
+
+class IndexedMessageCache:
+    """Replacement for the messages deque of discord.py, indexed by message ID
+
+    Messages are kept in insertion order, so that the oldest one is evicted first when the cache is full.
+    An optional cap per guild evicts the oldest messages of a guild first, so that one very active guild can't
+    evict the history of every other one."""
+
+    def __init__(self, messages: Iterable[discord.Message] = (), *, maxlen: int,
+                 max_per_guild: int | None = None):
+        self.maxlen = maxlen
+        self.max_per_guild = max_per_guild
+        self._messages: OrderedDict[int, discord.Message] = OrderedDict()
+        # message IDs of each guild, oldest first, only used when the per-guild cap is enabled
+        self._guilds_messages: dict[int, OrderedDict[int, None]] = {}
+        for message in messages:
+            self.append(message)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages.values())
+
+    def __reversed__(self):
+        return reversed(self._messages.values())
+
+    def __contains__(self, message: Any):
+        return getattr(message, "id", None) in self._messages
+
+    def __repr__(self):
+        return f"<IndexedMessageCache size={len(self)} maxlen={self.maxlen} max_per_guild={self.max_per_guild}>"
+
+    def get(self, message_id: int) -> discord.Message | None:
+        "Get a cached message from its ID"
+        return self._messages.get(message_id)
+
+    def append(self, message: discord.Message):
+        "Add a message as the most recent one, evicting the oldest messages if needed"
+        if message.id in self._messages:
+            self.remove(self._messages[message.id])
+        self._messages[message.id] = message
+        if self.max_per_guild is not None and message.guild is not None:
+            guild_messages = self._guilds_messages.setdefault(message.guild.id, OrderedDict())
+            guild_messages[message.id] = None
+            if len(guild_messages) > self.max_per_guild:
+                oldest_id, _ = guild_messages.popitem(last=False)
+                del self._messages[oldest_id]
+        while len(self._messages) > self.maxlen:
+            _, oldest = self._messages.popitem(last=False)
+            self._forget_guild_message(oldest)
+
+    def remove(self, message: discord.Message):
+        "Remove a message from the cache, raising ValueError if it is not cached"
+        if self._messages.pop(message.id, None) is None:
+            raise ValueError("message not in cache")
+        self._forget_guild_message(message)
+
+    def clear(self):
+        "Remove every message"
+        self._messages.clear()
+        self._guilds_messages.clear()
+
+    def _forget_guild_message(self, message: discord.Message):
+        if self.max_per_guild is None or message.guild is None:
+            return
+        if (guild_messages := self._guilds_messages.get(message.guild.id)) is None:
+            return
+        guild_messages.pop(message.id, None)
+        if not guild_messages:
+            del self._guilds_messages[message.guild.id]
+
+
+class IndexedConnectionState(AutoShardedConnectionState):
+    """Connection state storing its messages in an IndexedMessageCache
+
+    discord.py replaces its messages deque when clearing the state or when a guild becomes unavailable, so every
+    assigned collection is converted back into an indexed cache."""
+
+    def __init__(self, *args: Any, max_messages_per_guild: int | None = None, **kwargs: Any):
+        self.max_messages_per_guild = max_messages_per_guild
+        super().__init__(*args, **kwargs)
+
+    @property
+    def _messages(self) -> IndexedMessageCache | None: # type: ignore[override]
+        return self._indexed_messages
+
+    @_messages.setter
+    def _messages(self, messages: Iterable[discord.Message] | None):
+        if messages is None or isinstance(messages, IndexedMessageCache):
+            self._indexed_messages = messages
+        else:
+            self._indexed_messages = IndexedMessageCache(
+                messages, maxlen=self.max_messages or 1000, max_per_guild=self.max_messages_per_guild
+            )
+
+    def _get_message(self, msg_id: int | None) -> discord.Message | None:
+        if self._indexed_messages is None or msg_id is None:
+            return None
+        return self._indexed_messages.get(msg_id)
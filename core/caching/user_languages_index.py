@@ -0,0 +1,91 @@
+from collections import Counter
+from typing import Iterable
+
+from cachetools import LRUCache
+
+
+class UserLanguagesIndex:
+    """Number of mutual guilds using each language, for recently seen users
+
+    The index is filled on demand, then kept up to date when members join or leave a guild and when a guild changes
+    its language, so that the languages of a known user are returned without looking at their guilds again."""
+
+    def __init__(self, max_users: int):
+        # configured language of every known guild
+        self.guild_languages: dict[int, str] = {}
+        self._users: LRUCache[int, Counter[str]] = LRUCache(maxsize=max_users)
+        # lookups answered by the index or needing to scan mutual guilds, reset by BotStats
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, user_id: int):
+        return user_id in self._users
+
+    def get(self, user_id: int) -> Counter[str] | None:
+        "Get the number of mutual guilds per language of a user, if they are indexed"
+        if (languages := self._users.get(user_id)) is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return languages
+
+    def set(self, user_id: int, guild_ids: Iterable[int]):
+        "Index a user from the list of their mutual guilds, whose language should be known"
+        languages: Counter[str] = Counter()
+        complete = True
+        for guild_id in guild_ids:
+            if (language := self.guild_languages.get(guild_id)) is None:
+                complete = False
+            else:
+                languages[language] += 1
+        # a guild may have been forgotten in the meantime, in which case we will try again later
+        if complete:
+            self._users[user_id] = languages
+        return languages
+
+    def add_member(self, user_id: int, guild_id: int):
+        "Count a new mutual guild for a user"
+        if (languages := self._users.get(user_id)) is None:
+            return
+        if (language := self.guild_languages.get(guild_id)) is None:
+            # we can't know the new count, so it will be computed again on next access
+            del self._users[user_id]
+            return
+        languages[language] += 1
+
+    def remove_member(self, user_id: int, guild_id: int):
+        "Stop counting a guild the user left"
+        if (languages := self._users.get(user_id)) is None:
+            return
+        if (language := self.guild_languages.get(guild_id)) is None:
+            del self._users[user_id]
+            return
+        languages[language] -= 1
+        if languages[language] <= 0:
+            del languages[language]
+
+    def set_guild_language(self, guild_id: int, language: str, member_ids: Iterable[int]):
+        "Update the language of a guild, and the counts of its indexed members"
+        previous_language = self.guild_languages.get(guild_id)
+        self.guild_languages[guild_id] = language
+        if previous_language == language:
+            return
+        for member_id in member_ids:
+            if (languages := self._users.get(member_id)) is None:
+                continue
+            if previous_language is None:
+                del self._users[member_id]
+                continue
+            languages[previous_language] -= 1
+            if languages[previous_language] <= 0:
+                del languages[previous_language]
+            languages[language] += 1
+
+    def forget_guild(self, guild_id: int, member_ids: Iterable[int]):
+        "Forget about the language of a guild and about its indexed members, when the bot joins or leaves it"
+        self.guild_languages.pop(guild_id, None)
+        for member_id in member_ids:
+            self._users.pop(member_id, None)
@@ -4,6 +4,7 @@ from .blurple import convert_image as convert_blurple
 from .halloween import HalloweenVariationFlagType
 from .halloween import check_image as check_halloween
 from .halloween import convert_image as convert_halloween
+from .mask_worker import background_mask_worker
 from .utils import (ColorVariationType, LinkConverter,
                     TargetConverterType, get_url_from_ctx)
 
@@ -18,4 +19,5 @@ __all__ = [
     "check_blurple",
     "convert_halloween",
     "check_halloween",
+    "background_mask_worker",
 ]
@@ -1,7 +1,8 @@
 from typing import TYPE_CHECKING
 
 from PIL import Image, ImageDraw, ImageFilter
-from rembg import new_session, remove
+
+from .mask_worker import background_mask_worker
 
 if TYPE_CHECKING:
     from core.colors_events.utils import ColorType
@@ -9,14 +10,9 @@ if TYPE_CHECKING:
 
 async def get_background_mask(image: Image.Image) -> Image.Image:
     "Detect the image background and return the corresponding mask"
-    return remove(
-        image,
-        session=new_session("u2netp"),
-        alpha_matting=True,
-        only_mask=True
-    )
+    return await background_mask_worker.get_mask(image)
 
-async def apply_gradient(image: Image.Image, mask: Image.Image, inner_color: "ColorType", outer_color: "ColorType"):
+def apply_gradient(image: Image.Image, mask: Image.Image, inner_color: "ColorType", outer_color: "ColorType"):
     "Apply a gradient to the image background"
     inner_color_hex = "#%02x%02x%02x" % inner_color
     outer_color_hex = "#%02x%02x%02x" % outer_color
@@ -0,0 +1,189 @@
+"""Compare the per-pixel and the vectorized implementations of the color events image operations
+
+Run it from the bot root directory with `python -m core.colors_events.benchmark`
+The per-pixel implementations below are the previous ones, kept as a reference to check that outputs are identical."""
+import argparse
+import math
+import time
+from typing import Any, Callable
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from . import utils
+from .blurple import MODIFIERS
+
+BASE_VARIATION = (.15, .3, .7, .85)
+
+
+def legacy_edge_antialiasing(img: Image.Image):
+    "Sobel gradient length, computed pixel by pixel"
+    new_img = Image.new("RGB", img.size, "black")
+    kernel_x = ((-1, 0, 1), (-2, 0, 2), (-1, 0, 1))
+    kernel_y = ((-1, -2, -1), (0, 0, 0), (1, 2, 1))
+    for x in range(1, img.width - 1):
+        for y in range(1, img.height - 1):
+            gradient_x = gradient_y = 0
+            for dy in range(3):
+                for dx in range(3):
+                    p = img.getpixel((x + dx - 1, y + dy - 1))
+                    intensity = p[0] + p[1] + p[2]
+                    gradient_x += kernel_x[dy][dx] * intensity
+                    gradient_y += kernel_y[dy][dx] * intensity
+            length = int(math.sqrt((gradient_x * gradient_x) + (gradient_y * gradient_y)) / 4328 * 255)
+            new_img.putpixel((x, y), (length, length, length))
+    return new_img
+
+
+def legacy_place_edges(img: Image.Image, edge_img: Image.Image, modifier: dict[str, Any]):
+    "Edges placement, pixel by pixel"
+    edge_img_minimum = 10
+    edge_img_maximum = edge_img.crop().getextrema()[0][1]
+    for x in range(1, img.width - 1):
+        for y in range(1, img.height - 1):
+            p = img.getpixel((x, y))
+            ep = edge_img.getpixel((x, y))
+            if ep[0] > edge_img_minimum:
+                img.putpixel((x, y), utils.edge_colorify(
+                    (ep[0] - edge_img_minimum) / (edge_img_maximum - edge_img_minimum), modifier["colors"], p
+                ))
+    return img
+
+
+def legacy_colorify_image(img: Image.Image, modifier: dict[str, Any], variation: utils.VariationType, maximum: int,
+                          minimum: int):
+    "Colorification through a lookup table, applied pixel by pixel"
+    img = img.convert("LA")
+    pixels = img.get_flattened_data()
+    img = img.convert("RGBA")
+    results = [
+        utils._colorify((x - minimum) / (maximum - minimum), modifier["colors"], variation) # pylint: disable=protected-access
+        if x >= minimum
+        else (0, 0, 0)
+        for x in range(256)
+    ]
+    img.putdata([results[x[0]] + (x[1],) for x in pixels])
+    return img
+
+
+def legacy_color_ratios(img: Image.Image, colors: list[utils.ColorType]):
+    "Colors histogram, computed pixel by pixel"
+    img = img.convert("RGBA")
+    total_pixels = img.width * img.height
+    color_pixels = [0 for _ in range(len(colors)+1)]
+    close_colors = []
+    for i, color in enumerate(colors):
+        close_colors.append(utils.interpolate_colors(color, colors[min(i + 1, len(colors)-1)], 1/len(colors)))
+        close_colors.append(utils.interpolate_colors(color, colors[max(i - 1, 0)], 1/len(colors)))
+    for x in range(0, img.width):
+        for y in range(0, img.height):
+            p = img.getpixel((x, y))
+            if p[3] == 0:
+                total_pixels -= 1
+                continue
+            values = [
+                max(
+                    utils.distance_to_color(p, color),
+                    utils.distance_to_color(p, close_colors[2 * i]),
+                    utils.distance_to_color(p, close_colors[2 * i + 1])
+                )
+                for i, color in enumerate(colors)
+            ]
+            index = utils.find_max_index(values)
+            if index is not None and values[index] > .93:
+                color_pixels[index] += 1
+            else:
+                color_pixels[-1] += 1
+    return [count / total_pixels for count in color_pixels]
+
+
+def generate_image(size: int, seed: int):
+    "Generate an avatar-like image, with gradients, noise, flat areas and transparent corners"
+    rng = np.random.default_rng(seed)
+    y_coords, x_coords = np.mgrid[0:size, 0:size]
+    pixels = np.empty((size, size, 4), dtype=np.uint8)
+    pixels[:, :, 0] = (x_coords * 255 // max(size - 1, 1)).astype(np.uint8)
+    pixels[:, :, 1] = (y_coords * 255 // max(size - 1, 1)).astype(np.uint8)
+    pixels[:, :, 2] = rng.integers(0, 256, (size, size), dtype=np.uint8)
+    pixels[size // 3: 2 * size // 3, size // 3: 2 * size // 3, :3] = MODIFIERS["light"]["colors"][1]
+    radius = np.hypot(x_coords - size / 2, y_coords - size / 2)
+    pixels[:, :, 3] = np.where(radius < size / 2, 255, 0).astype(np.uint8)
+    return Image.fromarray(pixels, "RGBA")
+
+
+def generate_gif(size: int, frames_count: int):
+    "Generate an animated GIF, and reload it like an uploaded file"
+    frames = [generate_image(size, seed) for seed in range(frames_count)]
+    path = "/tmp/colors_events_benchmark.gif"
+    frames[0].save(path, format="GIF", append_images=frames[1:], save_all=True, duration=100, loop=0)
+    return Image.open(path)
+
+
+def get_operations(modifier: dict[str, Any]) -> dict[str, tuple[Callable[[Image.Image], Any], Callable[[Image.Image], Any]]]:
+    "Get the (legacy, vectorized) implementations of each operation, applied to an RGBA frame"
+    def colorify(implementation: Callable[..., Image.Image]):
+        def run(frame: Image.Image):
+            minimum, maximum = frame.convert("LA").getextrema()[0]
+            return implementation(frame, modifier, BASE_VARIATION, maximum, minimum)
+        return run
+
+    def place_edges(implementation: Callable[..., Image.Image]):
+        def run(frame: Image.Image):
+            return implementation(frame.copy(), utils.edge_antialiasing(frame), modifier)
+        return run
+
+    return {
+        "sobel": (legacy_edge_antialiasing, utils.edge_antialiasing),
+        "edges placement": (place_edges(legacy_place_edges), place_edges(utils.place_edges)),
+        "colorify": (colorify(legacy_colorify_image), colorify(utils.colorify_image)),
+        "color ratios": (
+            lambda frame: legacy_color_ratios(frame, MODIFIERS["all"]["colors"]),
+            lambda frame: utils.color_ratios(frame, MODIFIERS["all"]["colors"]),
+        ),
+    }
+
+
+def same_output(result1: Any, result2: Any):
+    "Compare two results, images being compared pixel by pixel"
+    if isinstance(result1, Image.Image):
+        return np.array_equal(np.asarray(result1.convert("RGBA")), np.asarray(result2.convert("RGBA")))
+    return np.allclose(result1, result2)
+
+
+def benchmark_frames(label: str, frames: list[Image.Image]):
+    "Time each operation on a list of frames, and print the average time per frame"
+    operations = get_operations(dict(MODIFIERS["light"]))
+    for name, (legacy, vectorized) in operations.items():
+        legacy_duration = vectorized_duration = 0.0
+        identical = True
+        for frame in frames:
+            start = time.perf_counter()
+            legacy_result = legacy(frame)
+            legacy_duration += time.perf_counter() - start
+            start = time.perf_counter()
+            vectorized_result = vectorized(frame)
+            vectorized_duration += time.perf_counter() - start
+            identical = identical and same_output(legacy_result, vectorized_result)
+        legacy_ms = legacy_duration / len(frames) * 1000
+        vectorized_ms = vectorized_duration / len(frames) * 1000
+        print(f"{label:>8} | {name:<16} | {legacy_ms:9.1f}ms | {vectorized_ms:8.2f}ms "
+              f"| x{legacy_ms / vectorized_ms:6.0f} | {'identical' if identical else 'DIFFERENT'}")
+
+
+def main():
+    "Run the benchmark on a static image and on a GIF"
+    parser = argparse.ArgumentParser(description="Benchmark the color events image operations")
+    parser.add_argument("--size", type=int, default=512, help="Width and height of the static image")
+    parser.add_argument("--gif-size", type=int, default=256, help="Width and height of the GIF frames")
+    parser.add_argument("--gif-frames", type=int, default=8, help="Number of GIF frames")
+    args = parser.parse_args()
+
+    print("   input | operation        | per-pixel  | vectorized | speedup | output")
+    benchmark_frames("static", [generate_image(args.size, 0)])
+    with generate_gif(args.gif_size, args.gif_frames) as gif:
+        frames = [frame.convert("RGBA") for frame in ImageSequence.Iterator(gif)]
+    benchmark_frames("gif", frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ import typing
 import discord
 from PIL import Image
 
+from core.render_pool import RenderPool
+
+from .background_change import get_background_mask
 from .utils import (ColorType, check_image_general, colorify_image,
                     convert_image_general, convert_image_with_background,
                     edge_detect, invert_colors, resized_img, shift_colors,
@@ -84,27 +87,39 @@ VARIATIONS = {
 }
 
 
-async def convert_image(image: bytes, modifier: str, method: str, selected_variations: list[str], replace_background: bool):
-    "Change an image colors into orange-black colors by using given modifier, method and variations"
-    if image == b'':
-        raise RuntimeError("Invalid image")
+def render_image(image: bytes, modifier: str, method: str, selected_variations: list[str],
+                 mask: Image.Image | None) -> tuple[bytes, str]:
+    """Change an image colors, and replace its background if a mask is given, inside a render worker
+    Return the encoded result and its file extension"""
     base_color_var = (.15, .3, .7, .85)
     with Image.open(io.BytesIO(image)) as img:
-        if replace_background:
-            io_out = await convert_image_with_background(
-                image, modifier, method, selected_variations,
+        if mask is not None:
+            io_out = convert_image_with_background(
+                img, mask, modifier, method, selected_variations,
                 MODIFIERS, base_color_var, METHODS, VARIATIONS
             )
         else:
-            io_out = await convert_image_general(
-                image, modifier, method, selected_variations,
+            io_out = convert_image_general(
+                img, modifier, method, selected_variations,
                 MODIFIERS, base_color_var, METHODS, VARIATIONS
             )
-        if img.format == "GIF":
-            filename = f"{modifier}.gif"
-        else:
-            filename = f"{modifier}.png"
-    return discord.File(io_out, filename=filename)
+        file_ext = "gif" if img.format == "GIF" else "png"
+    return io_out.getvalue(), file_ext
+
+
+async def convert_image(render_pool: RenderPool, image: bytes, modifier: str, method: str,
+                        selected_variations: list[str], replace_background: bool):
+    "Change an image colors into blurple colors by using given modifier, method and variations"
+    if image == b'':
+        raise RuntimeError("Invalid image")
+    mask = None
+    if replace_background:
+        with Image.open(io.BytesIO(image)) as img:
+            mask = await get_background_mask(img)
+    result, file_ext = await render_pool.submit(
+        "blurple", render_image, image, modifier, method, selected_variations, mask
+    )
+    return discord.File(io.BytesIO(result), filename=f"{modifier}.{file_ext}")
 
 
 async def check_image(image: bytes):
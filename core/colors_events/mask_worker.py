@@ -0,0 +1,155 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from PIL import Image
+
+if TYPE_CHECKING:
+    from rembg.sessions import BaseSession
+
+
+class MaskRequest(NamedTuple):
+    "An image waiting for its background mask"
+    image: Image.Image
+    future: asyncio.Future[Image.Image]
+
+
+class BackgroundMaskWorker:
+    """Compute background masks with a single rembg session, loaded on first use
+
+    Requests go through a bounded queue, and the ones waiting together are processed as one batch in a dedicated
+    thread, so that the model is loaded only once and inference never blocks the event loop. The model is released
+    after some idle time, or when the worker is unloaded, and loaded again on the next request."""
+
+    def __init__(self, model_name: str, max_queue_size: int, max_batch_size: int, idle_timeout: float):
+        self.model_name = model_name
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.idle_timeout = idle_timeout
+        self._queue: asyncio.Queue[MaskRequest] | None = None
+        self._consumer_task: asyncio.Task[None] | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._session: "BaseSession | None" = None
+        # number of masks, batches and inference duration since the last stats collection
+        self.processed_count = 0
+        self.batches_count = 0
+        self.inference_duration = 0.0
+
+    @property
+    def is_loaded(self):
+        "Whether the worker is currently running, with its model possibly in memory"
+        return self._consumer_task is not None and not self._consumer_task.done()
+
+    @property
+    def queue_depth(self):
+        "Number of requests waiting to be processed"
+        return 0 if self._queue is None else self._queue.qsize()
+
+    async def get_mask(self, image: Image.Image) -> Image.Image:
+        "Detect the background of an image and return the corresponding mask"
+        if not self.is_loaded:
+            self._start()
+        assert self._queue is not None
+        queue = self._queue
+        future: asyncio.Future[Image.Image] = asyncio.get_running_loop().create_future()
+        # wait for a free slot if too many requests are already queued
+        await queue.put(MaskRequest(image, future))
+        if queue is not self._queue:
+            # the worker was released while waiting for a slot, so nothing will consume this queue anymore:
+            # fail its requests, which also wakes up the next requests waiting for a slot
+            self._fail_requests(self._drain_queue(queue))
+        return await future
+
+    def _start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="background-mask")
+        self._consumer_task = asyncio.create_task(self._consume())
+
+    async def _consume(self):
+        "Process the queued requests by batches, until the worker stays idle for too long"
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                first_request = await asyncio.wait_for(self._queue.get(), timeout=self.idle_timeout)
+            except asyncio.TimeoutError:
+                self._release()
+                return
+            batch = [first_request]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            batch = [request for request in batch if not request.future.done()]
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                masks = await loop.run_in_executor(
+                    self._executor, self._process_batch, [request.image for request in batch]
+                )
+            except asyncio.CancelledError:
+                self._fail_requests(batch)
+                raise
+            except Exception as err: # pylint: disable=broad-except
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(err)
+                continue
+            self.inference_duration += time.perf_counter() - start
+            self.processed_count += len(batch)
+            self.batches_count += 1
+            for request, mask in zip(batch, masks, strict=True):
+                if not request.future.done():
+                    request.future.set_result(mask)
+
+    def _process_batch(self, images: list[Image.Image]) -> list[Any]:
+        "Compute the masks of several images, in the worker thread"
+        # pylint: disable=import-outside-toplevel
+        from rembg import new_session, remove
+        if self._session is None:
+            self._session = new_session(self.model_name)
+        return [
+            remove(image, session=self._session, alpha_matting=True, only_mask=True)
+            for image in images
+        ]
+
+    def _fail_requests(self, requests: list[MaskRequest]):
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Background mask worker has been unloaded"))
+
+    @staticmethod
+    def _drain_queue(queue: asyncio.Queue[MaskRequest]):
+        "Remove every request from a queue"
+        requests: list[MaskRequest] = []
+        while not queue.empty():
+            requests.append(queue.get_nowait())
+        return requests
+
+    def _release(self):
+        "Drop the model session and stop the worker thread"
+        self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._queue is not None:
+            queue, self._queue = self._queue, None
+            self._fail_requests(self._drain_queue(queue))
+
+    async def unload(self):
+        "Stop the worker and free the model memory, for example when the color event is over"
+        if self._consumer_task is not None and not self._consumer_task.done():
+            self._consumer_task.cancel()
+            try:
+                await self._consumer_task
+            except asyncio.CancelledError:
+                pass
+        self._consumer_task = None
+        if self._executor is not None:
+            # let a running inference finish, so that its session is not kept after the release
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+        self._release()
+
+
+background_mask_worker = BackgroundMaskWorker("u2netp", max_queue_size=32, max_batch_size=4, idle_timeout=15*60)
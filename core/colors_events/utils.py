@@ -4,12 +4,12 @@ import math
 from typing import Annotated, Any, Callable, TypedDict
 
 import discord
+import numpy as np
 from discord.ext import commands
 from PIL import Image, ImageSequence
 
 from core.bot_classes import MyContext
-from core.colors_events.background_change import (apply_gradient,
-                                                  get_background_mask)
+from core.colors_events.background_change import apply_gradient
 
 ColorType = tuple[int, int, int]
 ColorAlphaType = tuple[int, int, int, int]
@@ -85,106 +85,37 @@ async def get_url_from_ctx(ctx: MyContext, who: TargetConverterType | None):
 
 # source: https://dev.to/enzoftware/how-to-build-amazing-image-filters-with-python-median-filter---sobel-filter---5h7
 def edge_antialiasing(img: Image.Image):
-    new_img = Image.new("RGB", img.size, "black")
-    for x in range(1, img.width - 1):  # ignore the edge pixels for simplicity (1 to width-1)
-        for y in range(1, img.height - 1):  # ignore edge pixels for simplicity (1 to height-1)
-
-            # initialise Gx to 0 and Gy to 0 for every pixel
-            Gx = 0
-            Gy = 0
-
-            # top left pixel
-            p = img.getpixel((x - 1, y - 1))
-            r = p[0]
-            g = p[1]
-            b = p[2]
-
-            # intensity ranges from 0 to 765 (255 * 3)
-            intensity = r + g + b
-
-            # accumulate the value into Gx, and Gy
-            Gx += -intensity
-            Gy += -intensity
-
-            # remaining left column
-            p = img.getpixel((x - 1, y))
-            r = p[0]
-            g = p[1]
-            b = p[2]
-
-            Gx += -2 * (r + g + b)
-
-            p = img.getpixel((x - 1, y + 1))
-            r = p[0]
-            g = p[1]
-            b = p[2]
-
-            Gx += -(r + g + b)
-            Gy += (r + g + b)
-
-            # middle pixels
-            p = img.getpixel((x, y - 1))
-            r = p[0]
-            g = p[1]
-            b = p[2]
-
-            Gy += -2 * (r + g + b)
-
-            p = img.getpixel((x, y + 1))
-            r = p[0]
-            g = p[1]
-            b = p[2]
-
-            Gy += 2 * (r + g + b)
-
-            # right column
-            p = img.getpixel((x + 1, y - 1))
-            r = p[0]
-            g = p[1]
-            b = p[2]
-
-            Gx += (r + g + b)
-            Gy += -(r + g + b)
-
-            p = img.getpixel((x + 1, y))
-            r = p[0]
-            g = p[1]
-            b = p[2]
-
-            Gx += 2 * (r + g + b)
-
-            p = img.getpixel((x + 1, y + 1))
-            r = p[0]
-            g = p[1]
-            b = p[2]
-
-            Gx += (r + g + b)
-            Gy += (r + g + b)
-
-            # calculate the length of the gradient (Pythagorean theorem)
-            length = math.sqrt((Gx * Gx) + (Gy * Gy))
-
-            # normalise the length of gradient to the range 0 to 255
-            length = length / 4328 * 255
-
-            length = int(length)
-
-            # draw the length in the edge image
-            new_img.putpixel((x, y), (length, length, length))
-    return new_img
+    "Compute the Sobel gradient length of an image, on the sum of its RGB channels"
+    intensity = np.asarray(img.convert("RGB"), dtype=np.int32).sum(axis=2)
+    lengths = np.zeros(intensity.shape, dtype=np.uint8)
+    if intensity.shape[0] < 3 or intensity.shape[1] < 3:
+        return Image.fromarray(np.stack([lengths] * 3, axis=2), "RGB")
+    # neighbours of every pixel except the image edges, named by their vertical then horizontal position
+    top_left, top, top_right = intensity[:-2, :-2], intensity[:-2, 1:-1], intensity[:-2, 2:]
+    left, right = intensity[1:-1, :-2], intensity[1:-1, 2:]
+    bottom_left, bottom, bottom_right = intensity[2:, :-2], intensity[2:, 1:-1], intensity[2:, 2:]
+    gradient_x = (top_right + 2 * right + bottom_right) - (top_left + 2 * left + bottom_left)
+    gradient_y = (bottom_left + 2 * bottom + bottom_right) - (top_left + 2 * top + top_right)
+    # normalise the length of gradient to the range 0 to 255
+    length = np.sqrt((gradient_x * gradient_x + gradient_y * gradient_y).astype(np.float64)) / 4328 * 255
+    lengths[1:-1, 1:-1] = length.astype(np.uint8)
+    return Image.fromarray(np.stack([lengths] * 3, axis=2), "RGB")
 
 
 def place_edges(img: Image.Image, edge_img: Image.Image, modifier: dict[str, Any]):
+    "Draw the detected edges on top of an image, colored according to the closest modifier color"
     edge_img_minimum = 10
     edge_img_maximum = edge_img.crop().getextrema()[0][1]
-    for x in range(1, img.width - 1):
-        for y in range(1, img.height - 1):
-            p = img.getpixel((x, y))
-            ep = edge_img.getpixel((x, y))
-            if (ep[0] > edge_img_minimum):
-                img.putpixel((x, y), edge_colorify((ep[0] - edge_img_minimum) / (edge_img_maximum - edge_img_minimum),
-                                                   modifier["colors"], p))
-    return img
+    pixels = np.array(img.convert("RGBA"))
+    edges = np.asarray(edge_img, dtype=np.float64)[:, :, 0]
+    # edge pixels are ignored
+    mask = np.zeros(edges.shape, dtype=bool)
+    mask[1:-1, 1:-1] = edges[1:-1, 1:-1] > edge_img_minimum
+    if not mask.any():
+        return img
+    ratios = (edges[mask] - edge_img_minimum) / (edge_img_maximum - edge_img_minimum)
+    pixels[mask] = edge_colorify_array(ratios, modifier["colors"], pixels[mask])
+    return Image.fromarray(pixels, "RGBA")
 
 
 def resized_img(x: float, n: int, d: ColorType, m: tuple[float, float, float], l: ColorType):
@@ -241,6 +172,25 @@ def edge_colorify(x, colors, cur_color):
     return tuple(f3(x, i, colors, cur_color) for i in range(3))
 
 
+def interpolate_array(color1: np.ndarray, color2: np.ndarray, percent: np.ndarray):
+    "Vectorized version of interpolate, rounding halves to even like the builtin round"
+    return np.round((color2 - color1) * percent + color1)
+
+
+def edge_colorify_array(ratios: np.ndarray, colors: list[ColorType], pixels: np.ndarray) -> np.ndarray:
+    "Vectorized version of edge_colorify, returning the new RGBA value of each given pixel"
+    similarities = np.stack([distance_to_color_array(pixels, color) for color in colors], axis=1)
+    # like find_max_index, the first closest color wins, and no color at all is handled like the last ones
+    closest_color = np.minimum(np.argmax(similarities, axis=1), 2)
+    closest_color[similarities.max(axis=1) <= 0] = 2
+    palette = np.array(colors[:3], dtype=np.float64)
+    color_from = palette[closest_color]
+    color_to = palette[[1, 2, 1]][closest_color]
+    result = np.full((len(pixels), 4), 255, dtype=np.uint8)
+    result[:, :3] = interpolate_array(color_from, color_to, ratios[:, None])
+    return result
+
+
 def remove_alpha(img: Image.Image, bg: ColorType):
     alpha = img.convert("RGBA").getchannel('A')
     background = Image.new("RGBA", img.size, bg)
@@ -255,23 +205,23 @@ def colorify_image(img: Image.Image, modifier: dict[str, Any], variation: Variat
 
 def _apply_modification(img: Image.Image, modifier: dict[str, Any], variation: VariationType | None, maximum: int, minimum: int):
     "Apply a filter or a colorification to a given image"
-    img = img.convert("LA")
-    pixels = img.getdata()
-    img = img.convert("RGBA")
+    pixels = np.asarray(img.convert("LA"))
     if variation is None:
         def edit_color(x: int):
             return modifier["func"]((x - minimum) * 255 / (255 - minimum))
     else:
         def edit_color(x: int):
             return _colorify((x - minimum) / (maximum - minimum), modifier["colors"], variation)
-    results = [
+    lookup_table = np.array([
         edit_color(x)
         if x >= minimum
-        else 0
+        else (0, 0, 0)
         for x in range(256)
-    ]
-    img.putdata((*map(lambda x: results[x[0]] + (x[1],), pixels),))
-    return img
+    ], dtype=np.uint8)
+    result = np.empty(pixels.shape[:2] + (4,), dtype=np.uint8)
+    result[:, :, :3] = lookup_table[pixels[:, :, 0]]
+    result[:, :, 3] = pixels[:, :, 1]
+    return Image.fromarray(result, "RGBA")
 
 def variation_maker(base: VariationType, var: VariationType):
     if var[0] <= -100:
@@ -316,6 +266,14 @@ def distance_to_color(color1: ColorType, color2: ColorType):
         total += (255 - abs(color1[i] - color2[i])) / 255
     return total / 3
 
+def distance_to_color_array(pixels: np.ndarray, color: ColorType) -> np.ndarray:
+    "Vectorized version of distance_to_color, between many pixels and one color"
+    total = np.zeros(len(pixels), dtype=np.float64)
+    # channels are summed in the same order to get the exact same floats
+    for i in range(3):
+        total += (255 - np.abs(pixels[:, i].astype(np.int32) - color[i])) / 255
+    return total / 3
+
 def find_max_index(array: list[float]):
     "Find the index of the maximum value in an array"
     maximum = 0
@@ -329,31 +287,26 @@ def find_max_index(array: list[float]):
 def color_ratios(img: Image.Image, colors: list[ColorType]):
     "Calculate the ratio of present colors in the given image (between 0.0 and 1.0)"
     img = img.convert("RGBA")
-    total_pixels = img.width * img.height # number of pixels in the image
-    color_pixels = [0 for _ in range(len(colors)+1)] # count number of pixels close to each color
     close_colors = []
     for i, color in enumerate(colors):
         close_colors.append(interpolate_colors(color, colors[min(i + 1, len(colors)-1)], 1/len(colors)))
         close_colors.append(interpolate_colors(color, colors[max(i - 1, 0)], 1/len(colors)))
 
-    for x in range(0, img.width):
-        for y in range(0, img.height):
-            p = img.getpixel((x, y))
-            if p[3] == 0:
-                total_pixels -= 1
-                continue
-            values = [0 for _ in range(len(colors))]
-            for i, color in enumerate(colors):
-                values[i] = max(
-                    distance_to_color(p, color),
-                    distance_to_color(p, close_colors[2 * i]),
-                    distance_to_color(p, close_colors[2 * i + 1])
-                )
-            index = find_max_index(values)
-            if values[index] > .93:
-                color_pixels[index] += 1
-            else:
-                color_pixels[-1] += 1
+    pixels = np.asarray(img).reshape(-1, 4)
+    pixels = pixels[pixels[:, 3] != 0]
+    total_pixels = len(pixels)
+    values = np.stack([
+        np.maximum.reduce([
+            distance_to_color_array(pixels, color),
+            distance_to_color_array(pixels, close_colors[2 * i]),
+            distance_to_color_array(pixels, close_colors[2 * i + 1]),
+        ])
+        for i, color in enumerate(colors)
+    ], axis=1)
+    index = np.argmax(values, axis=1)
+    # pixels too far from every color are counted in the last slot
+    index[values.max(axis=1) <= .93] = len(colors)
+    color_pixels = np.bincount(index, minlength=len(colors) + 1).tolist()
 
     percent: list[float] = []
     for i, count in enumerate(color_pixels):
@@ -361,7 +314,7 @@ def color_ratios(img: Image.Image, colors: list[ColorType]):
     return percent
 
 
-async def convert_image_general(image: Image.Image, modifier: str, method: str, selected_variations: list[str],
+def convert_image_general(image: Image.Image, modifier: str, method: str, selected_variations: list[str],
                         modifiers: dict[str, dict], base_color_var: VariationType, methods: dict[str, Callable],
                         variations: dict[str, VariationType]):
     "Change an image colors into themed colors by using given modifier, method and variations"
@@ -450,10 +403,10 @@ async def convert_image_general(image: Image.Image, modifier: str, method: str,
     out.seek(0)
     return out
 
-async def convert_image_with_background(image: Image.Image, modifier: str, method: str, selected_variations: list[str],
-                        modifiers: dict[str, dict], base_color_var: VariationType, methods: dict[str, Callable],
-                        variations: dict[str, VariationType]):
-    "Replace the image background with a colored gradient, and change the rest of the image as usual"
+def convert_image_with_background(image: Image.Image, mask: Image.Image, modifier: str, method: str,
+                        selected_variations: list[str], modifiers: dict[str, dict], base_color_var: VariationType,
+                        methods: dict[str, Callable], variations: dict[str, VariationType]):
+    "Replace the image background, detected in the given mask, with a colored gradient, and change the rest of the image as usual"
     # get gradient background colors
     try:
         modifier_converter = dict(modifiers[modifier])
@@ -461,13 +414,12 @@ async def convert_image_with_background(image: Image.Image, modifier: str, metho
         raise RuntimeError("Invalid image modifier", modifier) from None
     outer_color, inner_color = modifier_converter["bg_colors"]
     # get gradient background from mask
-    mask = await get_background_mask(image)
-    img_with_background = await apply_gradient(image, mask, inner_color, outer_color)
+    img_with_background = apply_gradient(image, mask, inner_color, outer_color)
 
     # apply color conversion on the object (ie. original image without background)
     empty = Image.new("RGBA", (image.size), 0)
     initial_object_img = Image.composite(image, empty, mask)
-    io_img_without_background = await convert_image_general(
+    io_img_without_background = convert_image_general(
         initial_object_img, modifier, method, selected_variations, modifiers, base_color_var, methods, variations
     )
 
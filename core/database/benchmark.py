@@ -0,0 +1,137 @@
+"""Measure the event loop lag caused by concurrent database queries, run inline or inside the worker threads
+
+Run it from the bot root directory with `python -m core.database.benchmark`
+MySQL is replaced by simulated connections, whose cursors block the calling thread for a given duration."""
+import argparse
+import asyncio
+import time
+from typing import Any
+from unittest.mock import patch
+
+from core.loop_lag_monitor import LoopLagMonitor
+
+from .db_connection_manager import DatabaseConnectionManager
+from .db_connection_pool import ConnectionPool, PoolSettings
+
+DATABASE = "axobot"
+POOL_SETTINGS = PoolSettings(min_size=2, max_size=6, idle_timeout=300, max_lifetime=3600)
+
+
+class SimulatedCursor:
+    "A cursor whose queries block the calling thread, like a real MySQL cursor waiting for the server"
+
+    def __init__(self, query_duration: float):
+        self.query_duration = query_duration
+        self.rowcount = 0
+
+    def execute(self, _query: str, _args: Any = None):
+        time.sleep(self.query_duration)
+        self.rowcount = 1
+
+    def fetchall(self):
+        return [{"value": 1}]
+
+    def close(self):
+        pass
+
+
+class SimulatedConnection:
+    "The subset of a MySQL connection used by the queries"
+
+    def __init__(self, query_duration: float):
+        self.query_duration = query_duration
+
+    def cursor(self, **_kwargs: Any):
+        return SimulatedCursor(self.query_duration)
+
+    def is_connected(self):
+        return True
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SimulatedConnectionManager(DatabaseConnectionManager):
+    "A connection manager opening simulated connections instead of MySQL ones"
+
+    def __init__(self, query_duration: float):
+        with patch("core.database.db_connection_manager.get_secrets_dict", return_value={"database": {}}):
+            super().__init__()
+        self.query_duration = query_duration
+
+    def _DatabaseConnectionManager__create_connection(self, _database: str): # pylint: disable=invalid-name
+        return SimulatedConnection(self.query_duration)
+
+
+def run_query(cnx: Any):
+    "Run a single read query with a connection"
+    cursor = cnx.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT 1")
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+async def run_inline(queries_count: int, query_duration: float):
+    "Run the queries directly from the event loop, like before the worker threads were introduced"
+    pool = ConnectionPool(DATABASE, POOL_SETTINGS, lambda _database: SimulatedConnection(query_duration))
+
+    async def query():
+        await pool.wait_for_slot()
+        try:
+            return pool.run_with_connection(run_query)
+        finally:
+            pool.free_slot()
+
+    return await asyncio.gather(*(query() for _ in range(queries_count)))
+
+
+async def run_in_executor(queries_count: int, query_duration: float):
+    "Run the queries through the connection manager, inside its worker threads"
+    manager = SimulatedConnectionManager(query_duration)
+    try:
+        return await asyncio.gather(*(manager.execute(DATABASE, run_query) for _ in range(queries_count)))
+    finally:
+        manager.shutdown()
+
+
+async def measure(mode: str, queries_count: int, query_duration: float, interval: float):
+    "Run the queries with the given mode, and return the elapsed time and the event loop lag monitor"
+    runner = run_inline if mode == "inline" else run_in_executor
+    async with LoopLagMonitor(interval) as lag_monitor:
+        # let the monitor take a first sample before the queries start
+        await asyncio.sleep(interval)
+        start = time.perf_counter()
+        results = await runner(queries_count, query_duration)
+        duration = time.perf_counter() - start
+        await asyncio.sleep(interval)
+    if len(results) != queries_count:
+        raise RuntimeError(f"Expected {queries_count} results, got {len(results)}")
+    return duration, lag_monitor
+
+
+def main():
+    "Run the same concurrent queries inline and inside the worker threads"
+    parser = argparse.ArgumentParser(description="Benchmark the event loop lag caused by database queries")
+    parser.add_argument("--queries", type=int, default=60, help="Number of concurrent queries")
+    parser.add_argument("--duration", type=float, default=20, help="Duration of each query, in milliseconds")
+    parser.add_argument("--interval", type=float, default=10, help="Lag sampling interval, in milliseconds")
+    args = parser.parse_args()
+
+    for mode in ("inline", "executor"):
+        duration, lag_monitor = asyncio.run(
+            measure(mode, args.queries, args.duration / 1000, args.interval / 1000)
+        )
+        print(
+            f"{mode:>8}: {args.queries} queries in {duration:.2f}s - "
+            f"event loop lag {lag_monitor.avg_lag_ms:.1f}ms avg, {lag_monitor.max_lag_ms:.0f}ms max "
+            f"({lag_monitor.samples_count} samples)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
+import asyncio
 import logging
-import time
-from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
 
 from mysql.connector import connect as sql_connect
 from mysql.connector import errors as mysql_errors
@@ -9,19 +10,36 @@ from mysql.connector.connection_cext import CMySQLConnection
 
 from core.boot_utils.conf_loader import get_secrets_dict
 
+from .db_connection_pool import (ConnectionDetails, ConnectionPool,
+                                 PoolSettings, PoolStats)
+from .query_tracer import QueryTracer
 
-class ConnectionDetails(NamedTuple):
-    "Store info about a database connection."
-    cnx: MySQLConnection | CMySQLConnection
-    creation: int
+T = TypeVar('T')
+
+# connection pools limits, per database
+POOLS_SETTINGS: dict[str, PoolSettings] = {
+    "axobot": PoolSettings(min_size=2, max_size=6, idle_timeout=300, max_lifetime=3600),
+    "axobot-xp": PoolSettings(min_size=1, max_size=4, idle_timeout=300, max_lifetime=3600),
+    "statsbot": PoolSettings(min_size=1, max_size=2, idle_timeout=120, max_lifetime=3600),
+}
+DEFAULT_POOL_SETTINGS = PoolSettings(min_size=0, max_size=2, idle_timeout=120, max_lifetime=3600)
+
+# one worker thread per connection that can be used at the same time
+MAX_DB_WORKERS = sum(settings.max_size for settings in POOLS_SETTINGS.values()) + DEFAULT_POOL_SETTINGS.max_size
 
 
 class DatabaseConnectionManager:
-    "Handles all database connections."
+    """Handles all database connections.
+
+    Every blocking call to the MySQL connector is run inside a bounded pool of worker threads, so that the event loop
+    is never blocked by a slow query. Each running query gets its own connection, checked out from the connection
+    pool of its database and given back once the query is done."""
 
     def __init__(self):
         self.__database_keys = get_secrets_dict()["database"]
-        self.__connections: dict[str, ConnectionDetails] = {}
+        self.__pools: dict[str, ConnectionPool] = {}
+        self.__executor = ThreadPoolExecutor(max_workers=MAX_DB_WORKERS, thread_name_prefix="db-worker")
+        self.tracer = QueryTracer()
         self.__log = logging.getLogger("bot.db")
 
     def test_connection(self):
@@ -54,19 +72,64 @@ class DatabaseConnectionManager:
             return False
         return True
 
-    def get_connection(self, database: str):
-        """Get a connection to the database.
-        If a connection is already open, return it. Else, create a new one."""
-        if database not in self.__connections or not self.__connections[database].cnx.is_connected():
-            return self.__create_connection(database)
-        return self.__connections[database].cnx
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        "Run a blocking function inside the database worker threads."
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, func, *args)
+
+    async def execute(self, database: str, func: Callable[[MySQLConnection | CMySQLConnection], T]) -> T:
+        """Run a blocking function with a dedicated connection to the given database, inside a worker thread.
+        The connection is given back to the pool once the function returns."""
+        pool = self.__get_pool(database)
+        await pool.wait_for_slot()
+        try:
+            return await self.run(pool.run_with_connection, func)
+        finally:
+            pool.free_slot()
+
+    async def acquire(self, database: str) -> ConnectionDetails:
+        """Get a dedicated connection to the database, until it is given back with `release`.
+        Only use this when several queries must share the same connection, otherwise prefer `execute`."""
+        pool = self.__get_pool(database)
+        await pool.wait_for_slot()
+        try:
+            return await self.run(pool.checkout)
+        except BaseException:
+            pool.free_slot()
+            raise
+
+    async def release(self, database: str, connection: ConnectionDetails):
+        "Give back a connection obtained with `acquire`."
+        pool = self.__get_pool(database)
+        try:
+            await self.run(pool.checkin, connection)
+        finally:
+            pool.free_slot()
 
     def disconnect_all(self):
-        "Close all database connections."
-        connection: ConnectionDetails | None
-        for connection in self.__connections.values():
-            connection.cnx.close()
-        self.__connections.clear()
+        """Close all idle database connections.
+        Connections currently used by a query will be closed as soon as they are released."""
+        for pool in self.__pools.values():
+            pool.disconnect_all()
+
+    def shutdown(self):
+        "Close every connection and stop the worker threads."
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+        self.disconnect_all()
+
+    def collect_pools_stats(self) -> dict[str, PoolStats]:
+        "Get the usage metrics of each connection pool since the last call"
+        return {
+            database: pool.collect_stats()
+            for database, pool in self.__pools.items()
+        }
+
+    def __get_pool(self, database: str) -> ConnectionPool:
+        "Get the connection pool of a database, or create it"
+        if database not in self.__pools:
+            settings = POOLS_SETTINGS.get(database, DEFAULT_POOL_SETTINGS)
+            self.__pools[database] = ConnectionPool(database, settings, self.__create_connection)
+        return self.__pools[database]
 
     def __create_connection(self, database: str) -> MySQLConnection | CMySQLConnection:
         "Create a new connection to the database."
@@ -83,5 +146,4 @@ class DatabaseConnectionManager:
         )
         if not isinstance(cnx, (MySQLConnection, CMySQLConnection)):
             raise TypeError("Connection is not a MySQLConnection or CMySQLConnection")
-        self.__connections[database] = ConnectionDetails(cnx, int(time.time()))
         return cnx
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, NamedTuple, TypeVar
+
+from mysql.connector.connection import MySQLConnection
+from mysql.connector.connection_cext import CMySQLConnection
+
+T = TypeVar('T')
+
+
+class ConnectionDetails(NamedTuple):
+    "Store info about a database connection."
+    cnx: MySQLConnection | CMySQLConnection
+    creation: int
+    generation: int
+    last_used: float
+
+
+class PoolSettings(NamedTuple):
+    "Size and lifetime limits of a connection pool"
+    min_size: int # number of idle connections kept open, even after their idle timeout
+    max_size: int # maximum number of connections used at the same time
+    idle_timeout: int # seconds before an unused connection is closed
+    max_lifetime: int # seconds before a connection is recycled
+
+
+class PoolStats(NamedTuple):
+    "Usage metrics of a connection pool, since the last collection"
+    in_use: int
+    max_in_use: int
+    open: int
+    checkouts: int
+    avg_wait_ms: float | None
+    max_wait_ms: float | None
+
+
+class ConnectionPool:
+    """Pool of connections to a single database.
+
+    Slots are reserved from the event loop, so that waiting for a free connection never blocks a worker thread,
+    while connections are opened, health-checked and closed from the database worker threads."""
+
+    def __init__(self, database: str, settings: PoolSettings,
+                 connect: Callable[[str], MySQLConnection | CMySQLConnection]):
+        self.database = database
+        self.settings = settings
+        self.__connect = connect
+        self.__semaphore = asyncio.Semaphore(settings.max_size)
+        self.__idle_connections: list[ConnectionDetails] = []
+        self.__lock = threading.Lock()
+        self.__generation = 0
+        self.__in_use = 0
+        self.__max_in_use = 0
+        self.__wait_records: list[float] = []
+        self.__log = logging.getLogger("bot.db")
+
+    async def wait_for_slot(self):
+        "Wait until a connection can be used without exceeding the pool max size (event loop only)"
+        start_time = time.monotonic()
+        await self.__semaphore.acquire()
+        self.__wait_records.append((time.monotonic() - start_time) * 1000)
+        self.__in_use += 1
+        self.__max_in_use = max(self.__max_in_use, self.__in_use)
+
+    def free_slot(self):
+        "Free a slot reserved with `wait_for_slot` (event loop only)"
+        self.__in_use -= 1
+        self.__semaphore.release()
+
+    def run_with_connection(self, func: Callable[[MySQLConnection | CMySQLConnection], T]) -> T:
+        "Check out a connection, run the given function with it, then give it back (worker thread only)"
+        connection = self.checkout()
+        try:
+            return func(connection.cnx)
+        finally:
+            self.checkin(connection)
+
+    def checkout(self) -> ConnectionDetails:
+        """Get a healthy idle connection, or open a new one (worker thread only)
+        Connections older than the pool max lifetime are closed instead of being reused."""
+        while True:
+            with self.__lock:
+                if not self.__idle_connections:
+                    break
+                # most recently used connection first, so that the oldest ones can expire
+                connection = self.__idle_connections.pop()
+            if time.time() - connection.creation > self.settings.max_lifetime:
+                self.__log.debug("Recycling connection to database '%s'", self.database)
+            elif connection.cnx.is_connected():
+                return connection
+            connection.cnx.close()
+        return self.__create_connection()
+
+    def checkin(self, connection: ConnectionDetails):
+        "Give back a connection to the pool, and close the ones unused for too long (worker thread only)"
+        now = time.time()
+        expired_connections: list[ConnectionDetails] = []
+        with self.__lock:
+            if connection.generation == self.__generation:
+                self.__idle_connections.append(connection._replace(last_used=now))
+            else:
+                # connection was opened before the last disconnect_all call
+                expired_connections.append(connection)
+            while (
+                len(self.__idle_connections) > self.settings.min_size
+                and now - self.__idle_connections[0].last_used > self.settings.idle_timeout
+            ):
+                expired_connections.append(self.__idle_connections.pop(0))
+        for expired_connection in expired_connections:
+            expired_connection.cnx.close()
+
+    def disconnect_all(self):
+        """Close all idle connections.
+        Connections currently in use will be closed as soon as they are given back."""
+        with self.__lock:
+            self.__generation += 1
+            connections = self.__idle_connections
+            self.__idle_connections = []
+        for connection in connections:
+            connection.cnx.close()
+
+    def collect_stats(self) -> PoolStats:
+        "Get the pool usage metrics, and reset them (event loop only)"
+        wait_records, self.__wait_records = self.__wait_records, []
+        stats = PoolStats(
+            in_use=self.__in_use,
+            max_in_use=self.__max_in_use,
+            open=self.__in_use + len(self.__idle_connections),
+            checkouts=len(wait_records),
+            avg_wait_ms=sum(wait_records) / len(wait_records) if wait_records else None,
+            max_wait_ms=max(wait_records) if wait_records else None,
+        )
+        self.__max_in_use = self.__in_use
+        return stats
+
+    def __create_connection(self) -> ConnectionDetails:
+        "Open a new connection to the database."
+        generation = self.__generation
+        cnx = self.__connect(self.database)
+        now = time.time()
+        return ConnectionDetails(cnx, int(now), generation, now)
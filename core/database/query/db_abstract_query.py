@@ -9,36 +9,39 @@ from mysql.connector.cursor_cext import CMySQLCursor
 
 from core.type_utils import AnyDict, AnyTuple
 
-from .utils import format_query, save_execution_time
+from .utils import log_query, trace_query
 
 if TYPE_CHECKING:
     from core.bot_classes.axobot import Axobot
 
 
 class DatabaseAbstractQuery(ABC):
-    "Abstract base class for any database query."
+    """Abstract base class for any database query.
 
-    cursor: MySQLCursor | CMySQLCursor
+    The query itself is executed in one of the database worker threads, with its own connection."""
 
-    def __init__(self,
-                 bot: "Axobot", cnx: MySQLConnection | CMySQLConnection, query: str, args: AnyTuple | AnyDict | None = None):
+    def __init__(self, bot: "Axobot", database: str, query: str, args: AnyTuple | AnyDict | None = None):
         self.bot = bot
-        self.cnx = cnx
+        self.database = database
         self.query = query
         self.args = args
         self.log = logging.getLogger("bot.sql")
 
-    @abstractmethod
     async def __aenter__(self) -> Any:
         "Enter the context manager and execute the query."
+        return await self.bot.db.execute(self.database, self._execute)
 
     async def __aexit__(self, exc_type, value, traceback):
-        "Exit the context manager and close the cursor."
-        self.cursor.close()
+        "Exit the context manager."
+
+    @abstractmethod
+    def _execute(self, cnx: MySQLConnection | CMySQLConnection) -> Any:
+        "Execute the query with the given connection and return its result (called from a worker thread)"
 
-    async def _format_query(self):
-        "Create a formatted query string from the query and its arguments."
-        return await format_query(self.cursor, self.query, self.args)
+    def _log_query(self, cursor: MySQLCursor | CMySQLCursor):
+        "Log the formatted query, if debug logs are enabled"
+        log_query(self.log, cursor, self.query, self.args)
 
-    async def _save_execution_time(self, start_time: float):
-        await save_execution_time(self.bot, start_time)
+    def _trace_query(self, cursor: MySQLCursor | CMySQLCursor, start_time: float, rows: int):
+        "Save the execution time and rows count of the query"
+        trace_query(self.bot.db.tracer, self.log, cursor, self.query, self.args, start_time, rows)
@@ -1,51 +1,72 @@
 import logging
-import sys
+import time
 from typing import TYPE_CHECKING, Self
 
 from mysql.connector import errors
-from mysql.connector.connection import MySQLConnection
-from mysql.connector.connection_cext import CMySQLConnection
 from mysql.connector.cursor import MySQLCursor
 from mysql.connector.cursor_cext import CMySQLCursor
 
 from core.type_utils import AnyDict, AnyTuple
 
-from .utils import format_query
+from core.database.db_connection_pool import ConnectionDetails
+from .utils import log_query, trace_query
 
 if TYPE_CHECKING:
     from core.bot_classes.axobot import Axobot
 
 
 class DatabaseMutliQueries():
-    "Represents a context manager to execute multiple write queries with the same cursor"
+    """Represents a context manager to execute multiple write queries with the same cursor
 
-    def __init__(self, bot: "Axobot", cnx: MySQLConnection | CMySQLConnection):
+    The same connection is kept for the whole context, and every query runs in a database worker thread."""
+
+    def __init__(self, bot: "Axobot", database: str):
         self.bot = bot
-        self.cnx = cnx
+        self.database = database
+        self.connection: ConnectionDetails | None = None
         self.cursor: MySQLCursor | CMySQLCursor | None = None
         self.log = logging.getLogger("bot.sql")
 
     async def __aenter__(self) -> Self:
-        if self.cursor is None:
-            self.cursor = self.cnx.cursor()
+        if self.connection is None:
+            self.connection = await self.bot.db.acquire(self.database)
+            self.cursor = self.connection.cnx.cursor()
         return self
 
     async def __aexit__(self, exc_type, value, traceback):
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        try:
+            await self.bot.db.run(self._commit, connection)
+        finally:
+            await self.bot.db.release(self.database, connection)
+
+    def _commit(self, connection: ConnectionDetails):
+        "Commit the pending queries and close the cursor (called from a worker thread)"
         if self.cursor is not None:
-            self.cnx.commit()
+            connection.cnx.commit()
             self.cursor.close()
+            self.cursor = None
 
     async def write(self, query: str, args: AnyTuple | AnyDict | None = None):
         """Execute a write query, but delay the commit until the context manager exits"""
         if self.cursor is None:
             raise RuntimeError("DatabaseMutliQueries context manager not entered, use 'async with' to enter it")
-        query_for_logs = await format_query(self.cursor, query, args)
-        self.log.debug("%s", query_for_logs)
+        try:
+            await self.bot.db.run(self._write, self.cursor, query, args)
+        except errors.ProgrammingError:
+            await self.__aexit__(None, None, None)
+            raise
 
+    def _write(self, cursor: MySQLCursor | CMySQLCursor, query: str, args: AnyTuple | AnyDict | None):
+        "Execute a single query with the shared cursor (called from a worker thread)"
+        log_query(self.log, cursor, query, args)
+        start_time = time.perf_counter()
         try:
-            self.cursor.execute(query, args) # type: ignore
-        except errors.ProgrammingError as err:
+            cursor.execute(query, args) # type: ignore
+        except errors.ProgrammingError:
             # pylint: disable=protected-access
-            self.log.error("%s", self.cursor._executed, exc_info=True) # type: ignore
-            await self.__aexit__(*sys.exc_info())
-            raise err
+            self.log.error("%s", cursor._executed, exc_info=True) # type: ignore
+            raise
+        trace_query(self.bot.db.tracer, self.log, cursor, query, args, start_time, cursor.rowcount)
@@ -65,11 +65,10 @@ class DatabaseQueryHandler:
             astuple: bool = False
     ):
         "Perform a read query to the database"
-        cnx = self.bot.db.get_connection(self.database)
         if query_type(query) != "read":
             raise ValueError(
                 f"Expected read query, but received {truncate_query(query)}")
-        return DatabaseReadQuery[Any](self.bot, cnx, query, args, fetchone, astuple)
+        return DatabaseReadQuery[Any](self.bot, self.database, query, args, fetchone, astuple)
 
     def write(
         self,
@@ -79,16 +78,14 @@ class DatabaseQueryHandler:
             returnrowcount: bool = False
     ):
         "Perform a write query to the database"
-        cnx = self.bot.db.get_connection(self.database)
         if query_type(query) != "write":
             raise ValueError(
                 f"Expected write query, but received {truncate_query(query)}")
-        return DatabaseWriteQuery(self.bot, cnx, query, args, multi, returnrowcount)
+        return DatabaseWriteQuery(self.bot, self.database, query, args, multi, returnrowcount)
 
     def multi(self):
         "Create a context manager to execute multiple write queries on the same connection"
-        cnx = self.bot.db.get_connection(self.database)
-        return DatabaseMutliQueries(self.bot, cnx)
+        return DatabaseMutliQueries(self.bot, self.database)
 
 
 def query_type(query: str) -> Literal["read", "write"]:
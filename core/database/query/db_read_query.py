@@ -1,5 +1,4 @@
 import datetime
-import sys
 import time
 from typing import TYPE_CHECKING, Generic, Sequence, TypeVar
 
@@ -20,43 +19,45 @@ T = TypeVar('T')
 class DatabaseReadQuery(DatabaseAbstractQuery, Generic[T]):
     "Represents a context manager to execute a SELECT or SHOW query to a database"
 
-    def __init__(self, bot: "Axobot", cnx: MySQLConnection | CMySQLConnection, query: str, args: AnyTuple | AnyDict | None = None,
+    def __init__(self, bot: "Axobot", database: str, query: str, args: AnyTuple | AnyDict | None = None,
                  fetchone: bool = False, astuple: bool = False):
-        super().__init__(bot, cnx, query, args)
+        super().__init__(bot, database, query, args)
         self.fetchone = fetchone
         self.astuple = astuple
 
     async def __aenter__(self) -> T:
-        self.cursor = self.cnx.cursor(
+        return await super().__aenter__()
+
+    def _execute(self, cnx: MySQLConnection | CMySQLConnection) -> T:
+        cursor = cnx.cursor(
             dictionary=(not self.astuple)
         )
-
-        query_for_logs = await self._format_query()
-        self.log.debug("%s", query_for_logs)
-
-        start_time = time.time()
-
         try:
-            self.cursor.execute(self.query, self.args) # type: ignore
-        except errors.ProgrammingError as err:
-            self.log.error("%s", self.cursor._executed, exc_info=True) # type: ignore
-            await self.__aexit__(*sys.exc_info())
-            raise err
+            self._log_query(cursor)
 
-        return_type = tuple if self.astuple else dict
-        if self.fetchone:
-            one_row = self.cursor.fetchone()
-            result = return_type() if one_row is None else return_type(one_row) # type: ignore
-        else:
-            result = list(map(return_type, self.cursor.fetchall())) # type: ignore
-            # convert datetime objects to UTC
-            result = await convert_tzinfo(result)
+            start_time = time.perf_counter()
+            try:
+                cursor.execute(self.query, self.args) # type: ignore
+            except errors.ProgrammingError:
+                self.log.error("%s", cursor._executed, exc_info=True) # type: ignore
+                raise
 
-        await self._save_execution_time(start_time)
+            return_type = tuple if self.astuple else dict
+            if self.fetchone:
+                one_row = cursor.fetchone()
+                result = return_type() if one_row is None else return_type(one_row) # type: ignore
+                self._trace_query(cursor, start_time, int(one_row is not None))
+            else:
+                result = list(map(return_type, cursor.fetchall())) # type: ignore
+                self._trace_query(cursor, start_time, len(result))
+                # convert datetime objects to UTC
+                result = convert_tzinfo(result)
+        finally:
+            cursor.close()
         return result # type: ignore
 
 
-async def convert_tzinfo(result: Sequence[AnyDict | AnyTuple]) -> AnyList:
+def convert_tzinfo(result: Sequence[AnyDict | AnyTuple]) -> AnyList:
     """Converts datetime objects in a list of dictionaries or tuples to UTC timezone"""
     updated_result = []
     for row in result:
@@ -1,4 +1,3 @@
-import sys
 import time
 from typing import TYPE_CHECKING
 
@@ -15,37 +14,36 @@ if TYPE_CHECKING:
 class DatabaseWriteQuery(DatabaseAbstractQuery):
     "Represents a context manager to execute an INSERT, UPDATE, DELETE, or other write query to a database"
 
-    def __init__(self, bot: "Axobot", cnx: MySQLConnection | CMySQLConnection, query: str, args: AnyTuple | AnyDict | None = None,
+    def __init__(self, bot: "Axobot", database: str, query: str, args: AnyTuple | AnyDict | None = None,
                  multi: bool = False, returnrowcount: bool = False):
-        super().__init__(bot, cnx, query, args)
+        super().__init__(bot, database, query, args)
         self.multi = multi
         self.returnrowcount = returnrowcount
 
     async def __aenter__(self) -> int | None:
-        self.cursor = self.cnx.cursor()
-
-        query_for_logs = await self._format_query()
-        self.log.debug("%s", query_for_logs)
-
-        start_time = time.time()
+        return await super().__aenter__()
 
+    def _execute(self, cnx: MySQLConnection | CMySQLConnection) -> int | None:
+        cursor = cnx.cursor()
         try:
-            execute_result = self.cursor.execute(self.query, self.args, multi=self.multi) # type: ignore
-        except errors.ProgrammingError as err:
-            self.log.error("%s", self.cursor._executed, exc_info=True) # type: ignore
-            await self.__aexit__(*sys.exc_info())
-            raise err
-
-        if self.multi and execute_result is not None:
-            # make sure to execute every query
-            for _ in execute_result:
-                execute_result.send(None)
-        self.cnx.commit()
-
-        if self.returnrowcount:
-            result = self.cursor.rowcount
-        else:
-            result = self.cursor.lastrowid
-
-        await self._save_execution_time(start_time)
-        return result
+            self._log_query(cursor)
+
+            start_time = time.perf_counter()
+            try:
+                execute_result = cursor.execute(self.query, self.args, multi=self.multi) # type: ignore
+            except errors.ProgrammingError:
+                self.log.error("%s", cursor._executed, exc_info=True) # type: ignore
+                raise
+
+            if self.multi and execute_result is not None:
+                # make sure to execute every query
+                for _ in execute_result:
+                    execute_result.send(None)
+            cnx.commit()
+            self._trace_query(cursor, start_time, cursor.rowcount)
+
+            if self.returnrowcount:
+                return cursor.rowcount
+            return cursor.lastrowid
+        finally:
+            cursor.close()
@@ -1,31 +1,36 @@
+import logging
 import time
-from typing import TYPE_CHECKING
 
 from mysql.connector import errors
 from mysql.connector.cursor import (RE_PY_PARAM, MySQLCursor,
                                     _bytestr_format_dict, _ParamSubstitutor) # type: ignore
 from mysql.connector.cursor_cext import CMySQLCursor
 
+from core.database.query_tracer import QueryTracer
 from core.type_utils import AnyDict, AnyTuple
 
-if TYPE_CHECKING:
-    from core.bot_classes.axobot import Axobot
 
+def log_query(log: logging.Logger, cursor: MySQLCursor | CMySQLCursor, query: str, args: AnyTuple | AnyDict | None):
+    "Log a query with its arguments, only rendering it if the logger would actually emit it"
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("%s", format_query(cursor, query, args))
 
-async def save_execution_time(bot: "Axobot", start_time: float):
-    "Save the execution time of a query to the bot's stats cog."
-    if cog := bot.get_cog("BotStats"):
-        delta_ms = (time.time() - start_time) * 1000
-        cog.sql_performance_records.append(delta_ms)
+def trace_query(tracer: QueryTracer, log: logging.Logger, cursor: MySQLCursor | CMySQLCursor,
+                query: str, args: AnyTuple | AnyDict | None, start_time: float, rows: int):
+    "Record the execution time of a query, and log it if it was too slow"
+    duration_ms = (time.perf_counter() - start_time) * 1000
+    tracer.record(query, duration_ms, rows)
+    if tracer.is_slow(duration_ms):
+        log.warning("Slow query (%.1fms): %s", duration_ms, format_query(cursor, query, args))
 
-async def format_query(cursor: MySQLCursor | CMySQLCursor, query: str, args: AnyTuple | AnyDict | None):
+def format_query(cursor: MySQLCursor | CMySQLCursor, query: str, args: AnyTuple | AnyDict | None):
     "Create a formatted query string from the query and its arguments."
     if isinstance(cursor, MySQLCursor):
-        return await _format_query_native(cursor, query, args)
+        return _format_query_native(cursor, query, args)
     # else: theoretically CMySQLConnection
-    return await _format_query_c(cursor, query, args)
+    return _format_query_c(cursor, query, args)
 
-async def _format_query_native(cursor: MySQLCursor, operation: str | bytes, params: AnyTuple | AnyDict | None):
+def _format_query_native(cursor: MySQLCursor, operation: str | bytes, params: AnyTuple | AnyDict | None):
     # pylint: disable=protected-access
     try:
         if not isinstance(operation, bytes | bytearray):
@@ -46,7 +51,7 @@ async def _format_query_native(cursor: MySQLCursor, operation: str | bytes, para
                     "Not all parameters were used in the SQL statement")
     return stmt.decode("unicode_escape")
 
-async def _format_query_c(cursor: CMySQLCursor, operation: str | bytes, params: AnyTuple | AnyDict | None):
+def _format_query_c(cursor: CMySQLCursor, operation: str | bytes, params: AnyTuple | AnyDict | None):
     # pylint: disable=protected-access
     try:
         if isinstance(operation, str):
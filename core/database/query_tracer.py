@@ -0,0 +1,137 @@
+import math
+import random
+import re
+import threading
+from functools import lru_cache
+from typing import NamedTuple
+
+# queries slower than this are logged with their full content
+SLOW_QUERY_THRESHOLD_MS = 1000
+# max number of latency samples kept per statement to compute percentiles
+SAMPLES_PER_STATEMENT = 256
+# max number of distinct statements tracked, others are grouped together
+MAX_TRACKED_STATEMENTS = 500
+OTHER_STATEMENTS_KEY = "<other>"
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r"(?<![\w`])-?\d+(?:\.\d+)?(?![\w`])")
+_PLACEHOLDER_RE = re.compile(r"%(?:\(\w+\))?s")
+_VALUES_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LISTS_RE = re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def get_query_fingerprint(query: str) -> str:
+    """Normalize a query to group its executions together, no matter the values used:
+    literals and placeholders become '?', and lists of values are collapsed"""
+    fingerprint = _STRING_RE.sub("?", query)
+    fingerprint = _NUMBER_RE.sub("?", fingerprint)
+    fingerprint = _PLACEHOLDER_RE.sub("?", fingerprint)
+    fingerprint = _VALUES_LIST_RE.sub("(?+)", fingerprint)
+    fingerprint = _REPEATED_LISTS_RE.sub("(?+), ...", fingerprint)
+    return _WHITESPACE_RE.sub(" ", fingerprint).strip()
+
+
+class StatementStatsSummary(NamedTuple):
+    "Summary of the executions of one statement"
+    count: int
+    avg_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    avg_rows: float
+
+
+class StatementStats:
+    """Latency and rows count of the executions of one statement
+    Latencies are kept in a fixed-size random sample (reservoir sampling), to bound memory usage"""
+
+    __slots__ = ("count", "total_ms", "max_ms", "total_rows", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.total_rows = 0
+        self.samples: list[float] = []
+
+    def add(self, duration_ms: float, rows: int):
+        "Register a new execution"
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.total_rows += max(rows, 0)
+        if len(self.samples) < SAMPLES_PER_STATEMENT:
+            self.samples.append(duration_ms)
+        elif (index := random.randrange(self.count)) < SAMPLES_PER_STATEMENT:
+            self.samples[index] = duration_ms
+
+    def percentile(self, percent: float) -> float:
+        "Get the approximate latency percentile, using the nearest-rank method"
+        if not self.samples:
+            return 0.0
+        sorted_samples = sorted(self.samples)
+        rank = max(math.ceil(percent / 100 * len(sorted_samples)), 1)
+        return sorted_samples[rank - 1]
+
+    def summary(self) -> StatementStatsSummary:
+        "Get a summary of the registered executions"
+        count = max(self.count, 1)
+        return StatementStatsSummary(
+            count=self.count,
+            avg_ms=self.total_ms / count,
+            p50_ms=self.percentile(50),
+            p95_ms=self.percentile(95),
+            p99_ms=self.percentile(99),
+            max_ms=self.max_ms,
+            avg_rows=self.total_rows / count,
+        )
+
+
+class QueryTracer:
+    """Collect performance metrics about every executed query, grouped by statement fingerprint
+    Thread-safe, as queries are executed from the database worker threads"""
+
+    def __init__(self):
+        self.slow_query_threshold_ms: float = SLOW_QUERY_THRESHOLD_MS
+        self.__statements: dict[str, StatementStats] = {}
+        self.__window = StatementStats()
+        self.__lock = threading.Lock()
+
+    def record(self, query: str, duration_ms: float, rows: int):
+        "Register the execution of a query"
+        fingerprint = get_query_fingerprint(query)
+        with self.__lock:
+            if (stats := self.__statements.get(fingerprint)) is None:
+                if len(self.__statements) >= MAX_TRACKED_STATEMENTS:
+                    fingerprint = OTHER_STATEMENTS_KEY
+                stats = self.__statements.setdefault(fingerprint, StatementStats())
+            stats.add(duration_ms, rows)
+            self.__window.add(duration_ms, rows)
+
+    def is_slow(self, duration_ms: float) -> bool:
+        "Check if a query duration is above the slow query threshold"
+        return duration_ms >= self.slow_query_threshold_ms
+
+    def collect_window(self) -> StatementStatsSummary | None:
+        "Get a summary of every query executed since the last call, or None if no query was executed"
+        with self.__lock:
+            window, self.__window = self.__window, StatementStats()
+        if window.count == 0:
+            return None
+        return window.summary()
+
+    def get_statements_summary(self) -> dict[str, StatementStatsSummary]:
+        "Get a summary of each tracked statement since the bot started (or since the last reset)"
+        with self.__lock:
+            return {
+                fingerprint: stats.summary()
+                for fingerprint, stats in self.__statements.items()
+            }
+
+    def reset_statements(self):
+        "Forget about every tracked statement"
+        with self.__lock:
+            self.__statements.clear()
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Self
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop is to wake up a sleeping task, while used as an async context manager
+    A high lag means that something blocks the event loop"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.samples_count = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> Self:
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, value, traceback):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self.samples_count += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+    @property
+    def avg_lag_ms(self) -> float:
+        "Average measured lag, in milliseconds"
+        if self.samples_count == 0:
+            return 0.0
+        return self.total_lag / self.samples_count * 1000
+
+    @property
+    def max_lag_ms(self) -> float:
+        "Highest measured lag, in milliseconds"
+        return self.max_lag * 1000
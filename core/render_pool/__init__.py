@@ -0,0 +1,9 @@
+from .render_pool import (RenderJobStats, RenderPool, RenderPoolFullError,
+                          RenderTimeoutError)
+
+__all__ = [
+    "RenderJobStats",
+    "RenderPool",
+    "RenderPoolFullError",
+    "RenderTimeoutError",
+]
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, NamedTuple, TypeVar
+
+T = TypeVar('T')
+
+# number of worker processes rendering images at the same time
+MAX_RENDER_WORKERS = 2
+# max number of jobs waiting for a free worker before new jobs are refused
+MAX_WAITING_JOBS = 32
+# max duration of a single job, including the time spent waiting for a worker, in seconds
+DEFAULT_JOB_TIMEOUT = 30
+
+
+class RenderPoolFullError(RuntimeError):
+    "Raised when too many render jobs are already waiting for a worker"
+
+
+class RenderTimeoutError(RuntimeError):
+    "Raised when a render job takes too long"
+
+
+class RenderJobStats(NamedTuple):
+    "Metrics of one kind of render job"
+    count: int
+    failures: int
+    timeouts: int
+    avg_queue_wait: float
+    avg_render_time: float
+    max_render_time: float
+
+
+def _run_initializers(initializers: tuple[Callable[[], Any], ...]):
+    "Prepare a new worker process, usually by preloading the assets used by render jobs"
+    for initializer in initializers:
+        # a failing initializer would break the whole pool, while jobs can still work without it
+        try:
+            initializer()
+        except Exception: # pylint: disable=broad-except
+            logging.getLogger("bot.render").warning("[render] Worker initializer %s failed", initializer, exc_info=True)
+
+
+def _run_job(func: Callable[..., T], args: tuple[Any, ...]) -> tuple[T, float]:
+    "Run a render job inside a worker process, and measure its duration"
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class RenderPool:
+    """Run CPU-heavy image rendering in a pool of worker processes
+
+    Jobs must be module-level functions taking and returning picklable values, usually raw image bytes.
+    At most one job per worker runs at the same time, while the other ones wait in a bounded queue.
+    A job exceeding its timeout can't be interrupted, so its worker processes are replaced by new ones, and terminated
+    as soon as they don't run any other job still awaited."""
+
+    def __init__(self, max_workers: int = MAX_RENDER_WORKERS, max_waiting_jobs: int = MAX_WAITING_JOBS,
+                 job_timeout: float = DEFAULT_JOB_TIMEOUT):
+        self.max_workers = max_workers
+        self.max_waiting_jobs = max_waiting_jobs
+        self.job_timeout = job_timeout
+        self.log = logging.getLogger("bot.render")
+        self._executor: ProcessPoolExecutor | None = None
+        # jobs still awaited in each worker pool, current or replaced
+        self._awaited_jobs: dict[ProcessPoolExecutor, set[Future[Any]]] = {}
+        # processes of the replaced worker pools, to terminate once their awaited jobs are done
+        self._replaced_executors: dict[ProcessPoolExecutor, list[BaseProcess]] = {}
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._waiting_jobs = 0
+        self._initializers: list[Callable[[], Any]] = []
+        # map of job kind -> (count, failures, timeouts, total queue wait, total render time, max render time)
+        self._executions: dict[str, tuple[int, int, int, float, float, float]] = {}
+
+    @property
+    def waiting_jobs(self):
+        "Number of jobs waiting for a free worker"
+        return self._waiting_jobs
+
+    def _get_executor(self):
+        if self._executor is None:
+            # don't fork the bot process, with its threads and sockets
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_run_initializers, initargs=(tuple(self._initializers),)
+            )
+        return self._executor
+
+    def register_initializer(self, initializer: Callable[[], Any]):
+        """Register a module-level function called once in each new worker process, before its first job
+        Workers are started on the first job, so workers already running won't call it: it must only be used for
+        optimizations like assets preloading"""
+        if initializer not in self._initializers:
+            self._initializers.append(initializer)
+
+    def _replace_executor(self):
+        "Drop the current worker processes, new ones being started for the next job"
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            # the processes list is cleared by the shutdown
+            processes = executor._processes or {} # pylint: disable=protected-access
+            self._replaced_executors[executor] = list(processes.values())
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._terminate_if_unused(executor)
+
+    def _terminate_if_unused(self, executor: ProcessPoolExecutor):
+        "Kill the processes of a replaced worker pool once none of its jobs is awaited anymore"
+        if self._awaited_jobs.get(executor) or (processes := self._replaced_executors.pop(executor, None)) is None:
+            return
+        self._awaited_jobs.pop(executor, None)
+        for process in processes:
+            # the remaining jobs can't be stopped otherwise
+            if process.is_alive():
+                process.terminate()
+
+    async def submit(self, kind: str, func: Callable[..., T], *args: Any, timeout: float | None = None) -> T:
+        """Run a render function inside a worker process and return its result
+        Raise RenderPoolFullError if too many jobs are waiting, or RenderTimeoutError if the job takes too long"""
+        timeout = self.job_timeout if timeout is None else timeout
+        start = time.perf_counter()
+        if self._semaphore.locked():
+            # every worker is busy: wait in the queue, if it isn't full
+            if self._waiting_jobs >= self.max_waiting_jobs:
+                self._register_execution(kind, failed=True)
+                raise RenderPoolFullError("Too many images are being generated, please try again later")
+            self._waiting_jobs += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=timeout)
+            except asyncio.TimeoutError:
+                self._on_timeout(kind, timeout)
+            finally:
+                self._waiting_jobs -= 1
+        else:
+            await self._semaphore.acquire()
+        try:
+            queue_wait = time.perf_counter() - start
+            return await asyncio.wait_for(self._run(kind, func, args, queue_wait), timeout=timeout - queue_wait)
+        except asyncio.TimeoutError:
+            self._on_timeout(kind, timeout)
+        finally:
+            self._semaphore.release()
+
+    def _on_timeout(self, kind: str, timeout: float):
+        self.log.warning("[render] %s job timed out after %ss", kind, timeout)
+        self._register_execution(kind, timed_out=True)
+        raise RenderTimeoutError("Image generation took too long") from None
+
+    async def _run(self, kind: str, func: Callable[..., T], args: tuple[Any, ...], queue_wait: float) -> T:
+        executor = self._get_executor()
+        future = executor.submit(_run_job, func, args)
+        awaited_jobs = self._awaited_jobs.setdefault(executor, set())
+        awaited_jobs.add(future)
+        try:
+            result, render_time = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.running() and executor is self._executor:
+                # the job can't be stopped: move the other jobs to new workers, and terminate this one when possible
+                self._replace_executor()
+            raise
+        except BrokenProcessPool:
+            self._replace_executor()
+            self._register_execution(kind, failed=True)
+            raise RuntimeError("Image generation failed") from None
+        except Exception:
+            self._register_execution(kind, failed=True)
+            raise
+        finally:
+            awaited_jobs.discard(future)
+            self._terminate_if_unused(executor)
+        self._register_execution(kind, queue_wait=queue_wait, render_time=render_time)
+        return result
+
+    def _register_execution(self, kind: str, queue_wait: float = 0.0, render_time: float = 0.0,
+                            failed: bool = False, timed_out: bool = False):
+        count, failures, timeouts, total_wait, total_render, max_render = self._executions.get(
+            kind, (0, 0, 0, 0.0, 0.0, 0.0)
+        )
+        if failed:
+            failures += 1
+        elif timed_out:
+            timeouts += 1
+        else:
+            count += 1
+            total_wait += queue_wait
+            total_render += render_time
+            max_render = max(max_render, render_time)
+        self._executions[kind] = (count, failures, timeouts, total_wait, total_render, max_render)
+
+    def collect_stats(self) -> dict[str, RenderJobStats]:
+        "Get the metrics of each kind of render job since the last call"
+        executions, self._executions = self._executions, {}
+        return {
+            kind: RenderJobStats(
+                count=count,
+                failures=failures,
+                timeouts=timeouts,
+                avg_queue_wait=total_wait / count if count else 0.0,
+                avg_render_time=total_render / count if count else 0.0,
+                max_render_time=max_render,
+            )
+            for kind, (count, failures, timeouts, total_wait, total_render, max_render) in executions.items()
+        }
+
+    def shutdown(self):
+        "Stop the worker processes, without waiting for running jobs"
+        self._replace_executor()
+        self._awaited_jobs.clear()
+        for executor in list(self._replaced_executors):
+            self._terminate_if_unused(executor)
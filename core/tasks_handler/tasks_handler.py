@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import heapq
 import json
 import logging
 import re
-from datetime import timedelta, timezone
-from typing import TYPE_CHECKING
+import time
+from datetime import timezone
+from typing import TYPE_CHECKING, NamedTuple
 
 import discord
 
@@ -18,121 +21,330 @@ from .views import RecreateReminderView
 if TYPE_CHECKING:
     from core.bot_classes import Axobot
 
+# max number of tasks executed at the same time
+MAX_CONCURRENT_TASKS = 8
+# delay between two checks of the database for due tasks we may have missed, in seconds
+RECONCILIATION_INTERVAL = 600
+# max number of tasks removed by a single query
+REMOVAL_BATCH_SIZE = 500
+
+
+class TaskActionStats(NamedTuple):
+    "Execution metrics of one kind of task"
+    count: int
+    per_second: float
+    avg_lag: float
+    max_lag: float
+
+
 class TaskHandler:
-    "Handler for timed tasks (like reminders or planned unban)"
+    """Handler for timed tasks (like reminders or planned unban)
+
+    Due times of every task are kept in memory in a min-heap, so that the scheduler can sleep exactly until the next
+    due task without polling the database. Heap entries are lazily invalidated when a task is edited or removed."""
 
     def __init__(self, bot: Axobot):
         self.bot = bot
         self.log = logging.getLogger("bot.tasks")
+        # heap of (due timestamp, task ID)
+        self._due_heap: list[tuple[float, int]] = []
+        # map of task ID -> (begin timestamp, due timestamp) of every scheduled task
+        self._scheduled: dict[int, tuple[float, float]] = {}
+        self._loaded = False
+        # whether the `end_date` generated column exists, so that due tasks can be found through its index
+        self._end_date_indexed = False
+        self._next_reconciliation = 0.0
+        self._wakeup = asyncio.Event()
+        self._execution_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+        self._scheduler_task: asyncio.Task[None] | None = None
+        # map of action -> (completed tasks count, total lag, max lag) since the last stats collection
+        self._executions: dict[str, tuple[int, float, float]] = {}
+        self._stats_window_start = time.monotonic()
+
+    def start(self):
+        "Start the tasks scheduler in the background"
+        if self._scheduler_task is None or self._scheduler_task.done():
+            self._scheduler_task = asyncio.create_task(self._scheduler_loop())
+
+    def stop(self):
+        "Stop the tasks scheduler"
+        if self._scheduler_task is not None:
+            self._scheduler_task.cancel()
+            self._scheduler_task = None
+
+    def _schedule(self, task_id: int, begin: float, duration: int):
+        "Register or update the due time of a task, and wake the scheduler up if needed"
+        due = begin + duration
+        self._scheduled[task_id] = (begin, due)
+        heapq.heappush(self._due_heap, (due, task_id))
+        if self._due_heap[0][1] == task_id:
+            self._wakeup.set()
+
+    def _unschedule(self, task_id: int):
+        "Forget about a task (its heap entry will be skipped)"
+        self._scheduled.pop(task_id, None)
+
+    def _pop_due_task_ids(self) -> list[int]:
+        "Remove every due task from the heap and return their IDs"
+        now = time.time()
+        task_ids: list[int] = []
+        while self._due_heap and self._due_heap[0][0] <= now:
+            due, task_id = heapq.heappop(self._due_heap)
+            # skip outdated entries of edited or removed tasks
+            if (scheduled := self._scheduled.get(task_id)) is not None and scheduled[1] == due:
+                del self._scheduled[task_id]
+                task_ids.append(task_id)
+        return task_ids
+
+    def _get_next_wakeup_delay(self) -> float:
+        "Get the number of seconds to wait before the next due task or the next reconciliation"
+        next_time = self._next_reconciliation
+        if self._due_heap:
+            next_time = min(next_time, self._due_heap[0][0])
+        return max(next_time - time.time(), 0)
 
-    async def get_events_from_db(self, get_all: bool = False) -> list[DbTask]:
-        """Renvoie une liste de tous les events qui doivent être exécutés"""
+    async def _scheduler_loop(self):
+        "Execute the tasks as soon as they are due"
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                if not self.bot.database_online:
+                    await asyncio.sleep(60)
+                    continue
+                if not self._loaded:
+                    await self.load_tasks()
+                if time.time() >= self._next_reconciliation:
+                    await self.reconcile_due_tasks()
+                await self.check_tasks()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._get_next_wakeup_delay())
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                self.bot.dispatch("error", err, "In the tasks scheduler")
+                await asyncio.sleep(5)
+
+    async def create_end_date_column(self):
+        "Add the indexed due date column to the tasks table, if it doesn't exist yet"
         try:
-            query = "SELECT * FROM `timed` WHERE beta=%s"
-            events: list[DbTask] = []
+            query = "SHOW COLUMNS FROM `timed` LIKE 'end_date'"
+            async with self.bot.db_main.read(query) as query_results:
+                if not query_results:
+                    query = (
+                        "ALTER TABLE `timed` "
+                        "ADD COLUMN `end_date` DATETIME AS (`begin` + INTERVAL `duration` SECOND) STORED, "
+                        "ADD INDEX `beta_end_date` (`beta`, `end_date`)"
+                    )
+                    async with self.bot.db_main.write(query):
+                        pass
+            self._end_date_indexed = True
+        except Exception as err:  # pylint: disable=broad-except
+            self.bot.dispatch("error", err, "While creating the tasks end_date column")
+
+    async def load_tasks(self):
+        "Load the due time of every task from the database"
+        if not self._end_date_indexed:
+            await self.create_end_date_column()
+        query = "SELECT `ID`, `begin`, `duration` FROM `timed` WHERE beta=%s"
+        async with self.bot.db_main.read(query, (self.bot.beta,)) as query_results:
+            rows: list[DbTask] = query_results # type: ignore
+        self._due_heap = []
+        self._scheduled = {}
+        for row in rows:
+            self._schedule(row["ID"], row["begin"].replace(tzinfo=timezone.utc).timestamp(), row["duration"])
+        self._loaded = True
+        self._next_reconciliation = time.time() + RECONCILIATION_INTERVAL
+        self.log.info("Loaded %s timed tasks", len(rows))
+
+    async def reconcile_due_tasks(self):
+        """Schedule every due task from the database, in case some were missed
+        (like tasks edited directly in the database, or tasks that could not be executed yet)"""
+        self._next_reconciliation = time.time() + RECONCILIATION_INTERVAL
+        for row in await self.get_due_tasks_from_db():
+            self._schedule(row["ID"], row["begin"].timestamp(), row["duration"])
+
+    async def get_due_tasks_from_db(self) -> list[DbTask]:
+        "Get every task that should have been executed by now"
+        try:
+            if self._end_date_indexed:
+                query = "SELECT * FROM `timed` WHERE beta=%s AND `end_date` <= CURRENT_TIMESTAMP()"
+            else:
+                # full table scan, if the column could not be created
+                query = "SELECT * FROM `timed` WHERE beta=%s AND `begin` + INTERVAL `duration` SECOND <= CURRENT_TIMESTAMP()"
             async with self.bot.db_main.read(query, (self.bot.beta,)) as query_results:
-                for row in query_results: # type: ignore
-                    row: DbTask
-                    row["begin"] = row["begin"].replace(tzinfo=timezone.utc)
-                    if get_all:
-                        events.append(row)
-                    else:
-                        now = self.bot.utcnow()
-                        if row["begin"] + timedelta(seconds=row["duration"]) < now:
-                            events.append(row)
-            return events
+                rows: list[DbTask] = query_results # type: ignore
+            for row in rows:
+                row["begin"] = row["begin"].replace(tzinfo=timezone.utc)
+            return rows
+        except Exception as err:  # pylint: disable=broad-except
+            self.bot.dispatch("error", err)
+            return []
+
+    async def get_tasks_from_db(self, task_ids: list[int]) -> list[DbTask]:
+        "Get some tasks from their IDs"
+        try:
+            placeholders = ",".join(["%s"] * len(task_ids))
+            query = f"SELECT * FROM `timed` WHERE beta=%s AND `ID` IN ({placeholders})"
+            async with self.bot.db_main.read(query, (self.bot.beta, *task_ids)) as query_results:
+                rows: list[DbTask] = query_results # type: ignore
+            for row in rows:
+                row["begin"] = row["begin"].replace(tzinfo=timezone.utc)
+            return rows
         except Exception as err:  # pylint: disable=broad-except
             self.bot.dispatch("error", err)
             return []
 
     async def check_tasks(self):
-        "Fetch and execute pending tasks"
-        await self.bot.wait_until_ready()
+        """Execute every task whose due time has passed
+        Completed tasks are then removed from the database in a single transaction"""
         if not self.bot.database_online:
             return
-        tasks_list = await self.get_events_from_db()
+        due_task_ids = self._pop_due_task_ids()
+        if len(due_task_ids) == 0:
+            return
+        # removed tasks will simply not be found
+        tasks_list = await self.get_tasks_from_db(due_task_ids)
         if len(tasks_list) == 0:
             return
-        self.log.debug("Iterating (%s tasks found)", len(tasks_list))
-        for task in tasks_list:
+        self.log.debug("Executing %s tasks", len(tasks_list))
+        results = await asyncio.gather(*(self.execute_task(task) for task in tasks_list))
+        completed_tasks = [task for task, completed in zip(tasks_list, results) if completed]
+        if len(completed_tasks) == 0:
+            return
+        try:
+            await self.remove_tasks([task["ID"] for task in completed_tasks])
+        except Exception as err:  # pylint: disable=broad-except
+            # they will be executed again after the next reconciliation
+            self.bot.dispatch("error", err, "When removing completed tasks")
+            return
+        now = time.time()
+        for task in completed_tasks:
+            self._record_execution(task["action"], now - task["begin"].timestamp() - task["duration"])
+
+    async def execute_task(self, task: DbTask) -> bool:
+        """Execute a due task, with a limited number of concurrent executions
+        Returns True if the task is completed and should be removed"""
+        async with self._execution_semaphore:
             if task["action"] == "mute" and task["guild"]:
-                try:
-                    guild = self.bot.get_guild(task["guild"])
-                    if guild is None:
-                        continue
-                    user = guild.get_member(task["user"])
-                    if user is None:
-                        continue
-                    try:
-                        await self.bot.get_cog("Moderation").unmute_member(guild, user, guild.me)
-                    except discord.Forbidden:
-                        continue
-                    self.bot.dispatch("tempmute_expiration", guild, user, task["begin"])
-                    await self.remove_task(task["ID"])
-                except Exception as err:  # pylint: disable=broad-except
-                    self.bot.dispatch("error", err)
-                    self.log.error("Unmute: Unable to auto unmute %s", err)
+                return await self._execute_unmute(task)
             if task["action"] == "ban" and task["guild"]:
-                try:
-                    guild = self.bot.get_guild(task["guild"])
-                    if guild is None:
-                        continue
-                    try:
-                        user = await self.bot.fetch_user(task["user"])
-                    except discord.DiscordException:
-                        continue
-                    try:
-                        await guild.unban(user, reason="Temp ban expired"+self.bot.zws)
-                    except discord.Forbidden:
-                        await self.remove_task(task["ID"])
-                        continue
-                    self.bot.dispatch("tempban_expiration", guild, user, task["begin"])
-                    await self.remove_task(task["ID"])
-                except discord.errors.NotFound:
-                    await self.remove_task(task["ID"])
-                except Exception as err:  # pylint: disable=broad-except
-                    self.bot.dispatch("error", err)
-                    self.log.error("Unban: Unable to auto unban: %s", err)
+                return await self._execute_unban(task)
             if task["action"] == "timer":
-                try:
-                    sent = await self.task_timer(task)
-                except discord.errors.NotFound:
-                    await self.remove_task(task["ID"])
-                except Exception as err:  # pylint: disable=broad-except
-                    self.bot.dispatch("error", err)
-                    self.log.error("Reminder: Unable to send timer: %s", err)
-                else:
-                    if sent:
-                        await self.remove_task(task["ID"])
+                return await self._execute_reminder(task)
             if task["action"] == "role-grant" and task["guild"] and task["data"]:
+                return await self._execute_role_removal(task)
+        return False
+
+    def _record_execution(self, action: str, lag: float):
+        "Register the completion of a task, with the delay between its due time and its execution"
+        count, total_lag, max_lag = self._executions.get(action, (0, 0.0, 0.0))
+        lag = max(lag, 0.0)
+        self._executions[action] = (count + 1, total_lag + lag, max(max_lag, lag))
+
+    def collect_stats(self) -> dict[str, TaskActionStats]:
+        "Get the execution metrics of each kind of task since the last call"
+        now = time.monotonic()
+        elapsed = max(now - self._stats_window_start, 1)
+        executions, self._executions = self._executions, {}
+        self._stats_window_start = now
+        return {
+            action: TaskActionStats(
+                count=count,
+                per_second=count / elapsed,
+                avg_lag=total_lag / count,
+                max_lag=max_lag,
+            )
+            for action, (count, total_lag, max_lag) in executions.items()
+        }
+
+    async def _execute_unmute(self, task: DbTask) -> bool:
+        "Unmute a member at the end of a tempmute"
+        try:
+            guild = self.bot.get_guild(task["guild"])
+            if guild is None:
+                return False
+            user = guild.get_member(task["user"])
+            if user is None:
+                return False
+            try:
+                await self.bot.get_cog("Moderation").unmute_member(guild, user, guild.me)
+            except discord.Forbidden:
+                return False
+            self.bot.dispatch("tempmute_expiration", guild, user, task["begin"])
+            return True
+        except Exception as err:  # pylint: disable=broad-except
+            self.bot.dispatch("error", err)
+            self.log.error("Unmute: Unable to auto unmute %s", err)
+            return False
+
+    async def _execute_unban(self, task: DbTask) -> bool:
+        "Unban a user at the end of a tempban"
+        try:
+            guild = self.bot.get_guild(task["guild"])
+            if guild is None:
+                return False
+            try:
+                user = await self.bot.fetch_user(task["user"])
+            except discord.DiscordException:
+                return False
+            try:
+                await guild.unban(user, reason="Temp ban expired"+self.bot.zws)
+            except discord.Forbidden:
+                return True
+            self.bot.dispatch("tempban_expiration", guild, user, task["begin"])
+            return True
+        except discord.errors.NotFound:
+            return True
+        except Exception as err:  # pylint: disable=broad-except
+            self.bot.dispatch("error", err)
+            self.log.error("Unban: Unable to auto unban: %s", err)
+            return False
+
+    async def _execute_reminder(self, task: DbTask) -> bool:
+        "Send a reminder"
+        try:
+            return await self.task_timer(task)
+        except discord.errors.NotFound:
+            return True
+        except Exception as err:  # pylint: disable=broad-except
+            self.bot.dispatch("error", err)
+            self.log.error("Reminder: Unable to send timer: %s", err)
+            return False
+
+    async def _execute_role_removal(self, task: DbTask) -> bool:
+        "Remove a temporary role from a member"
+        try:
+            guild = self.bot.get_guild(task["guild"])
+            if guild is None:
+                return False
+            user = guild.get_member(task["user"])
+            if user is None:
+                return False
+            try:
+                data = json.loads(task["data"])
+            except (json.JSONDecodeError, KeyError):
+                return False
+            role = guild.get_role(data["role"])
+            if role is not None:
                 try:
-                    guild = self.bot.get_guild(task["guild"])
-                    if guild is None:
-                        continue
-                    user = guild.get_member(task["user"])
-                    if user is None:
-                        continue
-                    try:
-                        data = json.loads(task["data"])
-                    except (json.JSONDecodeError, KeyError):
-                        continue
-                    role = guild.get_role(data["role"])
-                    if role is not None:
-                        try:
-                            await user.remove_roles(role, reason="Temp role expired")
-                        except discord.Forbidden:
-                            self.bot.dispatch(
-                                "server_warning",
-                                ServerWarningType.TEMP_ROLE_REMOVE_FORBIDDEN,
-                                guild,
-                                role=role,
-                                user=user
-                            )
-                            self.log.warning("RoleGrant: Unable to remove temporary role: Forbidden")
-                    await self.remove_task(task["ID"])
-                except Exception as err:  # pylint: disable=broad-except
-                    self.bot.dispatch("error", err)
-                    self.log.error("RoleGrant: Unable to remove temporary role: %s", err)
+                    await user.remove_roles(role, reason="Temp role expired")
+                except discord.Forbidden:
+                    self.bot.dispatch(
+                        "server_warning",
+                        ServerWarningType.TEMP_ROLE_REMOVE_FORBIDDEN,
+                        guild,
+                        role=role,
+                        user=user
+                    )
+                    self.log.warning("RoleGrant: Unable to remove temporary role: Forbidden")
+            return True
+        except Exception as err:  # pylint: disable=broad-except
+            self.bot.dispatch("error", err)
+            self.log.error("RoleGrant: Unable to remove temporary role: %s", err)
+            return False
 
     async def _get_or_fetch_user(self, user_id: int):
         if user := self.bot.get_user(user_id):
@@ -214,14 +426,12 @@ class TaskHandler:
     async def add_task(self, action: str, duration: int, userid: int, guildid: int | None = None,
                        channelid: int | None = None, message: str | None = None, data: AnyDict | None = None):
         """Add a task to the list"""
-        tasks_list = await self.get_events_from_db(get_all=True)
-        for task in tasks_list:
-            if (task["user"] == userid
-                    and task["guild"] == guildid
-                    and task["action"] == action
-                    and task["channel"] == channelid
-                    and task["action"] != "timer"):
-                return await self.update_duration(task["ID"], duration)
+        if action != "timer":
+            query = "SELECT `ID` FROM `timed` WHERE `user`=%s AND `guild`<=>%s AND `action`=%s AND `channel`<=>%s \
+AND `beta`=%s LIMIT 1"
+            async with self.bot.db_main.read(query, (userid, guildid, action, channelid, self.bot.beta)) as query_results:
+                if query_results:
+                    return await self.update_duration(query_results[0]["ID"], duration)
         query = "INSERT INTO `timed` (`guild`,`channel`,`user`,`action`,`duration`,`message`, `data`, `beta`) VALUES (%(guild)s,%(channel)s,%(user)s,%(action)s,%(duration)s,%(message)s,%(data)s,%(beta)s)"
         query_args = {
             "guild": guildid,
@@ -233,29 +443,53 @@ class TaskHandler:
             "data": None if data is None else json.dumps(data),
             "beta": self.bot.beta
         }
-        async with self.bot.db_main.write(query, query_args):
+        async with self.bot.db_main.write(query, query_args) as task_id:
             pass
+        if task_id is not None:
+            self._schedule(task_id, time.time(), duration)
         return True
 
     async def update_duration(self, task_id: int, new_duration: int):
         """Edit a task duration"""
-        query = f"UPDATE `timed` SET `duration`={new_duration} WHERE `ID`={task_id}"
-        async with self.bot.db_main.write(query):
+        query = "UPDATE `timed` SET `duration`=%s WHERE `ID`=%s"
+        async with self.bot.db_main.write(query, (new_duration, task_id)):
             pass
+        if (scheduled := self._scheduled.get(task_id)) is not None:
+            self._schedule(task_id, scheduled[0], new_duration)
+        else:
+            # let the next reconciliation find it if it's already due
+            self._next_reconciliation = min(self._next_reconciliation, time.time() + new_duration)
+            self._wakeup.set()
         return True
 
     async def remove_task(self, task_id: int):
         """Remove a task (usually after execution)"""
-        query = f"DELETE FROM `timed` WHERE `timed`.`ID` = {task_id}"
-        async with self.bot.db_main.write(query):
+        query = "DELETE FROM `timed` WHERE `timed`.`ID` = %s"
+        async with self.bot.db_main.write(query, (task_id,)):
             pass
+        self._unschedule(task_id)
         return True
 
+    async def remove_tasks(self, task_ids: list[int]):
+        """Remove multiple tasks at once, in a single transaction"""
+        async with self.bot.db_main.multi() as db_query:
+            for i in range(0, len(task_ids), REMOVAL_BATCH_SIZE):
+                chunk = task_ids[i:i+REMOVAL_BATCH_SIZE]
+                placeholders = ",".join(["%s"] * len(chunk))
+                await db_query.write(f"DELETE FROM `timed` WHERE `ID` IN ({placeholders})", chunk)
+        for task_id in task_ids:
+            self._unschedule(task_id)
+
     async def cancel_unmute(self, user_id: int, guild_id: int):
         """Cancel every automatic unmutes for a member"""
         try:
-            query = "DELETE FROM `timed` WHERE action='mute' AND guild=%s AND user=%s AND beta=%s;"
-            async with self.bot.db_main.write(query, (guild_id, user_id, self.bot.beta)):
+            where = "action='mute' AND guild=%s AND user=%s AND beta=%s"
+            async with self.bot.db_main.read(f"SELECT `ID` FROM `timed` WHERE {where}",
+                                             (guild_id, user_id, self.bot.beta)) as query_results:
+                task_ids: list[int] = [row["ID"] for row in query_results]
+            async with self.bot.db_main.write(f"DELETE FROM `timed` WHERE {where};", (guild_id, user_id, self.bot.beta)):
                 pass
+            for task_id in task_ids:
+                self._unschedule(task_id)
         except Exception as err:  # pylint: disable=broad-except
             self.bot.dispatch("error", err)
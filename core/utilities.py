@@ -9,6 +9,7 @@ from cachetools import TTLCache
 from discord.ext import commands
 
 from core.bot_classes import Axobot, MyContext
+from core.caching.user_languages_index import UserLanguagesIndex
 from core.type_utils import UserOrMember
 
 
@@ -37,6 +38,7 @@ class Utilities(commands.Cog):
         self._config: _ConfigDict | None = None
         self.table = "users"
         self.new_pp = False
+        self.user_languages = UserLanguagesIndex(max_users=100_000)
         bot.add_check(self.global_check)
 
     async def cog_unload(self):
@@ -152,23 +154,77 @@ class Utilities(commands.Cog):
         If limit=0, return every languages"""
         if not self.bot.database_online:
             return [("en", 1.0)]
-        languages = []
+        if (languages := self.user_languages.get(user.id)) is None:
+            languages = await self._index_user_languages(user)
+        total = languages.total()
         disp_lang: list[tuple[str, float]] = []
         available_langs: list[str] = (await self.bot.get_options_list())["language"]["values"] # type: ignore
-        for guild in user.mutual_guilds:
-            lang: str = await self.bot.get_config(guild.id, "language") # type: ignore
-            languages.append(lang)
         for lang in available_langs:
-            if (count := languages.count(lang)) > 0:
+            if (count := languages[lang]) > 0:
                 disp_lang.append((
                     lang,
-                    round(count/len(languages), 2)
+                    round(count/total, 2)
                 ))
         disp_lang.sort(key=operator.itemgetter(1), reverse=True)
         if limit == 0:
             return disp_lang
         return disp_lang[:limit]
 
+    async def _index_user_languages(self, user: UserOrMember):
+        "Count the languages of the mutual guilds of a user, fetching the unknown guild languages in one query"
+        guild_ids = [guild.id for guild in user.mutual_guilds]
+        unknown_guild_ids: list[int] = []
+        config_cog = self.bot.get_cog("ServerConfig")
+        for guild_id in guild_ids:
+            if guild_id in self.user_languages.guild_languages:
+                continue
+            if config_cog is not None and (snapshot := config_cog.raw_cache.get(guild_id)) is not None:
+                language = snapshot.get("language") or await self._get_default_language()
+                self.user_languages.guild_languages[guild_id] = language
+            else:
+                unknown_guild_ids.append(guild_id)
+        if unknown_guild_ids:
+            if config_cog is None:
+                raise RuntimeError("ServerConfig cog not loaded, cannot get guilds languages")
+            values = await config_cog.db_get_raw_values(unknown_guild_ids, "language")
+            default_language = await self._get_default_language()
+            for guild_id in unknown_guild_ids:
+                # a language change received during the query is more recent
+                self.user_languages.guild_languages.setdefault(guild_id, values.get(guild_id, default_language))
+        return self.user_languages.set(user.id, guild_ids)
+
+    async def _get_default_language(self) -> str:
+        return (await self.bot.get_options_list())["language"]["default"] # type: ignore
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        "Keep the user languages index up to date"
+        self.user_languages.add_member(member.id, member.guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        "Keep the user languages index up to date"
+        self.user_languages.remove_member(member.id, member.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        "Recompute the languages of the indexed members of a new guild on next access"
+        self.user_languages.forget_guild(guild.id, (member.id for member in guild.members))
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        "Recompute the languages of the indexed members of a left guild on next access"
+        self.user_languages.forget_guild(guild.id, (member.id for member in guild.members))
+
+    @commands.Cog.listener()
+    async def on_config_option_change(self, guild_id: int, option_name: str | None, raw_value: str | None):
+        "Update the user languages index when a guild changes its language"
+        if option_name not in {None, "language"}:
+            return
+        member_ids = (member.id for member in guild.members) if (guild := self.bot.get_guild(guild_id)) else ()
+        language = raw_value or await self._get_default_language()
+        self.user_languages.set_guild_language(guild_id, language, member_ids)
+
     async def check_votes(self, userid: int) -> list[tuple[str, str]]:
         """check if a user voted on any bots list website"""
         if self.bot.user is None:
@@ -453,6 +453,39 @@ class Admin(commands.Cog):
             txt = "\n".join(f"{result[0]:>{length}}: {result[1]} MB" for result in query_results if result[1] is not None)
         await interaction.followup.send("```yaml\n" + txt + "\n```")
 
+    @db_group.command(name="queries-stats")
+    @app_commands.describe(
+        sort_by="The metric used to sort the statements",
+        reset="Forget about every tracked statement after displaying them",
+    )
+    async def db_queries_stats(self, interaction: discord.Interaction,
+                               sort_by: Literal["total", "p95", "count", "rows"] = "total", reset: bool = False):
+        "Affiche les requêtes SQL les plus coûteuses depuis le démarrage"
+        statements = self.bot.db.tracer.get_statements_summary()
+        if reset:
+            self.bot.db.tracer.reset_statements()
+        if not statements:
+            await interaction.response.send_message("No query has been executed yet")
+            return
+        sort_keys = {
+            "total": lambda item: item[1].avg_ms * item[1].count,
+            "p95": lambda item: item[1].p95_ms,
+            "count": lambda item: item[1].count,
+            "rows": lambda item: item[1].avg_rows,
+        }
+        txt = ""
+        for fingerprint, stats in sorted(statements.items(), key=sort_keys[sort_by], reverse=True)[:8]:
+            query = fingerprint if len(fingerprint) < 150 else fingerprint[:150] + "..."
+            txt += f"{query}\n    count: {stats.count} | avg rows: {stats.avg_rows:.1f} | p50: {stats.p50_ms:.1f}ms"\
+                f" | p95: {stats.p95_ms:.1f}ms | p99: {stats.p99_ms:.1f}ms | max: {stats.max_ms:.1f}ms\n"
+        await interaction.response.send_message("```yaml\n" + txt[:1980] + "\n```")
+
+    @db_group.command(name="slow-threshold")
+    async def db_slow_threshold(self, interaction: discord.Interaction, milliseconds: app_commands.Range[int, 1]):
+        "Modifie la durée à partir de laquelle une requête SQL est considérée comme lente"
+        self.bot.db.tracer.slow_query_threshold_ms = milliseconds
+        await interaction.response.send_message(f"Queries slower than {milliseconds}ms will now be logged")
+
     @cached(TTLCache(1, 3600))
     async def get_databases_names(self) -> list[str]:
         "Get every database names visible for the bot"
@@ -1,15 +1,16 @@
 import re
-from collections import defaultdict
 from datetime import timedelta
 from typing import Literal
 
 import discord
 from cachetools import TTLCache
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from core.bot_classes import DISCORD_INVITE_REGEX, Axobot
 from core.text_cleanup import sync_check_discord_invite
 
+from .src.decaying_counter import DecayingCounter
+
 AutoActionType = Literal["timeout", "kick", "ban"]
 CheckType = Literal["mentions", "invites", "attachments", "account_creation"]
 
@@ -33,20 +34,12 @@ class AntiRaid(commands.Cog):
         self.file = "antiraid"
         # Cache of raider status for (guild_id, user_id) - True if raider detected
         self.check_cache = TTLCache[tuple[int, int], bool](maxsize=10_000, ttl=60)
-        # Cache of mentions sent by users - decreased every minute
-        self.mentions_score: defaultdict[int, int] = defaultdict(int)
-        # Cache of discord invites sent by users - decreased every minute
-        self.invites_score: defaultdict[int, int] = defaultdict(int)
-        # Cache of attachments sent by users - decreased every minute
-        self.attachments_score: defaultdict[int, int] = defaultdict(int)
-
-    async def cog_load(self):
-        # pylint: disable=no-member
-        self.decrease_users_scores.start()
-
-    async def cog_unload(self):
-         # pylint: disable=no-member
-        self.decrease_users_scores.cancel()
+        # Mentions sent by (guild_id, user_id) - decreased by 2 every 30s
+        self.mentions_score = DecayingCounter[tuple[int, int]](decay_amount=2, decay_interval=30)
+        # Discord invites sent by (guild_id, user_id) - decreased by 1 every 30s
+        self.invites_score = DecayingCounter[tuple[int, int]](decay_amount=1, decay_interval=30)
+        # Attachments sent by (guild_id, user_id) - decreased by 2 every 30s
+        self.attachments_score = DecayingCounter[tuple[int, int]](decay_amount=2, decay_interval=30)
 
     @commands.Cog.listener(name="on_message")
     async def on_message_anticaps(self, msg: discord.Message):
@@ -266,30 +259,25 @@ class AntiRaid(commands.Cog):
         # if the antiraid is disabled
         if await self._get_raid_level(message.guild) == 0:
             return
+        score_key = (message.guild.id, message.author.id)
         # 1. Check mentions
         raw_mentions = [mention for mention in message.raw_mentions if mention != message.author.id]
         if mentions_count := len(raw_mentions):
-            # add users mentions count to the user score
-            self.mentions_score[message.author.id] += mentions_count
-        # if mentions score is higher than 0, apply sanctions
-        if mentions_count != 0 and self.mentions_score[message.author.id] > 0:
+            # add users mentions count to the user score, and apply sanctions
+            self.mentions_score.add(score_key, mentions_count)
             await self.check_mentions_score(message.author)
         # 2. Check invites
         if invites_count := len(DISCORD_INVITE_REGEX.findall(message.content)):
-            self.invites_score[message.author.id] += invites_count
-        # if invites score is higher than 0, apply sanctions
-        if invites_count != 0 and self.invites_score[message.author.id] > 0:
+            self.invites_score.add(score_key, invites_count)
             await self.check_invites_score(message.author)
         # 3. Check attachments
         if attachments_count := _count_attachments(message):
-            self.attachments_score[message.author.id] += attachments_count
-        # if attachments score is higher than 0, apply sanctions
-        if attachments_count != 0 and self.attachments_score[message.author.id] > 0:
+            self.attachments_score.add(score_key, attachments_count)
             await self.check_attachments_score(message.author)
 
     async def check_mentions_score(self, member: discord.Member):
         "Check if a member has a mentions score higher than the treshold set by the antiraid config, and take actions"
-        score = self.mentions_score[member.id]
+        score = self.mentions_score.get((member.guild.id, member.id))
         if score == 0:
             return
         level = await self._get_raid_level(member.guild)
@@ -333,7 +321,7 @@ class AntiRaid(commands.Cog):
 
     async def check_invites_score(self, member: discord.Member):
         "Check if a member has a invites score higher than the treshold set by the antiraid config, and take actions"
-        score = self.invites_score[member.id]
+        score = self.invites_score.get((member.guild.id, member.id))
         if score == 0:
             return
         level = await self._get_raid_level(member.guild)
@@ -376,7 +364,7 @@ class AntiRaid(commands.Cog):
 
     async def check_attachments_score(self, member: discord.Member):
         "Check if a member has a attachments score higher than the treshold set by the antiraid config, and take actions"
-        score = self.attachments_score[member.id]
+        score = self.attachments_score.get((member.guild.id, member.id))
         if score == 0:
             return
         level = await self._get_raid_level(member.guild)
@@ -407,38 +395,6 @@ class AntiRaid(commands.Cog):
             if await self._check_min_score(member, score, 10, "timeout", "attachments", timedelta(minutes=30)):
                 return True
 
-    @tasks.loop(seconds=30)
-    async def decrease_users_scores(self):
-        """Decrease mentions and invites count every 30 seconds"""
-        # Decrease mentions count by 2
-        mentions_users_to_remove: list[int] = []
-        for member_id in self.mentions_score:
-            self.mentions_score[member_id] -= 2
-            if self.mentions_score[member_id] <= 0:
-                mentions_users_to_remove.append(member_id)
-        for member_id in mentions_users_to_remove:
-            del self.mentions_score[member_id]
-        # Decrease invites count by 1
-        invites_users_to_remove: list[int] = []
-        for member_id in self.invites_score:
-            self.invites_score[member_id] -= 1
-            if self.invites_score[member_id] <= 0:
-                invites_users_to_remove.append(member_id)
-        for member_id in invites_users_to_remove:
-            del self.invites_score[member_id]
-        # Decrease attachments count by 2
-        attachments_users_to_remove: list[int] = []
-        for member_id in self.attachments_score:
-            self.attachments_score[member_id] -= 2
-            if self.attachments_score[member_id] <= 0:
-                attachments_users_to_remove.append(member_id)
-        for member_id in attachments_users_to_remove:
-            del self.attachments_score[member_id]
-
-    @decrease_users_scores.error
-    async def on_decrease_mentions_count_error(self, error: BaseException):
-        self.bot.dispatch("error", error, "When calling `decrease_mentions_count` (<@279568324260528128>)")
-
 
 async def setup(bot: Axobot):
     await bot.add_cog(AntiRaid(bot))
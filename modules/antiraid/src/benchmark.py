@@ -0,0 +1,147 @@
+"""Replay a simulated raid through the antiraid checks, to measure their throughput
+
+Run it from the bot root directory with `python -m modules.antiraid.src.benchmark`
+Discord and the database are replaced by lightweight simulated objects, so only the antiraid logic is measured."""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any
+
+import discord
+
+from ..antiraid import AntiRaid
+
+RAID_LEVELS = ["none", "smooth", "careful", "high", "extreme"]
+PERMISSIONS = SimpleNamespace(
+    administrator=False, moderate_members=False, kick_members=True, ban_members=True
+)
+BOT_PERMISSIONS = SimpleNamespace(
+    administrator=True, moderate_members=True, kick_members=True, ban_members=True
+)
+
+
+async def _noop(*_args: Any, **_kwargs: Any):
+    return None
+
+
+class SimulatedMember(discord.Member):
+    "A guild member that doesn't need any Discord connection"
+    # shadow the properties of discord.Member with simple attributes
+    id = guild = bot = display_name = created_at = guild_permissions = roles = None # type: ignore
+
+    def __init__(self, member_id: int, guild: Any, created_at: datetime): # pylint: disable=super-init-not-called
+        self.id = member_id
+        self.guild = guild
+        self.bot = False
+        self.display_name = f"member-{member_id}"
+        self.created_at = created_at
+        self.guild_permissions = PERMISSIONS
+        self.roles = [SimpleNamespace(position=0)]
+
+    async def send(self, *_args: Any, **_kwargs: Any): # type: ignore
+        return None
+
+    async def timeout(self, *_args: Any, **_kwargs: Any): # type: ignore
+        return None
+
+    async def ban(self, *_args: Any, **_kwargs: Any): # type: ignore
+        return None
+
+
+class SimulatedBot:
+    "The subset of Axobot used by the antiraid checks"
+
+    def __init__(self, raid_level: str):
+        self.database_online = True
+        self.raid_level = raid_level
+        self.dispatched_events: dict[str, int] = {}
+        self.task_handler = SimpleNamespace(add_task=_noop)
+
+    async def get_config(self, _guild: Any, option_name: str):
+        if option_name == "anti_raid":
+            return self.raid_level
+        return None
+
+    async def get_options_list(self):
+        return {"anti_raid": {"values": RAID_LEVELS}}
+
+    async def _(self, _source: Any, string_id: str, **_kwargs: Any):
+        return string_id
+
+    def dispatch(self, event_name: str, *_args: Any):
+        self.dispatched_events[event_name] = self.dispatched_events.get(event_name, 0) + 1
+
+    def utcnow(self):
+        return datetime.now(timezone.utc)
+
+
+def create_guild(guild_id: int):
+    "Create a guild where the bot has every needed permission"
+    return SimpleNamespace(
+        id=guild_id,
+        name=f"guild-{guild_id}",
+        me=SimpleNamespace(guild_permissions=BOT_PERMISSIONS, roles=[SimpleNamespace(position=100)]),
+        kick=_noop,
+    )
+
+
+async def replay_raid(events_count: int, events_per_second: int, guilds_count: int, raiders_count: int,
+                      raid_level: str, seed: int = 0):
+    "Replay a mix of joins and spam messages, with a simulated clock, and return the elapsed wall time"
+    rng = random.Random(seed)
+    bot = SimulatedBot(raid_level)
+    cog = AntiRaid(bot) # type: ignore
+    simulated_now = [0.0]
+    for counter in (cog.mentions_score, cog.invites_score, cog.attachments_score):
+        counter.clock = lambda: simulated_now[0]
+    guilds = [create_guild(guild_id) for guild_id in range(1, guilds_count + 1)]
+    created_at = datetime.now(timezone.utc) - timedelta(days=30)
+    members = [
+        SimulatedMember(member_id, rng.choice(guilds), created_at - timedelta(minutes=rng.randrange(0, 3000)))
+        for member_id in range(10**6, 10**6 + raiders_count)
+    ]
+    contents = ["hello", "join us discord.gg/abcdef", "look https://example.com/image.png", "<@1> <@2> <@3>"]
+    start = time.perf_counter()
+    for _ in range(events_count):
+        simulated_now[0] += 1 / events_per_second
+        member = rng.choice(members)
+        if rng.random() < 0.2:
+            await cog.on_join_raid_check(member)
+            continue
+        content = rng.choice(contents)
+        message = SimpleNamespace(
+            guild=member.guild,
+            author=member,
+            content=content,
+            raw_mentions=[1, 2, 3] if content.startswith("<@") else [],
+            attachments=[],
+        )
+        await cog.on_message_antiraid(message) # type: ignore
+    duration = time.perf_counter() - start
+    scores_count = len(cog.mentions_score) + len(cog.invites_score) + len(cog.attachments_score)
+    return duration, scores_count, bot.dispatched_events
+
+
+def main():
+    "Run the raid simulation with the given parameters"
+    parser = argparse.ArgumentParser(description="Benchmark the antiraid checks")
+    parser.add_argument("--events", type=int, default=100_000, help="Number of joins and messages to replay")
+    parser.add_argument("--rate", type=int, default=5_000, help="Simulated events per second")
+    parser.add_argument("--guilds", type=int, default=50, help="Number of raided guilds")
+    parser.add_argument("--raiders", type=int, default=20_000, help="Number of raiding accounts")
+    parser.add_argument("--level", choices=RAID_LEVELS[1:], default="high", help="Antiraid level of every guild")
+    args = parser.parse_args()
+
+    duration, scores_count, events = asyncio.run(
+        replay_raid(args.events, args.rate, args.guilds, args.raiders, args.level)
+    )
+    print(f"Replayed {args.events} events in {duration:.2f}s ({args.events / duration:,.0f} events/s)")
+    print(f"Live scores at the end: {scores_count}")
+    print("Sanctions: " + ", ".join(f"{name}={count}" for name, count in sorted(events.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import math
+import time
+from typing import Callable, Generic, Hashable, TypeVar
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+
+
+class DecayingCounter(Generic[KeyType]):
+    """Scores that lose a fixed amount every interval, computed when they are read instead of by a periodic sweep
+
+    Each entry stores its value and the time of its last decay step. Entries are also registered in a timing wheel
+    at the tick where they reach zero, so that idle entries are dropped without scanning the whole counter."""
+
+    def __init__(self, decay_amount: int, decay_interval: float, wheel_size: int = 64,
+                 clock: Callable[[], float] = time.monotonic):
+        self.decay_amount = decay_amount
+        self.decay_interval = decay_interval
+        self.clock = clock
+        # key -> [value, last decay time, expiration tick]
+        self._entries: dict[KeyType, list[float]] = {}
+        self._wheel: list[set[KeyType]] = [set() for _ in range(wheel_size)]
+        self._current_tick = self._get_tick(clock())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: KeyType):
+        return self.get(key) > 0
+
+    def _get_tick(self, timestamp: float):
+        return math.floor(timestamp / self.decay_interval)
+
+    def _decay(self, entry: list[float], now: float):
+        "Apply the decay steps elapsed since the last update of an entry"
+        steps = math.floor((now - entry[1]) / self.decay_interval)
+        if steps > 0:
+            entry[0] = max(entry[0] - steps * self.decay_amount, 0)
+            entry[1] += steps * self.decay_interval
+
+    def _advance(self, now: float):
+        "Drop the entries whose value reached zero since the last call"
+        tick = self._get_tick(now)
+        if tick <= self._current_tick:
+            return
+        # after a full turn, every slot has been visited once
+        for visited_tick in range(max(self._current_tick + 1, tick - len(self._wheel) + 1), tick + 1):
+            slot = self._wheel[visited_tick % len(self._wheel)]
+            expired = [key for key in slot if self._entries[key][2] <= tick]
+            for key in expired:
+                slot.discard(key)
+                del self._entries[key]
+        self._current_tick = tick
+
+    def get(self, key: KeyType) -> int:
+        "Get the current value of a score"
+        now = self.clock()
+        self._advance(now)
+        if (entry := self._entries.get(key)) is None:
+            return 0
+        self._decay(entry, now)
+        return int(entry[0])
+
+    def add(self, key: KeyType, amount: int) -> int:
+        "Increase a score, and return its new value"
+        now = self.clock()
+        self._advance(now)
+        if (entry := self._entries.get(key)) is None:
+            entry = [0, now, -1]
+            self._entries[key] = entry
+        else:
+            self._decay(entry, now)
+            if entry[0] == 0:
+                # the score restarts from scratch
+                entry[1] = now
+        entry[0] += amount
+        # the score reaches zero after enough decay steps, counted from its last step
+        expiration_time = entry[1] + math.ceil(entry[0] / self.decay_amount) * self.decay_interval
+        expiration_tick = math.ceil(expiration_time / self.decay_interval)
+        if expiration_tick != entry[2]:
+            if entry[2] >= 0:
+                self._wheel[int(entry[2]) % len(self._wheel)].discard(key)
+            self._wheel[expiration_tick % len(self._wheel)].add(key)
+            entry[2] = expiration_tick
+        return int(entry[0])
+
+    def clear(self):
+        "Remove every score"
+        self._entries.clear()
+        for slot in self._wheel:
+            slot.clear()
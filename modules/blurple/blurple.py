@@ -8,8 +8,9 @@ from discord.ext import commands
 from core.bot_classes import Axobot, MyContext
 from core.checks.errors import NotDuringEventError
 from core.colors_events import (BlurpleVariationFlagType, ColorVariationType,
-                                TargetConverterType, check_blurple,
-                                convert_blurple, get_url_from_ctx)
+                                TargetConverterType, background_mask_worker,
+                                check_blurple, convert_blurple,
+                                get_url_from_ctx)
 
 
 async def is_blurple(ctx: MyContext):
@@ -33,6 +34,10 @@ class Blurplefy(commands.Cog):
                 jsonfile.write("[]")
             self.cache = []
 
+    async def cog_unload(self):
+        # free the background removal model until the next event
+        await background_mask_worker.unload()
+
     @property
     def event_cog(self):
         """Get the BotEvents cog to access event points system"""
@@ -122,7 +127,9 @@ Online editor: https://projectblurple.com/paint
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.get(str(url)) as image:
-                    result = await convert_blurple(await image.read(), fmodifier, method, variations or [], replace_background)
+                    result = await convert_blurple(
+                        self.bot.render_pool, await image.read(), fmodifier, method, variations or [], replace_background
+                    )
         except RuntimeError as err:
             await ctx.send(await self.bot._(ctx.channel, "color-event.unknown-err", err=str(err)))
             return
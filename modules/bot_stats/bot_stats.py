@@ -13,6 +13,7 @@ from discord.ext import commands, tasks
 from mysql.connector.errors import IntegrityError as MysqlIntegrityError
 
 from core.bot_classes import Axobot, MyContext
+from core.colors_events import background_mask_worker
 from core.enums import ServerWarningType
 from core.type_utils import AnyStrDict
 from core.utilities import avg
@@ -58,7 +59,6 @@ class BotStats(commands.Cog):
         self.bot_cpu_records: list[float] = []
         self.total_cpu_records: list[float] = []
         self.latency_records: list[int] = []
-        self.sql_performance_records: list[float] = []
         self.statuspage_header = {
             "Content-Type": "application/json",
             "Authorization": "OAuth " + self.bot.secrets["statuspage"],
@@ -472,11 +472,21 @@ class BotStats(commands.Cog):
         if lat is not None:
             rows.append(StatRow("perf.latency", lat, 1, "ms", False))
             self.latency_records.clear()
-        if self.sql_performance_records:
-            rows.append(StatRow("perf.sql_count", len(self.sql_performance_records), 0, "queries/min", True))
-            if (sql_avg := avg(self.sql_performance_records)) is not None:
-                rows.append(StatRow("perf.sql", sql_avg, 1, "ms", False))
-            self.sql_performance_records.clear()
+        if (sql_stats := self.bot.db.tracer.collect_window()) is not None:
+            rows.append(StatRow("perf.sql_count", sql_stats.count, 0, "queries/min", True))
+            rows.append(StatRow("perf.sql", sql_stats.avg_ms, 1, "ms", False))
+            rows.append(StatRow("perf.sql_p50", sql_stats.p50_ms, 1, "ms", False))
+            rows.append(StatRow("perf.sql_p95", sql_stats.p95_ms, 1, "ms", False))
+            rows.append(StatRow("perf.sql_p99", sql_stats.p99_ms, 1, "ms", False))
+            rows.append(StatRow("perf.sql_rows", sql_stats.avg_rows, 1, "rows", False))
+        for database, pool_stats in self.bot.db.collect_pools_stats().items():
+            prefix = f"perf.db_pool.{database}"
+            rows.append(StatRow(f"{prefix}.in_use", pool_stats.in_use, 0, "connections", False))
+            rows.append(StatRow(f"{prefix}.max_in_use", pool_stats.max_in_use, 0, "connections", False))
+            rows.append(StatRow(f"{prefix}.open", pool_stats.open, 0, "connections", False))
+            if pool_stats.avg_wait_ms is not None and pool_stats.max_wait_ms is not None:
+                rows.append(StatRow(f"{prefix}.wait", pool_stats.avg_wait_ms, 1, "ms", False))
+                rows.append(StatRow(f"{prefix}.max_wait", pool_stats.max_wait_ms, 1, "ms", False))
         if (bot_cpu := avg(self.bot_cpu_records)) is not None:
             rows.append(StatRow("perf.bot_cpu", bot_cpu, 1, "%", False))
             self.bot_cpu_records.clear()
@@ -581,6 +591,99 @@ class BotStats(commands.Cog):
             )
             antiscam_cog.messages_scanned_in_last_minute = 0
 
+        # XP: buffered gains vs rows written to the database
+        if xp_cog := self.bot.get_cog("Xp"):
+            rows.append(StatRow("xp.buffered_rows", xp_cog.xp_buffer.buffered_count, 0, "rows/min", True))
+            rows.append(StatRow("xp.flushed_rows", xp_cog.xp_buffer.flushed_count, 0, "rows/min", True))
+            xp_cog.xp_buffer.buffered_count = xp_cog.xp_buffer.flushed_count = 0
+            cache_stats = xp_cog.leaderboard_cache.get_stats()
+            rows.append(StatRow("xp.cache.leaderboards", cache_stats.systems, 0, "leaderboards", False))
+            rows.append(StatRow("xp.cache.members", cache_stats.members, 0, "members", False))
+            if cache_stats.members:
+                rows.append(StatRow(
+                    "xp.cache.bytes_per_member", round(cache_stats.nbytes / cache_stats.members, 1), 1, "B", False
+                ))
+            # rank cards cache efficiency
+            cards_cache = xp_cog.cards_cache
+            rows.append(StatRow("xp.cards_cache.hits", cards_cache.hits, 0, "hits/min", True))
+            rows.append(StatRow("xp.cards_cache.misses", cards_cache.misses, 0, "misses/min", True))
+            if cards_cache.hits + cards_cache.misses:
+                hit_rate = cards_cache.hits / (cards_cache.hits + cards_cache.misses) * 100
+                rows.append(StatRow("xp.cards_cache.hit_rate", round(hit_rate, 1), 1, "%", False))
+            rows.append(StatRow("xp.cards_cache.evictions", cards_cache.evictions, 0, "cards/min", True))
+            rows.append(StatRow("xp.cards_cache.cards", len(cards_cache), 0, "cards", False))
+            rows.append(StatRow("xp.cards_cache.size", round(cards_cache.nbytes / 1024**2, 2), 1, "MB", False))
+            cards_cache.hits = cards_cache.misses = cards_cache.evictions = 0
+
+        # ServerConfig: guild snapshots cache efficiency
+        if config_cog := self.bot.get_cog("ServerConfig"):
+            rows.append(StatRow("serverconfig.cache_hits", config_cog.cache_hits, 0, "hits/min", True))
+            rows.append(StatRow("serverconfig.cache_misses", config_cog.cache_misses, 0, "misses/min", True))
+            if config_cog.snapshot_loads_count:
+                avg_load_ms = config_cog.snapshot_loads_duration / config_cog.snapshot_loads_count * 1000
+                rows.append(StatRow("serverconfig.load_latency", round(avg_load_ms, 2), 1, "ms", False))
+            config_cog.cache_hits = config_cog.cache_misses = config_cog.snapshot_loads_count = 0
+            config_cog.snapshot_loads_duration = 0.0
+
+        # Utilities: user languages index efficiency
+        if utilities_cog := self.bot.get_cog("Utilities"):
+            languages_index = utilities_cog.user_languages
+            rows.append(StatRow("languages.users_index.hits", languages_index.hits, 0, "hits/min", True))
+            rows.append(StatRow("languages.users_index.misses", languages_index.misses, 0, "misses/min", True))
+            rows.append(StatRow("languages.users_index.size", len(languages_index), 0, "users", False))
+            languages_index.hits = languages_index.misses = 0
+
+        # UsersCache: buffered snapshots vs rows written to the database
+        if users_cache_cog := self.bot.get_cog("UsersCache"):
+            users_buffer = users_cache_cog.users_buffer
+            rows.append(StatRow("users_cache.buffered_rows", users_buffer.buffered_count, 0, "rows/min", True))
+            rows.append(StatRow("users_cache.flushed_rows", users_buffer.flushed_count, 0, "rows/min", True))
+            if users_buffer.flushes_count:
+                rows.append(StatRow(
+                    "users_cache.rows_per_flush", round(users_buffer.flushed_count / users_buffer.flushes_count, 1),
+                    1, "rows", False
+                ))
+                avg_flush_ms = users_buffer.flushes_duration / users_buffer.flushes_count * 1000
+                rows.append(StatRow("users_cache.flush_latency", round(avg_flush_ms, 2), 1, "ms", False))
+            rows.append(StatRow("users_cache.throttled_users", len(users_buffer.last_saved), 0, "users", False))
+            users_buffer.buffered_count = users_buffer.flushed_count = users_buffer.flushes_count = 0
+            users_buffer.flushes_duration = 0.0
+
+        # Colors events: background removal worker load
+        mask_worker = background_mask_worker
+        if mask_worker.is_loaded or mask_worker.processed_count:
+            rows.append(StatRow("colors_events.masks.queue_depth", mask_worker.queue_depth, 0, "requests", False))
+            rows.append(StatRow("colors_events.masks.processed", mask_worker.processed_count, 0, "masks/min", True))
+            if mask_worker.processed_count:
+                rows.append(StatRow(
+                    "colors_events.masks.per_batch", round(mask_worker.processed_count / mask_worker.batches_count, 1),
+                    1, "masks", False
+                ))
+                avg_inference_ms = mask_worker.inference_duration / mask_worker.processed_count * 1000
+                rows.append(StatRow("colors_events.masks.inference_time", round(avg_inference_ms, 2), 1, "ms", False))
+            mask_worker.processed_count = mask_worker.batches_count = 0
+            mask_worker.inference_duration = 0.0
+
+        # Render pool: image generation time and time spent waiting for a worker, per kind of image
+        for kind, render_stats in self.bot.render_pool.collect_stats().items():
+            failures = render_stats.failures + render_stats.timeouts
+            rows.append(StatRow(f"render.{kind}.jobs", render_stats.count, 0, "jobs/min", True))
+            rows.append(StatRow(f"render.{kind}.failures", failures, 0, "jobs/min", True))
+            if render_stats.count:
+                queue_wait_ms = render_stats.avg_queue_wait * 1000
+                render_time_ms = render_stats.avg_render_time * 1000
+                max_render_time_ms = render_stats.max_render_time * 1000
+                rows.append(StatRow(f"render.{kind}.queue_wait", round(queue_wait_ms, 2), 1, "ms", False))
+                rows.append(StatRow(f"render.{kind}.render_time", round(render_time_ms, 2), 1, "ms", False))
+                rows.append(StatRow(f"render.{kind}.max_render_time", round(max_render_time_ms, 2), 1, "ms", False))
+        rows.append(StatRow("render.waiting_jobs", self.bot.render_pool.waiting_jobs, 0, "jobs", False))
+
+        # Timed tasks: completion throughput and lag after due time, per action
+        for action, task_stats in self.bot.task_handler.collect_stats().items():
+            rows.append(StatRow(f"tasks.{action}.rate", round(task_stats.per_second, 3), 1, "tasks/s", False))
+            rows.append(StatRow(f"tasks.{action}.lag", round(task_stats.avg_lag, 2), 1, "s", False))
+            rows.append(StatRow(f"tasks.{action}.max_lag", round(task_stats.max_lag, 2), 1, "s", False))
+
         # AntiScam: activated guild count
         rows.append(StatRow("antiscam.activated", await self.db_get_antiscam_enabled_count(), 0, "guilds", False))
 
@@ -49,12 +49,14 @@ class Events(commands.Cog):
     async def cog_load(self):
         if self.bot.internal_loop_enabled:
             self.loop.start() # pylint: disable=no-member
+            self.bot.task_handler.start()
 
 
     async def cog_unload(self):
         # pylint: disable=no-member
         if self.loop.is_running():
             self.loop.cancel()
+        self.bot.task_handler.stop()
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -227,11 +229,8 @@ class Events(commands.Cog):
             return
         now = self.bot.utcnow()
         try:
-            # Timed tasks - every 20s
-            if now.second%20 == 0 and self.bot.database_online:
-                await self.bot.task_handler.check_tasks()
             # Bots lists updates - every day
-            elif now.hour == 0 and now.day != self.dbl_last_sending.day:
+            if now.hour == 0 and now.day != self.dbl_last_sending.day:
                 await self.dbl_send_data()
             # Send stats logs - every 1h (start from 0:05 am)
             elif (
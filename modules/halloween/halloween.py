@@ -8,8 +8,9 @@ from discord.ext import commands
 from core.bot_classes import Axobot, MyContext
 from core.checks.errors import NotDuringEventError
 from core.colors_events import (ColorVariationType, HalloweenVariationFlagType,
-                                TargetConverterType, check_halloween,
-                                convert_halloween, get_url_from_ctx)
+                                TargetConverterType, background_mask_worker,
+                                check_halloween, convert_halloween,
+                                get_url_from_ctx)
 
 
 async def is_halloween(ctx: MyContext):
@@ -34,6 +35,10 @@ class Halloween(commands.Cog):
                 file.write("[]")
             self.cache = []
 
+    async def cog_unload(self):
+        # free the background removal model until the next event
+        await background_mask_worker.unload()
+
     @property
     def event_cog(self):
         """Get the BotEvents cog to access event points system"""
@@ -120,7 +125,9 @@ A BIG thanks to the Project Blurple and their original code for the colorization
         try:
             async with aiohttp.ClientSession() as session:
                 async with session.get(str(url)) as image:
-                    result = await convert_halloween(await image.read(), fmodifier, method, variations or [], replace_background)
+                    result = await convert_halloween(
+                        self.bot.render_pool, await image.read(), fmodifier, method, variations or [], replace_background
+                    )
         except RuntimeError as err:
             await ctx.send(await self.bot._(ctx.channel, "color-event.unknown-err", err=str(err)))
             return
@@ -22,6 +22,11 @@ class InvitesTracker(commands.Cog):
         self.bot = bot
         self.file = "invites_tracker"
         self.log = logging.getLogger("bot.invites_tracker")
+        # tracked invites of each loaded guild, by invite code
+        self.snapshots: dict[int, dict[str, TrackedInvite]] = {}
+        # members waiting for the next invites fetch of their guild
+        self._pending_joins: dict[int, list[asyncio.Future[tuple[discord.Invite, TrackedInvite] | None]]] = {}
+        self._join_batches: dict[int, asyncio.Task[None]] = {}
 
     async def cog_load(self):
         self.sync_all_guilds_invites.start() # pylint: disable=no-member
@@ -47,6 +52,25 @@ class InvitesTracker(commands.Cog):
         async with self.bot.db_main.write(query, (guild_id, invite_id, user_id, creation_date, usage_count, self.bot.beta)):
             pass
 
+    async def db_upsert_invites(self, guild_id: int, invites: list[tuple[str, int | None, datetime | None, int]]):
+        "Insert or update several tracked invites in a single query, from (code, user ID, creation date, uses) tuples"
+        if not invites:
+            return
+        values_placeholder = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(invites))
+        query = (
+            "INSERT INTO `invites_tracker` "\
+            "(`guild_id`, `invite_id`, `user_id`, `creation_date`,`last_count`,`beta`) "\
+            f"VALUES {values_placeholder} "\
+            "ON DUPLICATE KEY UPDATE `user_id` = VALUES(`user_id`), `last_count` = VALUES(`last_count`)"
+        )
+        args = tuple(
+            value
+            for invite_id, user_id, creation_date, usage_count in invites
+            for value in (guild_id, invite_id, user_id, creation_date, usage_count, self.bot.beta)
+        )
+        async with self.bot.db_main.write(query, args):
+            pass
+
     async def db_update_invite_count(self, guild_id: int, invite_id: str, usage_count: int):
         "Update the usage count of a tracked invite"
         query = "UPDATE `invites_tracker` SET `last_count` = %s WHERE `guild_id` = %s AND `invite_id` = %s AND `beta` = %s"
@@ -65,6 +89,46 @@ class InvitesTracker(commands.Cog):
         async with self.bot.db_main.write(query, (guild_id, invite_id, self.bot.beta)):
             pass
 
+    async def db_delete_invites(self, guild_id: int, invite_ids: list[str]):
+        "Delete several tracked invites from the database in a single query"
+        if not invite_ids:
+            return
+        ids_placeholder = ", ".join(["%s"] * len(invite_ids))
+        query = "DELETE FROM `invites_tracker` WHERE `guild_id` = %s AND `beta` = %s "\
+            f"AND `invite_id` IN ({ids_placeholder})"
+        async with self.bot.db_main.write(query, (guild_id, self.bot.beta, *invite_ids)):
+            pass
+
+    async def get_invites_snapshot(self, guild_id: int) -> dict[str, TrackedInvite]:
+        "Get the tracked invites of a guild by code, loading them from the database if needed"
+        if (snapshot := self.snapshots.get(guild_id)) is None:
+            snapshot = {invite["invite_id"]: invite for invite in await self.db_get_invites(guild_id)}
+            # keep the snapshot which may have been loaded in the meantime
+            snapshot = self.snapshots.setdefault(guild_id, snapshot)
+        return snapshot
+
+    def _update_snapshot(self, guild_id: int, invite_id: str, user_id: int | None, creation_date: datetime | None,
+                         usage_count: int):
+        "Reflect an upserted invite in the loaded snapshot of its guild, if any"
+        if (snapshot := self.snapshots.get(guild_id)) is None:
+            return
+        if (tracked_invite := snapshot.get(invite_id)) is not None:
+            tracked_invite["user_id"] = user_id
+            tracked_invite["last_count"] = usage_count
+            return
+        now = self.bot.utcnow()
+        snapshot[invite_id] = TrackedInvite(
+            guild_id=guild_id,
+            invite_id=invite_id,
+            name=None,
+            user_id=user_id,
+            creation_date=creation_date or now,
+            tracking_date=now,
+            last_count=usage_count,
+            last_tracking=now,
+            beta=self.bot.beta,
+        )
+
 
     async def _get_guild_invites_with_vanity(self, guild: discord.Guild):
         "Get the guild invites, including the vanity invite if it exists"
@@ -78,43 +142,90 @@ class InvitesTracker(commands.Cog):
 
     async def sync_guild_invites(self, guild: discord.Guild):
         "Sync the tracked invites with the current invites of a guild"
-        count = 0
         guild_invites = await self._get_guild_invites_with_vanity(guild)
+        tracked_invites = await self.get_invites_snapshot(guild.id)
         # add/update existing invitations
-        for invite in guild_invites:
-            user_id = invite.inviter.id if invite.inviter else None
-            if invite.uses is None:
-                continue
-            await self.db_upsert_invite(guild.id, invite.code, user_id, invite.created_at, invite.uses)
-            count += 1
+        upserted_invites = [
+            (invite.code, invite.inviter.id if invite.inviter else None, invite.created_at, invite.uses)
+            for invite in guild_invites
+            if invite.uses is not None
+        ]
+        await self.db_upsert_invites(guild.id, upserted_invites)
+        for invite_id, user_id, creation_date, usage_count in upserted_invites:
+            self._update_snapshot(guild.id, invite_id, user_id, creation_date, usage_count)
         # delete removed invitations
-        for tracked_invite in await self.db_get_invites(guild.id):
-            if not next((i for i in guild_invites if i.code == tracked_invite["invite_id"]), None):
-                await self.db_delete_invite(guild.id, tracked_invite["invite_id"])
-                count += 1
-        return count
-
-    async def check_invites_usage(self, guild: discord.Guild):
-        "Detect which invite was just used, by comparing the stored usage with the current usage"
-        tracked_invites = await self.db_get_invites(guild.id)
+        current_codes = {invite.code for invite in guild_invites}
+        deleted_invites = [invite_id for invite_id in tracked_invites if invite_id not in current_codes]
+        await self.db_delete_invites(guild.id, deleted_invites)
+        for invite_id in deleted_invites:
+            tracked_invites.pop(invite_id, None)
+        return len(upserted_invites) + len(deleted_invites)
+
+    async def find_used_invite(self, guild: discord.Guild):
+        """Detect which invite was used by a new member
+        Members joining at the same time are handled together, with a single invites fetch"""
+        future: asyncio.Future[tuple[discord.Invite, TrackedInvite] | None] = asyncio.get_running_loop().create_future()
+        self._pending_joins.setdefault(guild.id, []).append(future)
+        if guild.id not in self._join_batches:
+            self._join_batches[guild.id] = asyncio.create_task(self._process_joins_batch(guild))
+        return await future
+
+    async def _process_joins_batch(self, guild: discord.Guild):
+        "Wait for the invites to be updated, then detect the invites used by every member who joined in the meantime"
+        futures: list[asyncio.Future[tuple[discord.Invite, TrackedInvite] | None]] = []
+        try:
+            await asyncio.sleep(1) # Wait for the invite to be updated
+            # members joining from now on will start a new batch
+            futures = self._pending_joins.pop(guild.id, [])
+            del self._join_batches[guild.id]
+            results = await self.check_invites_usage(guild, len(futures))
+            for future, result in zip(futures, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as err: # pylint: disable=broad-except
+            for future in futures or self._pending_joins.pop(guild.id, []):
+                if not future.done():
+                    future.set_exception(err)
+        finally:
+            if self._join_batches.get(guild.id) is asyncio.current_task():
+                del self._join_batches[guild.id]
+
+    async def check_invites_usage(self, guild: discord.Guild, joins_count: int = 1):
+        """Detect which invites were just used, by comparing the stored usage with the current usage
+        Returns one (invite, tracked invite) tuple or None per joined member"""
+        tracked_invites = await self.get_invites_snapshot(guild.id)
         guild_invites = await self._get_guild_invites_with_vanity(guild)
-        # first, check if an invite was used exactly once
-        for tracked_invite in tracked_invites:
-            invite = next((i for i in guild_invites if i.code == tracked_invite["invite_id"]), None)
-            if invite is None or invite.uses is None:
-                continue
-            if invite.uses == tracked_invite["last_count"] + 1:
-                await self.db_update_invite_count(guild.id, invite.code, invite.uses)
-                return (invite, tracked_invite)
-        # if not, check if an invite was used more than once
-        for tracked_invite in tracked_invites:
-            invite = next((i for i in guild_invites if i.code == tracked_invite["invite_id"]), None)
-            if invite is None or invite.uses is None:
+        invites_by_code: dict[str, discord.Invite] = {}
+        # number of uses not yet attributed to a member, per invite code
+        unclaimed_uses: dict[str, int] = {}
+        for invite in guild_invites:
+            if invite.uses is None or (tracked_invite := tracked_invites.get(invite.code)) is None:
                 continue
             if invite.uses > tracked_invite["last_count"]:
-                await self.db_update_invite_count(guild.id, invite.code, invite.uses)
-                return (invite, tracked_invite)
-
+                invites_by_code[invite.code] = invite
+                unclaimed_uses[invite.code] = invite.uses - tracked_invite["last_count"]
+        results: list[tuple[discord.Invite, TrackedInvite] | None] = []
+        # number of uses attributed to a member, per invite code
+        claimed_uses: dict[str, int] = {}
+        for _ in range(joins_count):
+            # first, check if an invite was used exactly once, then if an invite was used more than once
+            code = next((code for code, count in unclaimed_uses.items() if count == 1), None)
+            if code is None:
+                code = next(iter(unclaimed_uses), None)
+            if code is None:
+                results.append(None)
+                continue
+            unclaimed_uses[code] -= 1
+            if unclaimed_uses[code] == 0:
+                del unclaimed_uses[code]
+            claimed_uses[code] = claimed_uses.get(code, 0) + 1
+            results.append((invites_by_code[code], tracked_invites[code]))
+        for code, claimed_count in claimed_uses.items():
+            # only count the claimed uses, so that the other ones can be attributed to the next joins
+            usage_count = tracked_invites[code]["last_count"] + claimed_count
+            tracked_invites[code]["last_count"] = usage_count
+            await self.db_update_invite_count(guild.id, code, usage_count)
+        return results
 
     async def is_tracker_enabled(self, guild_id: int) -> bool:
         return await self.bot.get_config(guild_id, "enable_invites_tracking") # pyright: ignore[reportReturnType]
@@ -151,33 +262,48 @@ class InvitesTracker(commands.Cog):
     @commands.Cog.listener()
     async def on_invite_create(self, invite: discord.Invite):
         "Update the tracked invite when a new invite is created"
-        if invite.guild is None or not await self.is_tracker_enabled(invite.guild.id):
+        if invite.guild is None:
+            return
+        if not await self.is_tracker_enabled(invite.guild.id):
+            # the snapshot would become outdated
+            self.snapshots.pop(invite.guild.id, None)
             return
         inviter_id = invite.inviter.id if invite.inviter else None
         await self.db_upsert_invite(invite.guild.id, invite.code, inviter_id, invite.created_at, invite.uses or 0)
+        self._update_snapshot(invite.guild.id, invite.code, inviter_id, invite.created_at, invite.uses or 0)
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite: discord.Invite):
         "Remove the tracked invite when an invite is deleted"
-        if invite.guild is None or not await self.is_tracker_enabled(invite.guild.id):
+        if invite.guild is None:
+            return
+        if not await self.is_tracker_enabled(invite.guild.id):
+            self.snapshots.pop(invite.guild.id, None)
             return
         await self.db_delete_invite(invite.guild.id, invite.code)
+        if (snapshot := self.snapshots.get(invite.guild.id)) is not None:
+            snapshot.pop(invite.code, None)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        "Forget about the tracked invites of a guild the bot left"
+        self.snapshots.pop(guild.id, None)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         "Detect which invite was used when a member joins the server"
         if not member.guild.me.guild_permissions.manage_guild or not await self.is_tracker_enabled(member.guild.id):
             return
-        await asyncio.sleep(1) # Wait for the invite to be updated
-        if used_invite := await self.check_invites_usage(member.guild):
-            discord_invite, tracked_invite = used_invite
+        if used_invite := await self.find_used_invite(member.guild):
+            discord_invite, snapshot_invite = used_invite
             if discord_invite.uses is None:
                 raise RuntimeError("Invite uses is None but was still detected as used invite, this should not happen")
+            # don't add event-specific data to the snapshot
+            tracked_invite = snapshot_invite.copy()
             tracked_invite["last_count"] = discord_invite.uses
             tracked_invite["max_uses"] = discord_invite.max_uses # pyright: ignore[reportGeneralTypeIssues]
             tracked_invite["ephemeral"] = bool(discord_invite.max_age) # pyright: ignore[reportGeneralTypeIssues]
             self.bot.dispatch("invite_used", member, tracked_invite)
-            await self.db_update_invite_count(member.guild.id, discord_invite.code, discord_invite.uses)
         else:
             self.bot.log.warning(f"Could not detect the invite used in guild {member.guild.id}")
         self.bot.dispatch("invite_tracker_search", used_invite is not None)
@@ -254,6 +380,8 @@ class InvitesTracker(commands.Cog):
         await interaction.response.defer()
         new_name = None if name.lower() == "none" else name
         await self.db_update_invite_name(interaction.guild_id, invite.code, new_name)
+        if (tracked_invite := self.snapshots.get(interaction.guild_id, {}).get(invite.code)) is not None:
+            tracked_invite["name"] = new_name
         link = f"discord.gg/{invite.code}"
         if new_name is None:
             await interaction.followup.send(
@@ -1,7 +1,7 @@
+import os
 from typing import Any
 
 import discord
-import i18n
 from asyncache import cached
 from cachetools import TTLCache
 from discord.ext import commands
@@ -9,6 +9,11 @@ from discord.ext import commands
 from core.bot_classes import Axobot
 from core.translator import AxobotTranslator
 
+from .src.catalog import TranslationCatalog, get_fallback_chain, load_catalog
+
+LANG_DIRECTORY = "./lang"
+CATALOG_CACHE_PATH = os.path.join(os.path.dirname(__file__), "data", "translations_catalog.pkl")
+
 SourceType = (
     None
     | int
@@ -30,14 +35,7 @@ class Languages(commands.Cog):
     def __init__(self, bot: Axobot):
         self.bot = bot
         self.file = "languages"
-        i18n.set("filename_format", "{locale}.{format}")
-        i18n.set("file_format", "json")
-        i18n.set("fallback", None)
-        i18n.set("on_missing_translation", "error")
-        i18n.set("skip_locale_root_data", True)
-        i18n.unload_everything()
-        i18n.load_path.clear()
-        i18n.load_path.append("./lang")
+        self.catalog: TranslationCatalog = load_catalog(LANG_DIRECTORY, CATALOG_CACHE_PATH)
 
     async def cog_load(self):
         await self.bot.tree.set_translator(AxobotTranslator(self.bot))
@@ -110,24 +108,30 @@ class Languages(commands.Cog):
         if lang_opt not in await self.get_available_languages():
             # if lang not known: fallback to default
             lang_opt = await self.get_default_language()
-        return await self._recursive_get_translation(lang_opt, string_id, **kwargs)
+        return await self._get_translation_with_fallback(lang_opt, string_id, **kwargs)
 
-    async def _recursive_get_translation(self, locale: str, string_id: str, **kwargs: Any) -> str:
+    async def _get_translation_with_fallback(self, locale: str, string_id: str, **kwargs: Any) -> str:
         "Find the translation in the given locale, or fallback to another locale"
+        if string_id == "_used_locale":
+            return locale
         try:
-            return await self.get_translation(locale, string_id, **kwargs)
+            value, source_locale = self.catalog.lookup(locale, string_id)
         except KeyError:
-            await self.msg_not_found(string_id, locale)
-            if locale == "en":
-                return string_id
-            fallback = "fr" if locale == "fr2" else "en"
-            return await self._recursive_get_translation(fallback, string_id, **kwargs)
+            for missing_locale in get_fallback_chain(locale):
+                await self.msg_not_found(string_id, missing_locale)
+            return string_id
+        if source_locale != locale:
+            for missing_locale in get_fallback_chain(locale):
+                if missing_locale == source_locale:
+                    break
+                await self.msg_not_found(string_id, missing_locale)
+        return self.catalog.format(string_id, value, kwargs)
 
     async def get_translation(self, locale: str, string_id: str, **kwargs: Any) -> str:
-        "Get a translation from the i18n files directly"
+        "Get a translation from the given locale only, or raise KeyError if it is missing"
         if string_id == "_used_locale":
             return locale
-        return i18n.t(string_id, locale=locale, **kwargs)
+        return self.catalog.translate(locale, string_id, kwargs, strict=True)
 
     async def msg_not_found(self, string_id: str, lang: str):
         "Signal to the dev that a translation is missing"
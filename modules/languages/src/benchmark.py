@@ -0,0 +1,51 @@
+"""Measure the throughput of the translations catalog
+
+Run it from the bot root directory with `python -m modules.languages.src.benchmark`"""
+import argparse
+import random
+import time
+
+from .catalog import CompiledString, TranslationCatalog, hash_translation_files
+
+SAMPLE_KWARGS = {"count": 3, "user": "Zbot", "name": "general", "channel": "#general", "level": 12}
+
+
+def run_benchmark(catalog: TranslationCatalog, locale: str, iterations: int, seed: int = 0):
+    "Translate random keys of a locale, and return the number of translations per second"
+    rng = random.Random(seed)
+    keys = list(catalog.keys(locale))
+    sample = [rng.choice(keys) for _ in range(iterations)]
+    start = time.perf_counter()
+    for key in sample:
+        catalog.translate(locale, key, SAMPLE_KWARGS)
+    duration = time.perf_counter() - start
+    return iterations / duration
+
+
+def main():
+    "Compile the catalog, then benchmark the translation of random keys"
+    parser = argparse.ArgumentParser(description="Benchmark the translations catalog")
+    parser.add_argument("--lang-dir", default="./lang", help="Directory containing the translation files")
+    parser.add_argument("--locale", action="append", help="Locale to benchmark (default: en, fr and fr2)")
+    parser.add_argument("--iterations", type=int, default=200_000, help="Number of translations per locale")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = TranslationCatalog.compile(args.lang_dir, hash_translation_files(args.lang_dir))
+    compile_duration = time.perf_counter() - start
+    placeholders_count = sum(
+        isinstance(value, CompiledString)
+        for locale in catalog.locales
+        for value, _ in catalog.values(locale)
+    )
+    print(
+        f"Compiled {len(catalog)} entries for {len(catalog.locales)} locales in {compile_duration*1000:.1f}ms "
+        f"({placeholders_count} with placeholders)"
+    )
+    for locale in args.locale or ["en", "fr", "fr2"]:
+        rate = run_benchmark(catalog, locale, args.iterations)
+        print(f"{locale}: {rate:,.0f} translations/s ({1e6/rate:.2f}µs per translation)")
+
+
+if __name__ == "__main__":
+    main()
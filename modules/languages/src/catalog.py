@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+from typing import Any, BinaryIO, NamedTuple, Union
+
+log = logging.getLogger("bot.languages")
+
+# bump this when the compiled format changes, to ignore older cache files
+CATALOG_VERSION = 1
+DEFAULT_LOCALE = "en"
+FALLBACK_LOCALES = {"fr2": "fr"}
+PLURAL_FORMS = frozenset({"zero", "one", "few", "many"})
+PLURAL_FEW = 5
+
+# same syntax as the python-i18n placeholders: %name, %{name}, %{name(args)}, and %% to escape
+PLACEHOLDER_PATTERN = re.compile(r"""
+    %(?:
+        (?P<escaped>%)
+        | (?P<named>\w+(?:\([^()]*\))?)
+        | {(?P<braced>\w+(?:\([^()]*\))?)}
+    )
+""", re.VERBOSE)
+
+
+class CompiledString(NamedTuple):
+    "A translation split around its placeholders, so that formatting is a simple join"
+    parts: tuple[str, ...]
+    placeholders: tuple[str, ...]
+    raw_placeholders: tuple[str, ...]
+
+    def render(self, kwargs: dict[str, Any]) -> str:
+        "Replace the placeholders by their value, or leave them untouched if they are missing"
+        result = [self.parts[0]]
+        for name, raw, part in zip(self.placeholders, self.raw_placeholders, self.parts[1:]):
+            result.append(str(kwargs[name]) if name in kwargs else raw)
+            result.append(part)
+        return "".join(result)
+
+
+TranslationValue = Union[str, CompiledString, dict[str, "TranslationValue"], tuple["TranslationValue", ...]]
+
+
+def get_fallback_chain(locale: str) -> list[str]:
+    "Get the list of locales to search a translation in, starting with the given one"
+    chain = [locale]
+    while chain[-1] != DEFAULT_LOCALE:
+        chain.append(FALLBACK_LOCALES.get(chain[-1], DEFAULT_LOCALE))
+    return chain
+
+
+def compile_string(text: str) -> str | CompiledString:
+    "Pre-parse the placeholders of a translation, or return it as-is if it has none"
+    if "%" not in text:
+        return text
+    parts: list[str] = []
+    placeholders: list[str] = []
+    raw_placeholders: list[str] = []
+    current = ""
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(text):
+        current += text[position:match.start()]
+        position = match.end()
+        if match.group("escaped") is not None:
+            current += "%"
+            continue
+        parts.append(current)
+        current = ""
+        placeholders.append(match.group("named") or match.group("braced"))
+        raw_placeholders.append(match.group())
+    current += text[position:]
+    if not placeholders:
+        return current
+    parts.append(current)
+    return CompiledString(tuple(parts), tuple(placeholders), tuple(raw_placeholders))
+
+
+def compile_value(value: Any) -> TranslationValue:
+    "Compile a raw translation value from a JSON file"
+    if isinstance(value, str):
+        return compile_string(value)
+    if isinstance(value, dict):
+        return {key: compile_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return tuple(compile_value(item) for item in value)
+    return str(value)
+
+
+def flatten_translations(data: dict[str, Any], namespace: str, result: dict[str, TranslationValue]):
+    "Flatten nested translations into dot-separated keys, except for plural forms"
+    prefix = namespace + "." if namespace else ""
+    for key, value in data.items():
+        full_key = prefix + key
+        if isinstance(value, dict) and not (value and PLURAL_FORMS.issuperset(value)):
+            flatten_translations(value, full_key, result)
+        else:
+            result[full_key] = compile_value(value)
+
+
+def list_translation_files(lang_dir: str) -> list[tuple[str, str, str]]:
+    "List the (path, namespace, locale) of every translation file, in a stable order"
+    files: list[tuple[str, str, str]] = []
+    for directory, _, filenames in os.walk(lang_dir):
+        namespace = os.path.relpath(directory, lang_dir).replace(os.sep, ".").strip(".")
+        for filename in filenames:
+            locale, extension = os.path.splitext(filename)
+            if extension == ".json":
+                files.append((os.path.join(directory, filename), namespace, locale))
+    return sorted(files)
+
+
+def hash_translation_files(lang_dir: str) -> str:
+    "Compute a hash of the names and content of every translation file"
+    digest = hashlib.sha256(str(CATALOG_VERSION).encode())
+    for path, _, _ in list_translation_files(lang_dir):
+        digest.update(os.path.relpath(path, lang_dir).encode() + b"\0")
+        with open(path, "rb") as file:
+            digest.update(file.read())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def pluralize(string_id: str, value: TranslationValue, count: int) -> TranslationValue:
+    "Select the plural form of a translation matching a count"
+    if not isinstance(value, dict):
+        return value
+    if count == 0:
+        if "zero" in value:
+            return value["zero"]
+    elif count == 1:
+        if "one" in value:
+            return value["one"]
+    elif count <= PLURAL_FEW and "few" in value:
+        return value["few"]
+    if "many" in value:
+        return value["many"]
+    return string_id
+
+
+def render(value: TranslationValue, kwargs: dict[str, Any]) -> Any:
+    "Format a compiled translation with the given arguments"
+    if isinstance(value, str):
+        return value
+    if isinstance(value, CompiledString):
+        return value.render(kwargs)
+    if isinstance(value, dict):
+        return {key: render(item, kwargs) for key, item in value.items()}
+    return tuple(render(item, kwargs) for item in value)
+
+
+class TranslationCatalog:
+    """Every translation of the bot, flattened into one dictionary per locale
+
+    Locale fallbacks (fr2 -> fr -> en, others -> en) are resolved at compile time, and each entry remembers which
+    locale it actually comes from, so that missing translations can still be reported."""
+
+    def __init__(self, content_hash: str, entries: dict[str, dict[str, tuple[TranslationValue, str]]]):
+        self.content_hash = content_hash
+        self._entries = entries
+
+    @classmethod
+    def compile(cls, lang_dir: str, content_hash: str):
+        "Read and compile every translation file of a directory"
+        own_translations: dict[str, dict[str, TranslationValue]] = {}
+        for path, namespace, locale in list_translation_files(lang_dir):
+            with open(path, "r", encoding="utf-8") as file:
+                flatten_translations(json.load(file), namespace, own_translations.setdefault(locale, {}))
+        entries: dict[str, dict[str, tuple[TranslationValue, str]]] = {}
+        for locale in own_translations:
+            resolved: dict[str, tuple[TranslationValue, str]] = {}
+            for source_locale in reversed(get_fallback_chain(locale)):
+                resolved.update(
+                    (key, (value, source_locale))
+                    for key, value in own_translations.get(source_locale, {}).items()
+                )
+            entries[locale] = resolved
+        return cls(content_hash, entries)
+
+    def dump(self, file: BinaryIO):
+        "Write the compiled catalog into a binary file"
+        pickle.dump((CATALOG_VERSION, self.content_hash, self._entries), file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @property
+    def locales(self):
+        "List of locales with at least one translation file"
+        return list(self._entries.keys())
+
+    def keys(self, locale: str):
+        "Get every translation key available in a locale, including the fallback ones"
+        return self._entries.get(locale, {}).keys()
+
+    def values(self, locale: str):
+        "Get every (compiled translation, source locale) pair of a locale"
+        return self._entries.get(locale, {}).values()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def lookup(self, locale: str, string_id: str) -> tuple[TranslationValue, str]:
+        """Get a compiled translation and the locale it comes from, following the locale fallbacks
+        Raises KeyError if no locale of the fallback chain knows it"""
+        if (entries := self._entries.get(locale)) is None:
+            for fallback in get_fallback_chain(locale)[1:]:
+                if (entries := self._entries.get(fallback)) is not None:
+                    break
+            else:
+                raise KeyError(string_id)
+        return entries[string_id]
+
+    def translate(self, locale: str, string_id: str, kwargs: dict[str, Any], strict: bool = False) -> Any:
+        """Get a formatted translation
+        If strict is True, a KeyError is raised when the translation only exists in a fallback locale"""
+        value, source_locale = self.lookup(locale, string_id)
+        if strict and source_locale != locale:
+            raise KeyError(string_id)
+        return self.format(string_id, value, kwargs)
+
+    @staticmethod
+    def format(string_id: str, value: TranslationValue, kwargs: dict[str, Any]) -> Any:
+        "Apply the plural form and arguments to a compiled translation"
+        if "count" in kwargs:
+            # compiled strings are tuples too, so we check the exact type
+            if value.__class__ is tuple:
+                value = tuple(pluralize(string_id, item, kwargs["count"]) for item in value)
+            else:
+                value = pluralize(string_id, value, kwargs["count"])
+        if value.__class__ is str:
+            return value
+        return render(value, kwargs)
+
+
+def load_catalog(lang_dir: str, cache_path: str) -> TranslationCatalog:
+    "Load the translations catalog from its cache file if the translation files did not change, or compile it"
+    content_hash = hash_translation_files(lang_dir)
+    try:
+        with open(cache_path, "rb") as file:
+            version, cached_hash, entries = pickle.load(file)
+        if version == CATALOG_VERSION and cached_hash == content_hash:
+            return TranslationCatalog(content_hash, entries)
+    except FileNotFoundError:
+        pass
+    except Exception: # pylint: disable=broad-except
+        log.warning("Unable to read the translations cache file %s", cache_path, exc_info=True)
+    catalog = TranslationCatalog.compile(lang_dir, content_hash)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, "wb") as file:
+            catalog.dump(file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        log.warning("Unable to write the translations cache file %s", cache_path, exc_info=True)
+    return catalog
@@ -1,9 +1,12 @@
 import datetime
 import math
+from io import BytesIO
 from typing import Literal
 
 from PIL import Image, ImageDraw, ImageFont
 
+from core.caching.image_assets import image_assets
+
 QuoteStyle = Literal["modern", "classic"]
 
 CARD_SIZE = (1000, 400)
@@ -19,6 +22,20 @@ AUTHOR_RECT = ((350, 290), (930, 310))
 MIN_FONT_SIZE = 17
 WATERMARK_SIZE = (85, 15)
 WATERMARK_POSITION = (CARD_SIZE[0] - WATERMARK_SIZE[0] - 20, CARD_SIZE[1] - WATERMARK_SIZE[1] - 20)
+QUOTE_BACKGROUND_PATH = "./assets/images/quote_background.png"
+WATERMARK_PATH = "./assets/images/axobot_gray.png"
+QUOTE_FONTS = {
+    "modern": ("./assets/fonts/Roboto-Medium.ttf", "./assets/fonts/RobotoSlab-Regular.ttf"),
+    "classic": ("./assets/fonts/DancingScript-Medium.ttf", "./assets/fonts/Metropolis-Thin.otf"),
+}
+
+
+def preload_quote_assets():
+    "Load the quote background and fonts at their default size, in the current process"
+    image_assets.preload_images([QUOTE_BACKGROUND_PATH], mode="RGBA")
+    for quote_font_name, author_font_name in QUOTE_FONTS.values():
+        image_assets.get_font(quote_font_name, QUOTE_FONT_SIZE)
+        image_assets.get_font(author_font_name, AUTHOR_FONT_SIZE)
 
 class QuoteGeneration:
     "Generate a quote card from a message"
@@ -30,17 +47,9 @@ class QuoteGeneration:
         self.avatar = avatar
         self.date = date
         self.style = style
-        if self.style == "modern":
-            self.max_characters_per_line = 60
-            self.quote_font_name = "./assets/fonts/Roboto-Medium.ttf"
-            self.author_font_name = "./assets/fonts/RobotoSlab-Regular.ttf"
-        else:
-            self.max_characters_per_line = 75
-            self.quote_font_name = "./assets/fonts/DancingScript-Medium.ttf"
-            self.author_font_name = "./assets/fonts/Metropolis-Thin.otf"
-        self.fonts_cache: dict[tuple[str, int], ImageFont.FreeTypeFont] = {}
-        with open("./assets/images/quote_background.png", "rb") as f:
-            self.result = Image.open(f).convert("RGBA")
+        self.max_characters_per_line = 60 if self.style == "modern" else 75
+        self.quote_font_name, self.author_font_name = QUOTE_FONTS["modern" if self.style == "modern" else "classic"]
+        self.result = image_assets.get_image(QUOTE_BACKGROUND_PATH, mode="RGBA").copy()
         self.last_quote_line_bottomheight = QUOTE_RECT[1][1]
 
     def _generate_background_gradient(self):
@@ -93,8 +102,8 @@ class QuoteGeneration:
             avatar = self.avatar.convert("LA")
         else:
             avatar = self.avatar
-        # create the mask
-        mask_im = self._create_avatar_mask()
+        # get the mask, which only depends on the style
+        mask_im = image_assets.get_generated_image(("quote_avatar_mask", self.style), self._create_avatar_mask)
         # apply the mask to a copy of the avatar (to avoid issues with transparency)
         avatar_with_mask = Image.new("RGBA", avatar.size, (0, 0, 0, 0))
         avatar_with_mask.paste(avatar, mask=mask_im)
@@ -103,33 +112,20 @@ class QuoteGeneration:
 
     def _paste_watermark(self):
         "Paste the watermark onto the destination image, in the bottom right corner"
-        watermark = Image.open("./assets/images/axobot_gray.png")
-        watermark = watermark.resize(WATERMARK_SIZE, resample=Image.Resampling.LANCZOS)
+        watermark = image_assets.get_image(WATERMARK_PATH, WATERMARK_SIZE, resample=Image.Resampling.LANCZOS)
         self.result.paste(watermark, WATERMARK_POSITION, watermark)
 
-    def _find_max_text_size(self, text: str, rect: tuple[tuple[int, int], tuple[int, int]], font_name: str, font_size: str):
+    def _find_max_text_size(self, text: str, rect: tuple[tuple[int, int], tuple[int, int]], font_name: str,
+                            font_size: int):
+        "Find the biggest font, between MIN_FONT_SIZE and font_size, with which the text fits within the rectangle"
         draw = ImageDraw.Draw(self.result)
-        while True:
-            if (font_name, font_size) in self.fonts_cache:
-                font = self.fonts_cache[(font_name, font_size)]
-            else:
-                try:
-                    font = ImageFont.truetype(font_name, font_size)
-                except OSError:
-                    raise ValueError(f"Font {font_name} not found") from None
-                self.fonts_cache[(font_name, font_size)] = font
-            # If font size is too small, abort
-                if font_size < MIN_FONT_SIZE:
-                    break
-            # Measure the size of the text when rendered with the current font
+
+        def measure(font: ImageFont.FreeTypeFont):
             text_box = draw.multiline_textbbox((0, 0), text, font=font, spacing=QUOTE_LINE_SPACING)
-            text_width, text_height = text_box[2] - text_box[0], text_box[3] - text_box[1]
-            # If the text fits within the rectangle, we're done
-            if text_width <= (rect[1][0] - rect[0][0]) and text_height <= (rect[1][1] - rect[0][1]):
-                break
-            # Otherwise, reduce the font size and try again
-            font_size = round(font_size*0.8)
-        return font
+            return text_box[2] - text_box[0], text_box[3] - text_box[1]
+
+        box_size = (rect[1][0] - rect[0][0], rect[1][1] - rect[0][1])
+        return image_assets.fit_font(font_name, font_size, MIN_FONT_SIZE, box_size, measure)
 
     def _split_text(self, text: str):
         """Split the text into multiple lines of max MAX_CHARACTERS_PER_LINE characters
@@ -212,3 +208,12 @@ class QuoteGeneration:
         # self._paste_watermark()
         self._add_texts()
         return self.result
+
+
+def render_quote(text: str, author_name: str, avatar: bytes, date: datetime.datetime, style: QuoteStyle) -> bytes:
+    "Generate a quote card inside a render worker, and encode it as PNG"
+    with Image.open(BytesIO(avatar)) as avatar_img:
+        generated_card = QuoteGeneration(text, author_name, avatar_img, date, style).draw_card()
+    result = BytesIO()
+    generated_card.save(result, format="PNG")
+    return result.getvalue()
@@ -4,13 +4,12 @@ import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands
-from PIL import Image
 
 from core.arguments import args
 from core.bot_classes import Axobot
 from core.text_cleanup import remove_markdown
 
-from .generator import QuoteGeneration, QuoteStyle
+from .generator import QuoteStyle, preload_quote_assets, render_quote
 
 
 class Quote(commands.Cog):
@@ -26,6 +25,10 @@ class Quote(commands.Cog):
         )
         self.bot.tree.add_command(self.quote_ctx_menu)
 
+    async def cog_load(self):
+        "Preload the quote assets in the image rendering workers"
+        self.bot.render_pool.register_initializer(preload_quote_assets)
+
     async def cog_unload(self):
         "Disable the Quote context menu"
         self.bot.tree.remove_command(self.quote_ctx_menu.name, type=self.quote_ctx_menu.type)
@@ -71,25 +74,21 @@ class Quote(commands.Cog):
             text = text.replace("\n\n", "\n")
         author_name = message.author.display_name
         author_avatar = await self.get_image_from_url(message.author.display_avatar.replace(format="png", size=256).url)
-        generator = QuoteGeneration(
+        generated_card = await self.bot.render_pool.submit(
+            "quote", render_quote,
             text,
             author_name,
             author_avatar,
             message.created_at,
             style,
         )
-        generated_card = generator.draw_card()
-
-        img_byte_arr = BytesIO()
-        generated_card.save(img_byte_arr, format="PNG")
-        img_byte_arr.seek(0)
-        return discord.File(img_byte_arr, filename="quote.png")
+        return discord.File(BytesIO(generated_card), filename="quote.png")
 
     async def get_image_from_url(self, url: str):
-        "Download an image from an url"
+        "Download an image from an url, as raw bytes"
         async with aiohttp.ClientSession() as session:
             async with session.get(url) as response:
-                return Image.open(BytesIO(await response.read()))
+                return await response.read()
 
 
 async def setup(bot: Axobot):
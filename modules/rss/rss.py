@@ -21,6 +21,7 @@ from core.bot_classes import Axobot
 from core.checks import checks
 from core.enums import ServerWarningType
 from core.formatutils import FormatUtils
+from core.loop_lag_monitor import LoopLagMonitor
 from core.paginator import PaginatedSelectView, Paginator
 from core.tips import GuildTip
 from core.type_utils import AnyStrDict, channel_is_messageable
@@ -28,6 +29,7 @@ from core.views import ConfirmView, TextInputModal
 from modules.rss.src.rss_bluesky import BlueskyRSS
 
 from .src import FeedObject, RssMessage, YoutubeRSS, feed_parse
+from .src.feed_fetcher import FeedFetcher, HttpValidators
 from .src.rss_deviantart import DeviantartRSS
 from .src.general import InvalidFormatError
 from .src.rss_twitch import TwitchRSS
@@ -80,6 +82,8 @@ class Rss(commands.Cog):
         self.deviant_rss = DeviantartRSS(self.bot)
         self.twitch_rss = TwitchRSS(self.bot)
         self.bluesky_rss = BlueskyRSS(self.bot)
+        # ETag and Last-Modified values of each feed URL, loaded from the database on the first loop
+        self.http_validators: dict[int, HttpValidators] | None = None
 
     @property
     def table(self):
@@ -1270,7 +1274,12 @@ class Rss(commands.Cog):
         args_placeholder = ",".join(["%s"] * len(feed_ids))
         query = f"DELETE FROM `{self.table}` WHERE ID IN ({args_placeholder})"
         async with self.bot.db_main.write(query, tuple(feed_ids), returnrowcount=True) as query_result:
-            return query_result is not None and query_result > 0
+            deleted = query_result is not None and query_result > 0
+        try:
+            await self.db_delete_http_validators(feed_ids)
+        except Exception as err:
+            self.bot.dispatch("error", err, "While deleting RSS HTTP validators")
+        return deleted
 
     async def db_enable_feeds(self, feed_ids: list[int], *, enable: bool) -> bool:
         "Enable or disable feeds in the database"
@@ -1341,6 +1350,58 @@ class Rss(commands.Cog):
         async with self.bot.db_main.write(query, (self.bot.utcnow(),), returnrowcount=True) as query_results:
             self.log.info("Set last refresh date for %s feeds", query_results)
 
+    async def db_create_http_validators_table(self):
+        "Create the table of the feeds HTTP cache validators, if it doesn't exist yet"
+        query = """CREATE TABLE IF NOT EXISTS `rss_http_validators` (
+            `feed_id` BIGINT UNSIGNED NOT NULL,
+            `beta` BOOLEAN NOT NULL DEFAULT FALSE,
+            `etag` VARCHAR(1024) NULL DEFAULT NULL,
+            `last_modified` VARCHAR(64) NULL DEFAULT NULL,
+            PRIMARY KEY (`feed_id`, `beta`)
+        )"""
+        async with self.bot.db_main.write(query):
+            pass
+
+    async def db_get_http_validators(self) -> dict[int, HttpValidators]:
+        "Get the HTTP cache validators of the last content processed by each feed"
+        await self.db_create_http_validators_table()
+        query = "SELECT `feed_id`, `etag`, `last_modified` FROM `rss_http_validators` WHERE `beta`=%s"
+        async with self.bot.db_main.read(query, (self.bot.beta,)) as query_results:
+            return {
+                row["feed_id"]: HttpValidators(row["etag"], row["last_modified"])
+                for row in query_results
+            }
+
+    async def db_set_http_validators(self, validators: dict[int, HttpValidators]):
+        "Insert or update the HTTP cache validators of some feeds"
+        if self.bot.zombie_mode or not validators:
+            return
+        items = list(validators.items())
+        for i in range(0, len(items), 500):
+            chunk = items[i:i+500]
+            placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+            query = f"INSERT INTO `rss_http_validators` (`feed_id`, `beta`, `etag`, `last_modified`) VALUES {placeholders} \
+ON DUPLICATE KEY UPDATE `etag` = VALUES(`etag`), `last_modified` = VALUES(`last_modified`)"
+            query_args = tuple(
+                value
+                for feed_id, feed_validators in chunk
+                for value in (feed_id, self.bot.beta, feed_validators.etag, feed_validators.last_modified)
+            )
+            async with self.bot.db_main.write(query, query_args):
+                pass
+
+    async def db_delete_http_validators(self, feed_ids: list[int]):
+        "Forget about the HTTP cache validators of some deleted feeds"
+        if self.http_validators is not None:
+            for feed_id in feed_ids:
+                self.http_validators.pop(feed_id, None)
+        if self.bot.zombie_mode or not feed_ids:
+            return
+        args_placeholder = ",".join(["%s"] * len(feed_ids))
+        query = f"DELETE FROM `rss_http_validators` WHERE `beta`=%s AND `feed_id` IN ({args_placeholder})"
+        async with self.bot.db_main.write(query, (self.bot.beta, *feed_ids)):
+            pass
+
     async def send_rss_msg(self, obj: "RssMessage", channel: discord.TextChannel | discord.Thread):
         "Send a RSS message into its Discord channel, with the corresponding mentions"
         content = await obj.create_msg()
@@ -1377,7 +1438,7 @@ class Rss(commands.Cog):
             pass
         return None
 
-    async def check_feed(self, feed: FeedObject, session: ClientSession | None = None, should_send_stats: bool = False):
+    async def check_feed(self, feed: FeedObject, fetcher: FeedFetcher | None = None, should_send_stats: bool = False):
         """Check one rss feed and send messages if required
         Return True if the operation was a success"""
         guild = self.bot.get_guild(feed.guild_id)
@@ -1390,36 +1451,38 @@ class Rss(commands.Cog):
             self.bot.dispatch("server_warning", ServerWarningType.RSS_UNKNOWN_CHANNEL, guild,
                                 channel_id=feed.channel_id, feed_id=feed.feed_id)
             return False
+        # let the fetcher use the validators of this specific feed
+        feed_fetcher = fetcher.for_feed(feed.feed_id) if fetcher is not None else None
         if feed.type == "yt":
             if feed.date is None:
-                objs = await self.youtube_rss.get_last_post(chan, feed.link, feed.filter_config, session)
+                objs = await self.youtube_rss.get_last_post(chan, feed.link, feed.filter_config, feed_fetcher)
             else:
-                objs = await self.youtube_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config, session)
+                objs = await self.youtube_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config, feed_fetcher)
         elif feed.type == "tw":
             self.bot.dispatch("server_warning", ServerWarningType.RSS_TWITTER_DISABLED, guild,
                                 channel_id=feed.channel_id, feed_id=feed.feed_id)
             return False
         elif feed.type == "web":
             if feed.date is None:
-                objs = await self.web_rss.get_last_post(chan, feed.link, feed.filter_config, session)
+                objs = await self.web_rss.get_last_post(chan, feed.link, feed.filter_config, feed_fetcher)
             else:
                 objs = await self.web_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config,
-                                                        feed.last_entry_id, session)
+                                                        feed.last_entry_id, feed_fetcher)
         elif feed.type == "deviant":
             if feed.date is None:
-                objs = await self.deviant_rss.get_last_post(chan, feed.link, feed.filter_config, session)
+                objs = await self.deviant_rss.get_last_post(chan, feed.link, feed.filter_config, feed_fetcher)
             else:
-                objs = await self.deviant_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config, session)
+                objs = await self.deviant_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config, feed_fetcher)
         elif feed.type == "twitch":
             if feed.date is None:
-                objs = await self.twitch_rss.get_last_post(chan, feed.link, feed.filter_config, session)
+                objs = await self.twitch_rss.get_last_post(chan, feed.link, feed.filter_config, feed_fetcher)
             else:
-                objs = await self.twitch_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config, session)
+                objs = await self.twitch_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config, feed_fetcher)
         elif feed.type == "bluesky":
             if feed.date is None:
-                objs = await self.bluesky_rss.get_last_post(chan, feed.link, feed.filter_config, session)
+                objs = await self.bluesky_rss.get_last_post(chan, feed.link, feed.filter_config, feed_fetcher)
             else:
-                objs = await self.bluesky_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config, session)
+                objs = await self.bluesky_rss.get_new_posts(chan, feed.link, feed.date, feed.filter_config, feed_fetcher)
         else:
             self.bot.dispatch("error", RuntimeError(f"Unknown feed type {feed.type}"))
             return False
@@ -1478,7 +1541,7 @@ class Rss(commands.Cog):
                                       feed_id=feed.feed_id
                                       )
 
-    async def _loop_refresh_one_feed(self, feed: FeedObject, session: ClientSession, guild_id: int | None) -> bool | None:
+    async def _loop_refresh_one_feed(self, feed: FeedObject, fetcher: FeedFetcher, guild_id: int | None) -> bool | None:
         """Refresh one feed (called by the refresh_feeds method loop)
 
         Returns True if the feed was checked and messages were sent, False if it was checked but no messages were sent,
@@ -1492,7 +1555,7 @@ class Rss(commands.Cog):
                 else:
                     return None
             else:
-                result = await self.check_feed(feed, session, should_send_stats=guild_id is None)
+                result = await self.check_feed(feed, fetcher, should_send_stats=guild_id is None)
         except Exception as err:
             error_msg = f"RSS error on feed {feed.feed_id} (type {feed.type} - channel {feed.channel_id} )"
             self.bot.dispatch("error", err, error_msg)
@@ -1507,8 +1570,17 @@ class Rss(commands.Cog):
         if self.loop_processing:
             return
         if guild_id is None:
-            self.log.info("Started RSS check")
             self.loop_processing = True
+        try:
+            await self._refresh_feeds(start, guild_id)
+        finally:
+            if guild_id is None:
+                self.loop_processing = False
+
+    async def _refresh_feeds(self, start: float, guild_id: int | None):
+        "Check every feed of a guild (or every feed if guild_id is None), then log the results"
+        if guild_id is None:
+            self.log.info("Started RSS check")
             feeds_list = await self.db_get_all_feeds()
         else:
             self.log.info("Started RSS check for guild %s", guild_id)
@@ -1518,15 +1590,28 @@ class Rss(commands.Cog):
         success_ids: list[int] = []
         errors_ids: list[int] = []
         checked_count = 0
-        async with ClientSession() as session:
+        # validators are only used by the global loop, as a guild refresh doesn't check the other feeds of the same URL
+        validators: dict[int, HttpValidators] | None = None
+        if guild_id is None:
+            if self.http_validators is None:
+                try:
+                    self.http_validators = await self.db_get_http_validators()
+                except Exception as err:
+                    self.bot.dispatch("error", err, "While loading RSS HTTP validators")
+            # without them, feeds are fully downloaded, and the next loop will try to load them again
+            validators = self.http_validators if self.http_validators is not None else {}
+        async with ClientSession() as session, LoopLagMonitor() as lag_monitor:
+            # each URL is downloaded once, and shared between every feed following it
+            fetcher = FeedFetcher(session, validators)
             # execute asyncio.gather by group of 'FEEDS_PER_SUBLOOP' feeds
             for i in range(0, len(feeds_list), FEEDS_PER_SUBLOOP):
                 task_feeds = feeds_list[i:i+FEEDS_PER_SUBLOOP]
-                results = await asyncio.gather(*[self._loop_refresh_one_feed(feed, session, guild_id) for feed in task_feeds])
+                results = await asyncio.gather(*[self._loop_refresh_one_feed(feed, fetcher, guild_id) for feed in task_feeds])
                 for task_result, feed in zip(results, task_feeds, strict=True):
                     if task_result is True:
                         checked_count += 1
                         success_ids.append(feed.feed_id)
+                        fetcher.mark_processed(feed.feed_id)
                     elif task_result is False:
                         checked_count += 1
                         errors_ids.append(feed.feed_id)
@@ -1535,8 +1620,23 @@ class Rss(commands.Cog):
                     await asyncio.sleep(self.time_between_feeds_check)
         if mc_cog := self.bot.get_cog("Minecraft"):
             mc_cog.feeds.clear()
+        if guild_id is None:
+            try:
+                await self.db_set_http_validators(fetcher.updated_validators)
+            except Exception as err:
+                self.bot.dispatch("error", err, "While saving RSS HTTP validators")
         elapsed_time = round(time.time() - start)
-        desc = [f"**RSS loop done** in {elapsed_time}s ({len(success_ids)}/{checked_count} feeds)"]
+        fetch_stats = fetcher.get_stats()
+        desc = [
+            f"**RSS loop done** in {elapsed_time}s ({len(success_ids)}/{checked_count} feeds)",
+            f"{fetch_stats.requests} requests ({fetch_stats.shared} shared, {fetch_stats.not_modified} not modified)",
+            f"Event loop lag: {lag_monitor.avg_lag_ms:.1f}ms avg, {lag_monitor.max_lag_ms:.0f}ms max",
+            f"Parsing time: {fetch_stats.parse_time:.1f}s",
+        ]
+        if fetch_stats.slowest_parses:
+            desc[-1] += " (slowest: " + ", ".join(
+                f"<{url[:100]}> {duration*1000:.0f}ms" for url, duration in fetch_stats.slowest_parses
+            ) + ")"
         if guild_id is None:
             if statscog := self.bot.get_cog("BotStats"):
                 statscog.rss_stats["checked"] = checked_count
@@ -1545,7 +1645,8 @@ class Rss(commands.Cog):
                 statscog.rss_loop_finished = True
         await self.db_set_last_refresh(list(feed.feed_id for feed in feeds_list))
         if len(errors_ids) > 0:
-            desc.append(f"{len(errors_ids)} errors: {' '.join(str(x) for x in errors_ids)}")
+            errors_desc = f"{len(errors_ids)} errors: {' '.join(str(x) for x in errors_ids)}"
+            desc.append(errors_desc)
             # update errors count in database
             await self.db_increment_errors(working_ids=success_ids, broken_ids=errors_ids)
             # disable feeds that have too many errors
@@ -1558,9 +1659,7 @@ class Rss(commands.Cog):
         await self.bot.send_embed(emb, url="loop")
         self.log.info(desc[0])
         if len(errors_ids) > 0:
-            self.log.warning(desc[1])
-        if guild_id is None:
-            self.loop_processing = False
+            self.log.warning(errors_desc)
 
     @tasks.loop(time=RSS_LOOPS_OCCURRENCES)
     async def rss_loop(self):
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from aiohttp import ClientSession
+from feedparser.util import FeedParserDict
+
+from .general import download_and_parse_feed
+
+DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+
+
+def normalize_feed_url(url: str) -> str:
+    "Normalize a feed URL, so that equivalent URLs are fetched only once"
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (default_port := DEFAULT_PORTS.get(scheme)) and netloc.endswith(default_port):
+        netloc = netloc.removesuffix(default_port)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+class HttpValidators(NamedTuple):
+    "Cache validators returned by a server for a given URL"
+    etag: str | None
+    last_modified: str | None
+
+
+class FeedFetcherStats(NamedTuple):
+    "Number of requests made and saved by a FeedFetcher"
+    requests: int
+    shared: int
+    not_modified: int
+    parse_time: float
+    slowest_parses: list[tuple[str, float]]
+
+
+class FeedFetcher:
+    """Download and parse feeds for one RSS loop
+
+    Each normalized URL is downloaded and parsed only once, and the result is shared between every feed following it.
+    ETag and Last-Modified validators are kept for each feed, and only updated once the feed has successfully processed
+    the content they describe: that way, a feed can safely skip a cheap 304 response.
+    Fetchers created without validators (like for a single guild refresh) always download the full content."""
+
+    def __init__(self, session: ClientSession, validators: dict[int, HttpValidators] | None):
+        self.session = session
+        self.validators = validators
+        # validators updated during this loop, to save in the database
+        self.updated_validators: dict[int, HttpValidators] = {}
+        # validators of the content received by each feed, until the feed has processed it
+        self._received_validators: dict[int, HttpValidators] = {}
+        # full downloads, usable by any feed
+        self._full_fetches: dict[str, asyncio.Task[FeedParserDict | None]] = {}
+        # conditional downloads, which may return an empty 304 response, shared by feeds with the same validators
+        self._conditional_fetches: dict[tuple[str, HttpValidators], asyncio.Task[FeedParserDict | None]] = {}
+        self._requests_count = 0
+        self._shared_count = 0
+        self._not_modified_count = 0
+        # time spent parsing each URL, in seconds
+        self._parse_durations: dict[str, float] = {}
+
+    def for_feed(self, feed_id: int):
+        "Get a fetcher bound to a given feed, to use its own validators"
+        return BoundFeedFetcher(self, feed_id)
+
+    async def parse(self, url: str, timeout: int, conditional: bool = True,
+                    feed_id: int | None = None) -> FeedParserDict | None:
+        """Get the parsed content of a feed
+        If conditional is True and the feed did not change since the given feed last processed it, an empty feed with a
+        304 status is returned. Feeds that need to access their latest entries anyway should set it to False."""
+        key = normalize_feed_url(url)
+        validators = None
+        if conditional and feed_id is not None and self.validators is not None:
+            validators = self.validators.get(feed_id)
+        task = self._full_fetches.get(key)
+        if task is None and validators is not None:
+            task = self._conditional_fetches.get((key, validators))
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, url, timeout, validators))
+            if validators is None:
+                self._full_fetches[key] = task
+            else:
+                self._conditional_fetches[(key, validators)] = task
+        else:
+            self._shared_count += 1
+        result = await asyncio.shield(task)
+        if result is None:
+            return None
+        if feed_id is not None and self.validators is not None and result.get("status") == 200 \
+                and (response_headers := result.get("headers")):
+            received = HttpValidators(response_headers.get("etag"), response_headers.get("last-modified"))
+            if received.etag or received.last_modified:
+                self._received_validators[feed_id] = received
+        # give each caller its own entries list, as they may filter it
+        return FeedParserDict(result, entries=list(result.get("entries", [])))
+
+    async def _fetch(self, key: str, url: str, timeout: int,
+                     validators: HttpValidators | None) -> FeedParserDict | None:
+        "Download a feed, making a conditional request if validators are given"
+        request_headers: dict[str, str] = {}
+        if validators is not None:
+            if validators.etag:
+                request_headers["If-None-Match"] = validators.etag
+            if validators.last_modified:
+                request_headers["If-Modified-Since"] = validators.last_modified
+        self._requests_count += 1
+        result = await download_and_parse_feed(self.session, url, timeout, request_headers)
+        if result is None:
+            return None
+        if (parse_duration := result.get("parse_duration")) is not None:
+            self._parse_durations[key] = self._parse_durations.get(key, 0.0) + parse_duration
+        if result.get("status") == 304:
+            self._not_modified_count += 1
+            return result
+        # the full content is available, so feeds that can't use a 304 response can reuse it
+        if (current_task := asyncio.current_task()) is not None:
+            self._full_fetches.setdefault(key, current_task)  # type: ignore
+        return result
+
+    def mark_processed(self, feed_id: int):
+        """Keep the validators of the content received by a feed, once the feed has successfully processed it
+        Feeds that failed keep their previous validators, so that they get the full content again next time"""
+        if (validators := self._received_validators.pop(feed_id, None)) is None or self.validators is None:
+            return
+        if validators != self.validators.get(feed_id):
+            self.validators[feed_id] = validators
+            self.updated_validators[feed_id] = validators
+
+    def get_stats(self, slowest_count: int = 3):
+        """Get the number of requests made, shared between feeds, and answered with a 304 status,
+        as well as the total parsing time and the slowest parsed URLs"""
+        slowest_parses = sorted(self._parse_durations.items(), key=lambda item: item[1], reverse=True)
+        return FeedFetcherStats(
+            requests=self._requests_count,
+            shared=self._shared_count,
+            not_modified=self._not_modified_count,
+            parse_time=sum(self._parse_durations.values()),
+            slowest_parses=slowest_parses[:slowest_count],
+        )
+
+
+class BoundFeedFetcher:
+    "A FeedFetcher used on behalf of a single feed"
+
+    def __init__(self, fetcher: FeedFetcher, feed_id: int):
+        self.fetcher = fetcher
+        self.feed_id = feed_id
+
+    async def parse(self, url: str, timeout: int, conditional: bool = True) -> FeedParserDict | None:
+        "Get the parsed content of a feed, see FeedFetcher.parse"
+        return await self.fetcher.parse(url, timeout, conditional, self.feed_id)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import datetime
 import json
@@ -10,7 +11,8 @@ from typing import TYPE_CHECKING, Literal, TypedDict
 
 import discord
 import feedparser
-from aiohttp import ClientSession, ClientTimeout, client_exceptions
+from aiohttp import (ClientResponse, ClientSession, ClientTimeout,
+                     client_exceptions)
 from cachetools import TTLCache
 from feedparser.util import FeedParserDict
 
@@ -28,42 +30,75 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("bot.rss")
 
+# max size of a downloaded feed, bigger responses are ignored
+MAX_FEED_SIZE = 5 * 1024 * 1024
+FEED_READ_CHUNK_SIZE = 64 * 1024
+# feeds are parsed in worker threads, to avoid blocking the event loop with big documents
+_parse_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="feedparser")
+
+
+class FeedTooLargeError(Exception):
+    "Raised when a feed response body is bigger than MAX_FEED_SIZE"
+
+
+async def _read_feed_body(response: ClientResponse) -> bytes:
+    "Read a response body by chunks, and stop as soon as it gets bigger than MAX_FEED_SIZE"
+    if response.content_length is not None and response.content_length > MAX_FEED_SIZE:
+        raise FeedTooLargeError
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(FEED_READ_CHUNK_SIZE):
+        body.extend(chunk)
+        if len(body) > MAX_FEED_SIZE:
+            raise FeedTooLargeError
+    return bytes(body)
+
+def _parse_feed_body(body: bytes, response_headers: dict[str, str]) -> tuple[FeedParserDict, float]:
+    "Parse a feed document and measure the time it took (called from a worker thread)"
+    start = time.perf_counter()
+    result = feedparser.api.parse(body, response_headers=response_headers)
+    return result, time.perf_counter() - start
+
 @position_cached(TTLCache(maxsize=1_000, ttl=60 * 5), key=0)
 async def feed_parse(url: str, timeout: int, session: ClientSession | None = None
                      ) -> FeedParserDict | None:
     """Asynchronous parsing using cool methods"""
     # if session is provided, we have to not close it
     if session is None:
-        _session = ClientSession()
-    else:
-        _session = session
+        async with ClientSession() as _session:
+            return await download_and_parse_feed(_session, url, timeout)
+    return await download_and_parse_feed(session, url, timeout)
+
+async def download_and_parse_feed(session: ClientSession, url: str, timeout: int,
+                                  request_headers: dict[str, str] | None = None) -> FeedParserDict | None:
+    """Download and parse a feed, without any caching
+    Extra request headers can be used to make a conditional request, in which case a 304 status may be returned"""
+    headers = {"User-Agent": "Axobot feedparser"}
+    if request_headers:
+        headers |= request_headers
     try:
-        user_agent_header = {"User-Agent": "Axobot feedparser"}
-        async with _session.get(url, timeout=ClientTimeout(total=timeout), headers=user_agent_header) as response:
-            html = await response.text()
-            headers = response.raw_headers
+        async with session.get(url, timeout=ClientTimeout(total=timeout), headers=headers) as response:
+            body = await _read_feed_body(response)
+            raw_headers = response.raw_headers
+    except FeedTooLargeError:
+        logger.warning("feed_parse got a response bigger than %s bytes for URL %s", MAX_FEED_SIZE, url)
+        return FeedParserDict(entries=[], feed=FeedParserDict(), status=413)
     except (UnicodeDecodeError, client_exceptions.ClientError):
-        if session is None:
-            await _session.close()
         return FeedParserDict(entries=[], feed=FeedParserDict(), status=200)
     except asyncio.exceptions.TimeoutError:
-        if session is None:
-            await _session.close()
         # request was cancelled by timeout
         logger.warning("feed_parse got a timeout for url %s", url)
         return None
-    except Exception as err:
-        if session is None:
-            await _session.close()
-        raise err
-    if session is None:
-        await _session.close()
+    if response.status == 304:
+        return FeedParserDict(entries=[], feed=FeedParserDict(), status=304)
     if response.status >= 400:
         logger.info("feed_parse got a %s error for URL %s", response.status, url)
         return FeedParserDict(entries=[], feed=FeedParserDict(), status=response.status)
-    headers = {k.decode("utf-8").lower(): v.decode("utf-8") for k, v in headers}
-    result = feedparser.api.parse(html, response_headers=headers)
+    response_headers = {k.decode("utf-8").lower(): v.decode("utf-8") for k, v in raw_headers}
+    result, parse_duration = await asyncio.get_running_loop().run_in_executor(
+        _parse_executor, _parse_feed_body, body, response_headers
+    )
     result["status"] = response.status
+    result["parse_duration"] = parse_duration
     return result
 
 async def _entry_match_word(entry: FeedParserDict, word: str) -> bool:
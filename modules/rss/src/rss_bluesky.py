@@ -4,11 +4,11 @@ import datetime as dt
 import re
 from typing import TYPE_CHECKING
 
-import aiohttp
 import discord
 from feedparser.util import FeedParserDict
 
 from .convert_post_to_text import get_text_from_entry
+from .feed_fetcher import BoundFeedFetcher
 from .general import (FeedFilterConfig, FeedObject, RssMessage,
                           check_filter, feed_parse)
 
@@ -36,10 +36,13 @@ class BlueskyRSS:
         return matches.group(1)
 
     async def _get_feed(self, username: str, filter_config: FeedFilterConfig | None=None,
-                        session: aiohttp.ClientSession | None=None) -> FeedParserDict | None:
+                        fetcher: BoundFeedFetcher | None=None, conditional: bool=False) -> FeedParserDict | None:
         "Get a list of feeds from a Bluesky username"
         url = f"https://bsky.app/profile/{username}/rss"
-        feed = await feed_parse(url, 9, session)
+        if fetcher is None:
+            feed = await feed_parse(url, 9)
+        else:
+            feed = await fetcher.parse(url, 9, conditional)
         if feed is None or "bozo_exception" in feed or not feed.entries:
             return None
         if filter_config is not None:
@@ -69,9 +72,9 @@ class BlueskyRSS:
 
     async def get_last_post(self, channel:"discord.abc.MessageableChannel", username: str,
                             filter_config: FeedFilterConfig | None,
-                            session: aiohttp.ClientSession | None=None) -> RssMessage | str:
+                            fetcher: BoundFeedFetcher | None=None) -> RssMessage | str:
         "Get the last post from a Bluesky user"
-        feed = await self._get_feed(username, filter_config, session)
+        feed = await self._get_feed(username, filter_config, fetcher)
         if feed is None or not feed.entries:
             return await self.bot._(channel.guild, "rss.nothing")
         entry = feed.entries[0]
@@ -80,9 +83,9 @@ class BlueskyRSS:
 
     async def get_new_posts(self, channel:"discord.abc.MessageableChannel", username: str, date: dt.datetime,
                             filter_config: FeedFilterConfig | None,
-                            session: aiohttp.ClientSession | None=None) -> list[RssMessage]:
+                            fetcher: BoundFeedFetcher | None=None) -> list[RssMessage]:
         "Get all new posts from a Bluesky user"
-        feed = await self._get_feed(username, filter_config, session)
+        feed = await self._get_feed(username, filter_config, fetcher, conditional=True)
         if feed is None or not feed.entries:
             return []
         posts_list: list[RssMessage] = []
@@ -4,10 +4,10 @@ import datetime as dt
 import re
 from typing import TYPE_CHECKING
 
-import aiohttp
 import discord
 from feedparser.util import FeedParserDict
 
+from .feed_fetcher import BoundFeedFetcher
 from .general import (FeedFilterConfig, FeedObject, RssMessage,
                           check_filter, feed_parse)
 
@@ -35,10 +35,13 @@ class TwitchRSS:
         return matches.group(1)
 
     async def _get_feed(self, username: str, filter_config: FeedFilterConfig | None=None,
-                        session: aiohttp.ClientSession | None=None) -> FeedParserDict | None:
+                        fetcher: BoundFeedFetcher | None=None, conditional: bool=False) -> FeedParserDict | None:
         "Get a list of feeds from a twitch username"
         url = "https://twitchrss.appspot.com/vod/" + username
-        feed = await feed_parse(url, 5, session)
+        if fetcher is None:
+            feed = await feed_parse(url, 5)
+        else:
+            feed = await fetcher.parse(url, 5, conditional)
         if feed is None or "bozo_exception" in feed or not feed.entries:
             return None
         if filter_config is not None:
@@ -64,9 +67,9 @@ class TwitchRSS:
 
     async def get_last_post(self, channel:"discord.abc.MessageableChannel", username: str,
                             filter_config: FeedFilterConfig | None,
-                            session: aiohttp.ClientSession | None= None):
+                            fetcher: BoundFeedFetcher | None=None):
         "Get the last video of a Twitch user"
-        feed = await self._get_feed(username, filter_config, session)
+        feed = await self._get_feed(username, filter_config, fetcher)
         if feed is None:
             return await self.bot._(channel.guild, "rss.nothing")
         entry = feed.entries[0]
@@ -74,9 +77,9 @@ class TwitchRSS:
 
     async def get_new_posts(self, channel:"discord.abc.MessageableChannel", username: str, date: dt.datetime,
                             filter_config: FeedFilterConfig | None,
-                            session: aiohttp.ClientSession | None=None) -> list[RssMessage]:
+                            fetcher: BoundFeedFetcher | None=None) -> list[RssMessage]:
         "Get all new videos from a Twitch user"
-        feed = await self._get_feed(username, filter_config, session)
+        feed = await self._get_feed(username, filter_config, fetcher, conditional=True)
         if feed is None:
             return []
         posts_list: list[RssMessage] = []
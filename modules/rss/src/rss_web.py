@@ -6,12 +6,12 @@ import time
 from typing import TYPE_CHECKING, Any, Literal
 from urllib.parse import parse_qs, urlencode, urlsplit
 
-import aiohttp
 import discord
 from feedparser import CharacterEncodingOverride
 from feedparser.util import FeedParserDict
 
 from .convert_post_to_text import get_summary_from_entry, get_text_from_entry
+from .feed_fetcher import BoundFeedFetcher
 from .general import (FeedFilterConfig, FeedObject, RssMessage, check_filter,
                       feed_parse)
 
@@ -32,10 +32,13 @@ class WebRSS:
         return bool(matches)
 
     async def _get_feed(self, url: str, filter_config: FeedFilterConfig | None=None,
-                        session: aiohttp.ClientSession | None=None) -> FeedParserDict | None:
+                        fetcher: BoundFeedFetcher | None=None, conditional: bool=False) -> FeedParserDict | None:
         "Get a list of feeds from a web URL"
         url = await self.add_params_to_reddit_url(url)
-        feed = await feed_parse(url, 9, session)
+        if fetcher is None:
+            feed = await feed_parse(url, 9)
+        else:
+            feed = await fetcher.parse(url, 9, conditional)
         if feed is None or not feed.entries:
             return None
         if "bozo_exception" in feed and not isinstance(feed["bozo_exception"], CharacterEncodingOverride):
@@ -156,9 +159,9 @@ class WebRSS:
 
     async def get_last_post(self, channel:"discord.abc.MessageableChannel", url: str,
                             filter_config: FeedFilterConfig | None,
-                            session: aiohttp.ClientSession | None=None):
+                            fetcher: BoundFeedFetcher | None=None):
         "Get the last post from a web feed"
-        feed = await self._get_feed(url, filter_config, session)
+        feed = await self._get_feed(url, filter_config, fetcher)
         if not feed:
             return await self.bot._(channel, "rss.web-invalid")
         entry = feed.entries[0]
@@ -168,9 +171,9 @@ class WebRSS:
     async def get_new_posts(self, channel:"discord.abc.MessageableChannel", url: str, date: dt.datetime,
                             filter_config: FeedFilterConfig | None,
                             last_entry_id: str | None=None,
-                            session: aiohttp.ClientSession | None=None) -> list[RssMessage]:
+                            fetcher: BoundFeedFetcher | None=None) -> list[RssMessage]:
         "Get new posts from a web feed"
-        feed = await self._get_feed(url, filter_config, session)
+        feed = await self._get_feed(url, filter_config, fetcher, conditional=True)
         if not feed or not feed.entries:
             return []
         posts_list: list[RssMessage] = []
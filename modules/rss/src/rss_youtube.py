@@ -13,6 +13,7 @@ from feedparser.util import FeedParserDict
 from core.caching.postition_cached import position_cached
 
 from . import FeedObject, RssMessage, feed_parse, get_text_from_entry
+from .feed_fetcher import BoundFeedFetcher
 from .general import FeedFilterConfig, check_filter
 from .youtube_search import Service
 
@@ -78,10 +79,13 @@ class YoutubeRSS:
         return self.search_service.query_channel_title(channel_id)
 
     async def _get_feed_list(self, channel_id: str, filter_config: FeedFilterConfig | None=None,
-                             session: aiohttp.ClientSession | None=None) -> list[FeedParserDict]:
+                             fetcher: BoundFeedFetcher | None=None, conditional: bool=False) -> list[FeedParserDict]:
         "Get the feed list from a youtube channel"
         url = "https://www.youtube.com/feeds/videos.xml?channel_id="+channel_id
-        feed = await feed_parse(url, 7, session)
+        if fetcher is None:
+            feed = await feed_parse(url, 7)
+        else:
+            feed = await fetcher.parse(url, 7, conditional)
         if feed is None or not feed.entries:
             return []
         if filter_config is not None:
@@ -109,9 +113,9 @@ class YoutubeRSS:
 
     async def get_last_post(self, channel:"discord.abc.MessageableChannel", yt_channel_id: str,
                             filter_config: FeedFilterConfig | None,
-                            session: aiohttp.ClientSession | None=None):
+                            fetcher: BoundFeedFetcher | None=None):
         "Get the last post from a youtube channel"
-        entries = await self._get_feed_list(yt_channel_id, filter_config, session)
+        entries = await self._get_feed_list(yt_channel_id, filter_config, fetcher)
         if len(entries) == 0:
             return await self.bot._(channel, "rss.nothing")
         entry = entries[0]
@@ -119,9 +123,9 @@ class YoutubeRSS:
 
     async def get_new_posts(self, channel:"discord.abc.MessageableChannel", identifiant: str, date: dt.datetime,
                             filter_config: FeedFilterConfig | None,
-                            session: aiohttp.ClientSession | None=None) -> list[RssMessage]:
+                            fetcher: BoundFeedFetcher | None=None) -> list[RssMessage]:
         "Get new posts from a youtube channels"
-        entries = await self._get_feed_list(identifiant, filter_config, session)
+        entries = await self._get_feed_list(identifiant, filter_config, fetcher, conditional=True)
         if len(entries) == 0:
             return []
         posts_list: list[RssMessage] = []
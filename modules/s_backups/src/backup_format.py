@@ -0,0 +1,166 @@
+import gzip
+import json
+import zlib
+from io import BytesIO
+from typing import IO, Any, Iterator
+
+from core.type_utils import AnyStrDict
+
+# version of the backups created by the bot
+BACKUP_VERSION = 2
+# versions that can still be loaded
+SUPPORTED_BACKUP_VERSIONS = {1, 2}
+BACKUP_FILE_EXTENSION = "jsonl.gz"
+
+GZIP_MAGIC_NUMBER = b"\x1f\x8b"
+# lines are compressed and parsed by blocks of this size, as compressing or parsing each small line is much slower
+BLOCK_SIZE = 64 * 1024
+# v2 sections that may be missing from a backup, if the bot couldn't read them, mapped to their v1 key
+OPTIONAL_SECTIONS = {"ban": "banned_users", "webhook": "webhooks"}
+# expected payload type of each known kind of v2 line
+PAYLOAD_TYPES: dict[str, type] = {
+    "guild": dict, "role": dict, "category": dict, "channel": dict, "emoji": dict, "ban": list, "webhook": dict,
+    "member": dict, "end": str,
+}
+
+
+class BackupWriter:
+    """Write a v2 backup: gzip-compressed JSON lines, written as soon as each section item is collected
+
+    Every line is a `[kind, payload]` pair. The first one holds the guild settings, then each item (role, category,
+    channel, ban...) gets its own line. Channels belong to the category written before them, and optional sections
+    are closed by an `["end", kind]` line so that a partial section is never loaded."""
+
+    def __init__(self, file: IO[bytes], compress_level: int = 6):
+        self._file = gzip.GzipFile(fileobj=file, mode="wb", compresslevel=compress_level)
+        self._encoder = json.JSONEncoder(separators=(",", ":"))
+        self._buffer: list[str] = []
+        self._buffer_size = 0
+        self.lines_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args: Any):
+        self.close()
+
+    def write(self, kind: str, payload: Any):
+        "Write one item of the backup"
+        line = self._encoder.encode([kind, payload])
+        self._buffer.append(line)
+        self._buffer_size += len(line)
+        self.lines_count += 1
+        if self._buffer_size >= BLOCK_SIZE:
+            self._flush_buffer()
+
+    def _flush_buffer(self):
+        if self._buffer:
+            self._file.write(("\n".join(self._buffer) + "\n").encode())
+            self._buffer.clear()
+            self._buffer_size = 0
+
+    def write_header(self, settings: AnyStrDict):
+        "Write the backup version and the guild settings, before any other item"
+        self.write("guild", {"_backup_version": BACKUP_VERSION} | settings)
+
+    def end_section(self, kind: str):
+        "Mark an optional section as complete"
+        self.write("end", kind)
+
+    def close(self):
+        "Flush the compressed stream, without closing the underlying file"
+        self._flush_buffer()
+        self._file.close()
+
+
+def _parse_lines(block: bytes) -> list[Any]:
+    "Parse a block of complete JSON lines at once, without checking their content"
+    lines = [line for line in block.split(b"\n") if line.strip()]
+    return json.loads(b"[" + b",".join(lines) + b"]")
+
+
+def iter_backup_lines(file: IO[bytes]) -> Iterator[Any]:
+    """Decompress and parse a v2 backup block by block, without loading the whole decompressed content
+    Each yielded line should be a [kind, payload] pair, but isn't checked"""
+    with gzip.GzipFile(fileobj=file, mode="rb") as gzip_file:
+        remainder = b""
+        while chunk := gzip_file.read(BLOCK_SIZE):
+            complete_lines, _, remainder = (remainder + chunk).rpartition(b"\n")
+            yield from _parse_lines(complete_lines)
+        yield from _parse_lines(remainder)
+
+
+def _check_line(line: Any) -> tuple[str, Any]:
+    "Make sure a parsed v2 line has the expected shape, or raise ValueError"
+    if not isinstance(line, list) or len(line) != 2 or not isinstance(line[0], str):
+        raise ValueError("Invalid line in backup")
+    kind, payload = line
+    if (expected_type := PAYLOAD_TYPES.get(kind)) is not None and not isinstance(payload, expected_type):
+        raise ValueError(f"Invalid {kind} item in backup")
+    if kind == "emoji" and not isinstance(payload.get("name"), str):
+        raise ValueError("Emoji without name in backup")
+    if kind == "ban" and (len(payload) != 2 or not isinstance(payload[0], int | str)):
+        raise ValueError("Invalid ban item in backup")
+    return kind, payload
+
+
+def read_backup_v2(file: IO[bytes]) -> AnyStrDict:
+    "Read a v2 backup into the same structure as a v1 backup"
+    data: AnyStrDict | None = None
+    categories: list[AnyStrDict] = []
+    emojis: AnyStrDict = {}
+    members: list[AnyStrDict] = []
+    roles: list[AnyStrDict] = []
+    optional_sections: dict[str, Any] = {"ban": {}, "webhook": []}
+    completed_sections: set[str] = set()
+    for line in iter_backup_lines(file):
+        kind, payload = _check_line(line)
+        if data is None:
+            if kind != "guild":
+                raise ValueError("Missing guild header in backup")
+            data = payload
+            continue
+        if kind == "role":
+            roles.append(payload)
+        elif kind == "category":
+            categories.append(payload | {"channels": []})
+        elif kind == "channel":
+            if not categories:
+                raise ValueError("Channel found before any category in backup")
+            categories[-1]["channels"].append(payload)
+        elif kind == "emoji":
+            emojis[payload.pop("name")] = payload
+        elif kind == "ban":
+            user_id, reason = payload
+            optional_sections["ban"][user_id] = reason
+        elif kind == "webhook":
+            optional_sections["webhook"].append(payload)
+        elif kind == "member":
+            members.append(payload)
+        elif kind == "end":
+            completed_sections.add(payload)
+        # sections added by newer versions are ignored
+    if data is None:
+        raise ValueError("Empty backup")
+    data["roles"] = roles
+    data["categories"] = categories
+    data["emojis"] = emojis
+    data["members"] = members
+    for kind, key in OPTIONAL_SECTIONS.items():
+        if kind in completed_sections:
+            data[key] = optional_sections[kind]
+    return data
+
+
+def read_backup(content: bytes) -> AnyStrDict:
+    """Read a backup file of any supported version
+    Raises ValueError, OSError or EOFError if the file is invalid"""
+    if content.startswith(GZIP_MAGIC_NUMBER):
+        try:
+            return read_backup_v2(BytesIO(content))
+        except zlib.error as err:
+            raise ValueError("Corrupted backup content") from err
+    data = json.loads(content)
+    if not isinstance(data, dict):
+        raise ValueError("Invalid backup content")
+    return data
@@ -0,0 +1,129 @@
+"""Compare the size and speed of the v1 and v2 backup formats on a synthetic guild
+
+Run it from the bot root directory with `python -m modules.s_backups.src.benchmark`
+The guild items are generated with the same structure as `Backups.create_backup`, so only the formats are measured."""
+import argparse
+import json
+import random
+import time
+from io import BytesIO
+from typing import Any, Iterator
+
+from .backup_format import BackupWriter, read_backup
+
+PERMISSION_NAMES = ["view_channel", "send_messages", "read_message_history", "connect", "speak", "manage_messages"]
+
+
+def generate_items(channels_count: int, roles_count: int, bans_count: int, members_count: int,
+                   seed: int = 0) -> Iterator[tuple[str, Any]]:
+    "Generate the items of a synthetic guild backup, in the v2 order"
+    rng = random.Random(seed)
+    next_id = iter(range(10**17, 10**18))
+    yield "guild", {
+        "name": "Synthetic guild", "id": next(next_id), "owner": next(next_id), "afk_timeout": 300, "icon": None,
+        "verification_level": 1, "mfa_level": 0, "explicit_content_filter": 2, "default_notifications": 1,
+        "created_at": 1_600_000_000, "afk_channel": None, "system_channel": None,
+    }
+    role_ids = [next(next_id) for _ in range(roles_count)]
+    for position, role_id in enumerate(role_ids):
+        yield "role", {
+            "id": role_id, "name": f"role-{position}", "color": rng.randrange(0, 0xFFFFFF), "position": position,
+            "hoist": rng.random() < 0.1, "mentionable": rng.random() < 0.2, "permissions": rng.getrandbits(40),
+        }
+
+    def get_overwrites():
+        return [
+            {
+                "id": rng.choice(role_ids),
+                "type": "role",
+                "permissions": {name: rng.random() < 0.5 for name in rng.sample(PERMISSION_NAMES, 3)},
+            }
+            for _ in range(rng.randrange(0, 6))
+        ]
+
+    categories_count = max(channels_count // 10, 1)
+    for categ_position in range(categories_count):
+        yield "category", {
+            "id": next(next_id), "name": f"category-{categ_position}", "position": categ_position, "is_nsfw": False,
+            "permissions_overwrites": get_overwrites(),
+        }
+        for position in range(channels_count // categories_count):
+            yield "channel", {
+                "id": next(next_id), "name": f"channel-{categ_position}-{position}", "position": position,
+                "type": "TextChannel", "description": "A synthetic channel topic " * rng.randrange(0, 4),
+                "is_nsfw": False, "slowmode": rng.choice([0, 0, 5, 30]), "permissions_overwrites": get_overwrites(),
+            }
+    for index in range(bans_count):
+        yield "ban", [next(next_id), rng.choice([None, "Spam", "Raid", f"Ban wave {index // 1000}"])]
+    yield "end", "ban"
+    for index in range(members_count):
+        yield "member", {
+            "id": next(next_id), "nickname": f"nick-{index}" if rng.random() < 0.3 else None, "bot": False,
+            "roles": rng.sample(role_ids, rng.randrange(0, 4)),
+        }
+
+
+def build_v1(items: list[tuple[str, Any]]) -> str:
+    "Build and serialize a v1 backup, like the bot did before the v2 format"
+    back: dict[str, Any] = {"_backup_version": 1} | items[0][1]
+    back |= {"roles": [], "categories": [], "emojis": {}, "banned_users": {}, "members": []}
+    for kind, payload in items[1:]:
+        if kind == "role":
+            back["roles"].append(payload)
+        elif kind == "category":
+            back["categories"].append(payload | {"channels": []})
+        elif kind == "channel":
+            back["categories"][-1]["channels"].append(payload)
+        elif kind == "ban":
+            back["banned_users"][payload[0]] = payload[1]
+        elif kind == "member":
+            back["members"].append(payload)
+    return json.dumps(back, sort_keys=True, indent=4)
+
+
+def build_v2(items: list[tuple[str, Any]]) -> bytes:
+    "Write a v2 backup, item by item"
+    file = BytesIO()
+    with BackupWriter(file) as writer:
+        writer.write_header(items[0][1])
+        for kind, payload in items[1:]:
+            writer.write(kind, payload)
+    return file.getvalue()
+
+
+def measure(function: Any, *args: Any, repeat: int = 3):
+    "Return the result of a function and its best duration"
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    "Run the benchmark with the given guild size"
+    parser = argparse.ArgumentParser(description="Benchmark the backup formats")
+    parser.add_argument("--channels", type=int, default=500, help="Number of channels")
+    parser.add_argument("--roles", type=int, default=250, help="Number of roles")
+    parser.add_argument("--bans", type=int, default=50_000, help="Number of banned users")
+    parser.add_argument("--members", type=int, default=10_000, help="Number of members")
+    args = parser.parse_args()
+
+    items = list(generate_items(args.channels, args.roles, args.bans, args.members))
+    v1_content, v1_write = measure(build_v1, items)
+    v1_data, v1_read = measure(read_backup, v1_content.encode())
+    v2_content, v2_write = measure(build_v2, items)
+    v2_data, v2_read = measure(read_backup, v2_content)
+    if len(v1_data["banned_users"]) != len(v2_data["banned_users"]) or v1_data["roles"] != v2_data["roles"]:
+        raise RuntimeError("The v1 and v2 backups don't contain the same data")
+    print(f"Guild: {args.channels} channels, {args.roles} roles, {args.bans} bans, {args.members} members")
+    print(f"v1: {len(v1_content.encode()) / 1024:,.0f} KiB, written in {v1_write * 1000:.0f}ms, "
+          f"read in {v1_read * 1000:.0f}ms")
+    print(f"v2: {len(v2_content) / 1024:,.0f} KiB, written in {v2_write * 1000:.0f}ms, "
+          f"read in {v2_read * 1000:.0f}ms")
+    print(f"Size ratio: {len(v1_content.encode()) / len(v2_content):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
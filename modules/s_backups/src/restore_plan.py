@@ -0,0 +1,103 @@
+import asyncio
+from typing import Awaitable, Callable, NamedTuple
+
+import discord
+
+SYMB_ERROR = "`[X]`"
+SYMB_SKIP = "`[-]`"
+SYMB_OK = "`[O]`"
+
+
+class RestoreStep(NamedTuple):
+    "One change to apply to a guild, with the number of API calls it should need"
+    description: str
+    api_calls: int
+    action: Callable[[], Awaitable[str]]
+
+
+class RestorePhase:
+    "A group of steps applied together, optionally with bounded concurrency when they don't depend on each other"
+
+    def __init__(self, title: str, concurrent: bool = False):
+        self.title = title
+        self.concurrent = concurrent
+        self.steps: list[RestoreStep] = []
+        # logs known without applying anything, like unchanged items
+        self.notes: list[str] = []
+
+    def add_step(self, description: str, action: Callable[[], Awaitable[str]], api_calls: int = 1):
+        "Add a change to apply"
+        self.steps.append(RestoreStep(description, api_calls, action))
+
+    def add_note(self, note: str):
+        "Add a log line that doesn't need any change"
+        self.notes.append(note)
+
+    @property
+    def api_calls(self):
+        return sum(step.api_calls for step in self.steps)
+
+
+class RestorePlan:
+    """The minimal set of changes needed to restore a backup in a guild
+
+    The plan is computed without editing anything, so that it can be displayed as a dry run, then applied phase by
+    phase. Steps of a concurrent phase are run together, up to a maximum number of concurrent steps."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.phases: list[RestorePhase] = []
+        # [permission issues, other issues]
+        self.problems = [0, 0]
+
+    def add_phase(self, title: str, concurrent: bool = False):
+        "Start a new phase of the plan"
+        phase = RestorePhase(title, concurrent)
+        self.phases.append(phase)
+        return phase
+
+    def add_problem(self, phase: RestorePhase, message: str, permission_issue: bool):
+        "Register an issue found while planning"
+        phase.add_note(f"  {SYMB_ERROR} {message}")
+        self.problems[0 if permission_issue else 1] += 1
+
+    @property
+    def api_calls(self):
+        "Estimated number of API calls needed to apply the plan"
+        return sum(phase.api_calls for phase in self.phases)
+
+    def format(self):
+        "Describe the plan, as a list of lines"
+        lines: list[str] = []
+        for phase in self.phases:
+            lines.append(f"{phase.title} ({len(phase.steps)} changes, ~{phase.api_calls} API calls)")
+            lines.extend(f"  - {step.description}" for step in phase.steps)
+            lines.extend(note for note in phase.notes if SYMB_ERROR in note)
+        lines.append(f"\nEstimated API calls: {self.api_calls}")
+        return lines
+
+    async def _run_step(self, step: RestoreStep, semaphore: asyncio.Semaphore):
+        "Apply one step, and return its log line"
+        async with semaphore:
+            try:
+                return await step.action()
+            except discord.Forbidden:
+                self.problems[0] += 1
+                return f"  {SYMB_ERROR} Unable to {step.description.lower()}: missing permissions"
+            except Exception as err: # pylint: disable=broad-except
+                self.problems[1] += 1
+                return f"  {SYMB_ERROR} Unable to {step.description.lower()}: {err}"
+
+    async def apply(self):
+        "Apply every phase of the plan, and return the logs"
+        logs: list[str] = []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        for phase in self.phases:
+            logs.append(phase.title)
+            logs.extend(phase.notes)
+            if phase.concurrent:
+                logs.extend(await asyncio.gather(*(self._run_step(step, semaphore) for step in phase.steps)))
+            else:
+                for step in phase.steps:
+                    logs.append(await self._run_step(step, semaphore))
+        return logs
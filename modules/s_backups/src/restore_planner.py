@@ -0,0 +1,639 @@
+from functools import partial
+from typing import Any
+
+import aiohttp
+import discord
+
+from core.type_utils import AnyStrDict
+
+from .restore_plan import SYMB_ERROR, SYMB_OK, SYMB_SKIP, RestorePhase, RestorePlan
+
+# number of steps applied at the same time in concurrent phases
+MAX_CONCURRENT_STEPS = 4
+# maximum number of users banned by one bulk ban request
+BULK_BAN_SIZE = 200
+
+OverwritesDict = dict[discord.Role | discord.Member, discord.PermissionOverwrite]
+
+
+class LoadArguments:
+    """Arguments for the load_backup function"""
+    def __init__(self, match_by_name: bool, delete_old_channels: bool, delete_old_roles: bool, delete_old_emojis: bool,
+                 delete_old_webhooks: bool):
+        self.match_by_name = match_by_name
+        self.delete_old_channels = delete_old_channels
+        self.delete_old_roles = delete_old_roles
+        self.delete_old_emojis = delete_old_emojis
+        self.delete_old_webhooks = delete_old_webhooks
+
+
+async def url_to_byte(url: str) -> bytes | None:
+    "Fetch an image from an URL and return it as bytes, or None if the image is not found"
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+        async with session.get(url) as response:
+            if response.status >= 200 and response.status < 300:
+                res = await response.read()
+            else:
+                res = None
+    return res
+
+
+class RestorePlanner:
+    """Compare a backup with the current state of a guild, and build the plan of changes to restore it
+
+    Objects matched during planning are stored by backup ID, and objects created while applying the plan are added
+    once created, so that later steps (like permission overwrites) can reference them."""
+
+    def __init__(self, guild: discord.Guild, data: AnyStrDict, args: LoadArguments):
+        self.guild = guild
+        self.data = data
+        self.args = args
+        self.plan = RestorePlan(MAX_CONCURRENT_STEPS)
+        # guild objects matching each backup ID
+        self.roles: dict[int, discord.Role] = {}
+        self.channels: dict[int, discord.abc.GuildChannel] = {}
+        # backup IDs of the roles that will be created
+        self.roles_to_create: set[int] = set()
+        # backup IDs of the categories and channels to move to their backup position
+        self.channels_to_sort: set[int] = set()
+        self.can_edit_overwrites = guild.me.guild_permissions.manage_roles
+
+    async def compute(self):
+        "Compute the whole restore plan"
+        self.plan_settings()
+        await self.plan_bans()
+        self.plan_roles()
+        self.plan_categories()
+        self.plan_channels()
+        self.plan_members()
+        self.plan_emojis()
+        await self.plan_webhooks()
+        return self.plan
+
+    @staticmethod
+    def _ok(message: str):
+        return f"  {SYMB_OK} {message}"
+
+    async def _delete(self, item: discord.abc.GuildChannel | discord.Role | discord.Emoji | discord.Webhook, label: str):
+        "Delete a guild object, ignoring already deleted ones"
+        try:
+            await item.delete()
+        except discord.NotFound:
+            return f"  {SYMB_SKIP} {label} was already deleted"
+        return self._ok(f"{label} deleted")
+
+    # ---- SERVER SETTINGS ----
+
+    def plan_settings(self):
+        "Plan the edition of the general server settings, in a single request"
+        phase = self.plan.add_phase(" - Updating server settings")
+        guild, data = self.guild, self.data
+        changes: dict[str, Any] = {}
+        descriptions: list[str] = []
+        if guild.afk_timeout == data["afk_timeout"]:
+            phase.add_note(f"  {SYMB_SKIP} No need to change AFK timeout duration")
+        else:
+            changes["afk_timeout"] = data["afk_timeout"]
+            descriptions.append(f"AFK timeout duration set to {data['afk_timeout']}s")
+        if guild.default_notifications.value == data["default_notifications"]:
+            phase.add_note(f"  {SYMB_SKIP} No need to change default notifications")
+        else:
+            changes["default_notifications"] = discord.NotificationLevel(data["default_notifications"])
+            descriptions.append("Default notifications set to " + changes["default_notifications"].name)
+        if guild.explicit_content_filter.value == data["explicit_content_filter"]:
+            phase.add_note(f"  {SYMB_SKIP} No need to change content filter")
+        else:
+            changes["explicit_content_filter"] = discord.ContentFilter(data["explicit_content_filter"])
+            descriptions.append("Explicit content filter set to " + changes["explicit_content_filter"].name)
+        if guild.name == data["name"]:
+            phase.add_note(f"  {SYMB_SKIP} No need to change server name")
+        else:
+            changes["name"] = data["name"]
+            descriptions.append("Server name set to " + data["name"])
+        if guild.verification_level.value == data["verification_level"]:
+            phase.add_note(f"  {SYMB_SKIP} No need to change verification level")
+        else:
+            changes["verification_level"] = discord.VerificationLevel(data["verification_level"])
+            descriptions.append("Verification level set to " + changes["verification_level"].name)
+        icon_url: str | None = None
+        if data["icon"] is None:
+            if guild.icon is None:
+                phase.add_note(f"  {SYMB_SKIP} No need to change server icon")
+            else:
+                changes["icon"] = None
+                descriptions.append("Server icon deleted")
+        elif guild.icon is not None and guild.icon.url == data["icon"]:
+            phase.add_note(f"  {SYMB_SKIP} No need to change server icon")
+        else:
+            icon_url = data["icon"]
+        if guild.mfa_level != data["mfa_level"]:
+            self.plan.add_problem(phase, "Unable to change 2FA requirement: only owner can do that", True)
+        else:
+            phase.add_note(f"  {SYMB_SKIP} No need to change 2FA requirement")
+        if changes or icon_url:
+            edited_settings = list(changes.keys()) + (["icon"] if icon_url else [])
+            phase.add_step(
+                f"Update server settings ({', '.join(edited_settings)})",
+                partial(self._apply_settings, changes, descriptions, icon_url)
+            )
+
+    async def _apply_settings(self, changes: dict[str, Any], descriptions: list[str], icon_url: str | None):
+        logs: list[str] = []
+        if icon_url is not None:
+            try:
+                icon = await url_to_byte(icon_url)
+            except aiohttp.ClientError:
+                icon = None
+            if icon is None:
+                self.plan.problems[1] += 1
+                logs.append(
+                    f"  {SYMB_ERROR} Unable to set server icon: the image has probably been deleted from Discord cache"
+                )
+            else:
+                changes = changes | {"icon": icon}
+                descriptions = descriptions + ["Server icon updated"]
+        if changes:
+            await self.guild.edit(**changes)
+        logs.extend(self._ok(description) for description in descriptions)
+        return "\n".join(logs)
+
+    # ---- BANS ----
+
+    async def plan_bans(self):
+        """Plan the bans of the users banned in the backup, in bulk bans if possible
+        A bulk ban has a single reason, so users are grouped by their original ban reason"""
+        if "banned_users" not in self.data:
+            return
+        phase = self.plan.add_phase(" - Banning users")
+        permissions = self.guild.me.guild_permissions
+        if not permissions.ban_members:
+            self.plan.add_problem(phase, "Unable to ban users: missing permissions", True)
+            return
+        try:
+            banned_users = {entry.user.id async for entry in self.guild.bans(limit=None)}
+        except discord.Forbidden:
+            self.plan.add_problem(phase, "Unable to ban users: missing permissions", True)
+            return
+        except Exception as err: # pylint: disable=broad-except
+            self.plan.add_problem(phase, f"Unable to ban users: {err}", False)
+            return
+        users_by_reason: dict[str | None, list[int]] = {}
+        for user_id, reason in self.data["banned_users"].items():
+            # JSON keys are always strings
+            if int(user_id) not in banned_users:
+                users_by_reason.setdefault(reason, []).append(int(user_id))
+        if not users_by_reason:
+            phase.add_note(f"  {SYMB_SKIP} No user to ban")
+            return
+        if not permissions.manage_guild:
+            # bulk bans need the Manage Server permission: ban users one by one, with their own reason
+            users = [(user_id, reason) for reason, user_ids in users_by_reason.items() for user_id in user_ids]
+            for i in range(0, len(users), BULK_BAN_SIZE):
+                chunk = users[i:i+BULK_BAN_SIZE]
+                phase.add_step(
+                    f"Ban {len(chunk)} users one by one", partial(self._ban_users_one_by_one, chunk), len(chunk)
+                )
+            return
+        for reason, user_ids in users_by_reason.items():
+            for i in range(0, len(user_ids), BULK_BAN_SIZE):
+                chunk = user_ids[i:i+BULK_BAN_SIZE]
+                phase.add_step(f"Ban {len(chunk)} users", partial(self._ban_users, chunk, reason))
+
+    async def _ban_users(self, user_ids: list[int], reason: str | None):
+        result = await self.guild.bulk_ban(
+            [discord.Object(user_id) for user_id in user_ids], reason=reason, delete_message_seconds=0
+        )
+        if result.failed:
+            self.plan.problems[1] += len(result.failed)
+            return f"  {SYMB_ERROR} Banned {len(result.banned)} users ({len(result.failed)} could not be banned)"
+        return self._ok(f"Banned {len(result.banned)} users")
+
+    async def _ban_users_one_by_one(self, users: list[tuple[int, str | None]]):
+        banned_count = 0
+        failures = [0, 0]
+        for user_id, reason in users:
+            try:
+                await self.guild.ban(discord.Object(user_id), reason=reason, delete_message_seconds=0)
+            except discord.Forbidden:
+                failures[0] += 1
+            except discord.HTTPException:
+                failures[1] += 1
+            else:
+                banned_count += 1
+        self.plan.problems[0] += failures[0]
+        self.plan.problems[1] += failures[1]
+        if failed_count := sum(failures):
+            return f"  {SYMB_ERROR} Banned {banned_count} users ({failed_count} could not be banned)"
+        return self._ok(f"Banned {banned_count} users")
+
+    # ---- ROLES ----
+
+    def plan_roles(self):
+        "Plan the creation, edition, sorting and deletion of roles"
+        phase = self.plan.add_phase(" - Creating roles", concurrent=True)
+        if not self.guild.me.guild_permissions.manage_roles:
+            self.plan.add_problem(phase, "Unable to create or update roles: missing permissions", True)
+            return
+        roles_by_name: dict[str, discord.Role] = {}
+        for role in self.guild.roles:
+            roles_by_name.setdefault(role.name, role)
+        matched_roles: set[int] = set()
+        positions_differ = False
+        for role_data in sorted(self.data["roles"], key=lambda role: role["position"], reverse=True):
+            role = self.guild.get_role(role_data["id"])
+            if role is None and self.args.match_by_name:
+                role = roles_by_name.get(role_data["name"])
+            if role is None:
+                self.roles_to_create.add(role_data["id"])
+                phase.add_step(f"Create role {role_data['name']}", partial(self._create_role, role_data))
+                continue
+            self.roles[role_data["id"]] = role
+            matched_roles.add(role.id)
+            positions_differ = positions_differ or (not role.is_default() and role.position != role_data["position"])
+            if changes := self._get_role_changes(role, role_data):
+                phase.add_step(f"Edit role {role_data['name']}", partial(self._edit_role, role, changes))
+            else:
+                phase.add_note(f"  {SYMB_SKIP} No need to change role {role_data['name']}")
+        if self.args.delete_old_roles:
+            for role in self.guild.roles:
+                if role.id in matched_roles or role.is_default() or role.managed:
+                    continue
+                phase.add_step(f"Delete role {role.name}", partial(self._delete, role, f"Role {role.name}"))
+        if self.roles_to_create or positions_differ:
+            sorting_phase = self.plan.add_phase(" - Sorting roles")
+            sorting_phase.add_step("Sort roles", self._sort_roles)
+
+    def _get_role_changes(self, role: discord.Role, role_data: AnyStrDict):
+        "Get the role attributes to edit"
+        changes: dict[str, Any] = {}
+        if role.permissions.value != role_data["permissions"]:
+            changes["permissions"] = discord.Permissions(role_data["permissions"])
+        if role_data["name"] == "@everyone" or role.is_default():
+            return changes
+        if role.name != role_data["name"]:
+            changes["name"] = role_data["name"]
+        if role.colour.value != role_data["color"]:
+            changes["colour"] = discord.Colour(role_data["color"])
+        if role.hoist != role_data["hoist"]:
+            changes["hoist"] = role_data["hoist"]
+        if role.mentionable != role_data["mentionable"]:
+            changes["mentionable"] = role_data["mentionable"]
+        return changes
+
+    async def _create_role(self, role_data: AnyStrDict):
+        self.roles[role_data["id"]] = await self.guild.create_role(
+            name=role_data["name"],
+            permissions=discord.Permissions(role_data["permissions"]),
+            colour=discord.Colour(role_data["color"]),
+            hoist=role_data["hoist"],
+            mentionable=role_data["mentionable"],
+        )
+        return self._ok(f"Role {role_data['name']} created")
+
+    async def _edit_role(self, role: discord.Role, changes: dict[str, Any]):
+        name = role.name
+        await role.edit(**changes)
+        return self._ok(f"Role {name} set")
+
+    async def _sort_roles(self):
+        "Move every restored role to its backup position, in a single request"
+        top_position = self.guild.me.top_role.position
+        positions: dict[discord.Role, int] = {}
+        for role_data in self.data["roles"]:
+            role = self.roles.get(role_data["id"])
+            if role is None or role.is_default() or role.managed:
+                continue
+            # we can't move roles above our own top role
+            if role.position >= top_position or not 0 < role_data["position"] < top_position:
+                continue
+            if role.position != role_data["position"]:
+                positions[role] = role_data["position"]
+        if not positions:
+            return f"  {SYMB_SKIP} No need to sort roles"
+        await self.guild.edit_role_positions(positions) # pyright: ignore[reportArgumentType]
+        return self._ok(f"Positions of {len(positions)} roles updated")
+
+    # ---- CHANNELS ----
+
+    def _build_overwrites(self, perms: list[AnyStrDict]) -> OverwritesDict:
+        "Convert backup permission overwrites to the current guild objects, ignoring the unknown ones"
+        overwrites: OverwritesDict = {}
+        for perm in perms:
+            target: discord.Role | discord.Member | None = None
+            if perm["type"] == "role":
+                target = self.roles.get(perm["id"])
+            elif perm["type"] in {"member", "user"}:
+                target = self.guild.get_member(perm["id"])
+            if target is not None:
+                overwrites[target] = discord.PermissionOverwrite(**perm["permissions"])
+        return overwrites
+
+    def _merge_overwrites(self, channel: discord.abc.GuildChannel, perms: list[AnyStrDict]):
+        """Add the backup overwrites to the current ones of a channel
+        Returns the merged overwrites, or None if nothing changes"""
+        current: OverwritesDict = dict(channel.overwrites) # pyright: ignore[reportAssignmentType]
+        restored = self._build_overwrites(perms)
+        if all(current.get(target) == overwrite for target, overwrite in restored.items()):
+            return None
+        return current | restored
+
+    def _overwrites_need_update(self, channel: discord.abc.GuildChannel, perms: list[AnyStrDict] | None):
+        "Check, while planning, whether the overwrites of a channel will change"
+        if not self.can_edit_overwrites or not perms:
+            return False
+        if any(perm["type"] == "role" and perm["id"] in self.roles_to_create for perm in perms):
+            return True
+        return self._merge_overwrites(channel, perms) is not None
+
+    def plan_categories(self):
+        "Plan the creation, edition and deletion of channel categories, with their permissions"
+        phase = self.plan.add_phase(" - Creating categories", concurrent=True)
+        if not self.can_edit_overwrites:
+            self.plan.add_problem(phase, "Unable to update permissions: missing permissions", True)
+        if not self.guild.me.guild_permissions.manage_channels:
+            self.plan.add_problem(phase, "Unable to create or update categories: missing permissions", True)
+            return
+        categories_by_name: dict[str, discord.CategoryChannel] = {}
+        for category in self.guild.categories:
+            categories_by_name.setdefault(category.name, category)
+        matched_categories: set[int] = set()
+        for categ in self.data["categories"]:
+            if categ.get("id") is None:
+                continue
+            category = self.guild.get_channel(categ["id"])
+            if category is None and self.args.match_by_name:
+                category = categories_by_name.get(categ["name"])
+            if category is None:
+                self.channels_to_sort.add(categ["id"])
+                phase.add_step(f"Create category {categ['name']}", partial(self._create_category, categ))
+                continue
+            self.channels[categ["id"]] = category
+            matched_categories.add(category.id)
+            changes: dict[str, Any] = {}
+            if category.name != categ["name"]:
+                changes["name"] = categ["name"]
+            if getattr(category, "nsfw", None) != categ["is_nsfw"]:
+                changes["nsfw"] = categ["is_nsfw"]
+            if category.position != categ["position"]:
+                self.channels_to_sort.add(categ["id"])
+            if changes or self._overwrites_need_update(category, categ.get("permissions_overwrites")):
+                phase.add_step(
+                    f"Edit category {categ['name']}",
+                    partial(self._edit_channel, category, categ, changes, "Category")
+                )
+            else:
+                phase.add_note(f"  {SYMB_SKIP} No need to change category {categ['name']}")
+        if self.args.delete_old_channels:
+            for category in self.guild.categories:
+                if category.id not in matched_categories:
+                    phase.add_step(
+                        f"Delete category {category.name}", partial(self._delete, category, f"Category {category.name}")
+                    )
+
+    async def _create_category(self, categ: AnyStrDict):
+        overwrites = self._build_overwrites(categ.get("permissions_overwrites", [])) if self.can_edit_overwrites else {}
+        self.channels[categ["id"]] = await self.guild.create_category(name=categ["name"], overwrites=overwrites)
+        return self._ok(f"Category {categ['name']} created")
+
+    async def _edit_channel(self, channel: discord.abc.GuildChannel, channel_data: AnyStrDict, changes: dict[str, Any],
+                            kind: str):
+        "Edit a channel or category, including all its permission overwrites in the same request"
+        if self.can_edit_overwrites and channel_data.get("permissions_overwrites"):
+            if (overwrites := self._merge_overwrites(channel, channel_data["permissions_overwrites"])) is not None:
+                changes = changes | {"overwrites": overwrites}
+        if not changes:
+            return f"  {SYMB_SKIP} No need to change {kind.lower()} {channel_data['name']}"
+        await channel.edit(**changes) # pyright: ignore[reportCallIssue]
+        return self._ok(f"{kind} {channel_data['name']} set")
+
+    def plan_channels(self):
+        "Plan the creation, edition and deletion of text and voice channels, with their permissions"
+        phase = self.plan.add_phase(" - Creating channels", concurrent=True)
+        if not self.guild.me.guild_permissions.manage_channels:
+            self.plan.add_problem(phase, "Unable to create or update channels: missing permissions", True)
+            return
+        channels_by_name: dict[str, discord.abc.GuildChannel] = {}
+        for channel in self.guild.text_channels + self.guild.voice_channels:
+            channels_by_name.setdefault(channel.name, channel)
+        matched_channels: set[int] = set()
+        for categ in self.data["categories"]:
+            for chan in categ["channels"]:
+                channel = self.guild.get_channel(chan["id"])
+                if channel is None and self.args.match_by_name:
+                    channel = channels_by_name.get(chan["name"])
+                if channel is None:
+                    self.channels_to_sort.add(chan["id"])
+                    phase.add_step(f"Create channel {chan['name']}", partial(self._create_channel, chan, categ.get("id")))
+                    continue
+                self.channels[chan["id"]] = channel
+                matched_channels.add(channel.id)
+                changes: dict[str, Any] = {}
+                if channel.name != chan["name"]:
+                    changes["name"] = chan["name"]
+                if "is_nsfw" in chan and getattr(channel, "nsfw", None) != chan["is_nsfw"]:
+                    changes["nsfw"] = chan["is_nsfw"]
+                if channel.position != chan["position"]:
+                    self.channels_to_sort.add(chan["id"])
+                if "description" in chan and getattr(channel, "topic", None) != chan["description"]:
+                    changes["topic"] = chan["description"]
+                if "slowmode" in chan and getattr(channel, "slowmode_delay", None) != chan["slowmode"]:
+                    changes["slowmode_delay"] = chan["slowmode"]
+                if changes or self._overwrites_need_update(channel, chan.get("permissions_overwrites")):
+                    phase.add_step(
+                        f"Edit channel {chan['name']}",
+                        partial(self._edit_channel, channel, chan, changes, "Channel")
+                    )
+                else:
+                    phase.add_note(f"  {SYMB_SKIP} No need to change channel {chan['name']}")
+        if self.args.delete_old_channels:
+            for channel in self.guild.text_channels + self.guild.voice_channels:
+                if channel.id not in matched_channels:
+                    phase.add_step(
+                        f"Delete channel {channel.name}", partial(self._delete, channel, f"Channel {channel.name}")
+                    )
+        if self.channels_to_sort:
+            # moving a channel shifts its siblings, so channels are moved one after the other
+            sorting_phase = self.plan.add_phase(" - Sorting channels")
+            sorting_phase.add_step(
+                f"Sort {len(self.channels_to_sort)} channels", self._sort_channels, len(self.channels_to_sort)
+            )
+
+    async def _create_channel(self, chan: AnyStrDict, category_id: int | None):
+        category = None if category_id is None else self.channels.get(category_id)
+        if category is not None and not isinstance(category, discord.CategoryChannel):
+            category = None
+        overwrites = self._build_overwrites(chan.get("permissions_overwrites", [])) if self.can_edit_overwrites else {}
+        if chan["type"] == "TextChannel":
+            self.channels[chan["id"]] = await self.guild.create_text_channel(
+                name=chan["name"],
+                category=category,
+                topic=chan.get("description") or "",
+                nsfw=chan.get("is_nsfw", False),
+                slowmode_delay=chan.get("slowmode", 0),
+                overwrites=overwrites,
+            )
+        else:
+            self.channels[chan["id"]] = await self.guild.create_voice_channel(
+                name=chan["name"], category=category, overwrites=overwrites
+            )
+        return self._ok(f"Channel {chan['name']} created")
+
+    async def _sort_channels(self):
+        "Move the restored categories then channels to their backup position, one at a time"
+        categories = sorted(self.data["categories"], key=lambda categ: categ["position"])
+        channels_data = [categ for categ in categories if categ.get("id") is not None] + [
+            chan
+            for categ in categories
+            for chan in sorted(categ["channels"], key=lambda chan: chan["position"])
+        ]
+        moved_count = 0
+        failures = [0, 0]
+        for channel_data in channels_data:
+            if channel_data["id"] not in self.channels_to_sort:
+                continue
+            channel = self.channels.get(channel_data["id"])
+            if channel is None or channel.position == channel_data["position"]:
+                continue
+            try:
+                await channel.edit(position=channel_data["position"]) # pyright: ignore[reportCallIssue]
+            except discord.Forbidden:
+                failures[0] += 1
+            except discord.HTTPException:
+                failures[1] += 1
+            else:
+                moved_count += 1
+        self.plan.problems[0] += failures[0]
+        self.plan.problems[1] += failures[1]
+        if failed_count := sum(failures):
+            return f"  {SYMB_ERROR} Positions of {moved_count} channels updated ({failed_count} could not be moved)"
+        return self._ok(f"Positions of {moved_count} channels updated")
+
+    # ---- MEMBERS ----
+
+    def _get_assignable_roles(self, role_ids: list[int]):
+        "Get the restored roles that we can give to members"
+        top_position = self.guild.me.top_role.position
+        return [
+            role
+            for role_id in role_ids
+            if (role := self.roles.get(role_id)) is not None and 0 < role.position < top_position
+        ]
+
+    def plan_members(self):
+        "Plan the update of members nicknames and roles, with one request per member at most"
+        if "members" not in self.data:
+            return
+        phase = self.plan.add_phase(" - Updating members roles and nick", concurrent=True)
+        change_nicks = self.guild.me.guild_permissions.manage_nicknames
+        if not change_nicks:
+            self.plan.add_problem(phase, "Unable to change nicknames: missing permissions", True)
+        change_roles = self.guild.me.guild_permissions.manage_roles
+        if not change_roles:
+            self.plan.add_problem(phase, "Unable to change roles: missing permissions", True)
+        top_position = self.guild.me.top_role.position
+        for memb in self.data["members"]:
+            if (member := self.guild.get_member(memb["id"])) is None:
+                continue
+            update_nick = (
+                change_nicks
+                and member.nick != memb["nickname"]
+                and member.top_role.position < top_position
+                and self.guild.owner_id != member.id
+            )
+            update_roles = change_roles and (
+                any(role_id in self.roles_to_create for role_id in memb["roles"])
+                or any(role not in member.roles for role in self._get_assignable_roles(memb["roles"]))
+            )
+            if update_nick or update_roles:
+                phase.add_step(
+                    f"Update member {member}", partial(self._edit_member, member, memb, update_nick, update_roles)
+                )
+
+    async def _edit_member(self, member: discord.Member, memb: AnyStrDict, update_nick: bool, update_roles: bool):
+        edition: list[str] = []
+        changes: dict[str, Any] = {}
+        if update_nick:
+            changes["nick"] = memb["nickname"]
+            edition.append("nickname")
+        if update_roles:
+            missing_roles = [role for role in self._get_assignable_roles(memb["roles"]) if role not in member.roles]
+            if missing_roles:
+                changes["roles"] = [role for role in member.roles if not role.is_default()] + missing_roles
+                edition.append("roles")
+        if not changes:
+            return f"  {SYMB_SKIP} No need to update user {member}"
+        await member.edit(**changes)
+        return self._ok(f"Updated {' and '.join(edition)} for user {member}")
+
+    # ---- EMOJIS AND WEBHOOKS ----
+
+    def plan_emojis(self):
+        "Plan the creation and deletion of custom emojis"
+        phase = self.plan.add_phase(" - Creating emojis", concurrent=True)
+        if not self.guild.me.guild_permissions.manage_expressions:
+            self.plan.add_problem(phase, "Unable to create or update emojis: missing permissions", True)
+            return
+        existing_names = {emoji.name for emoji in self.guild.emojis}
+        for emoji_name, emoji_data in self.data["emojis"].items():
+            if emoji_name in existing_names:
+                phase.add_note(f"  {SYMB_SKIP} Emoji {emoji_name} already exists")
+            else:
+                phase.add_step(f"Create emoji {emoji_name}", partial(self._create_emoji, emoji_name, emoji_data))
+        if self.args.delete_old_emojis:
+            for emoji in self.guild.emojis:
+                if emoji.name not in self.data["emojis"]:
+                    phase.add_step(f"Delete emoji {emoji.name}", partial(self._delete, emoji, f"Emoji {emoji.name}"))
+
+    async def _create_emoji(self, emoji_name: str, emoji_data: AnyStrDict):
+        try:
+            icon = await url_to_byte(emoji_data["url"])
+        except aiohttp.ClientError:
+            icon = None
+        if icon is None:
+            return f"  {SYMB_ERROR} Unable to create emoji {emoji_name}: "\
+                "the image has probably been deleted from Discord cache"
+        roles = self._get_assignable_roles(emoji_data["roles"])
+        await self.guild.create_custom_emoji(name=emoji_name, image=icon, roles=roles or None) # pyright: ignore
+        return self._ok(f"Emoji {emoji_name} created")
+
+    async def plan_webhooks(self):
+        "Plan the creation and deletion of webhooks"
+        if "webhooks" not in self.data:
+            return
+        phase = self.plan.add_phase(" - Creating webhooks", concurrent=True)
+        if not self.guild.me.guild_permissions.manage_webhooks:
+            self.plan.add_problem(phase, "Unable to create or update webhooks: missing permissions", True)
+            return
+        try:
+            current_webhooks = await self.guild.webhooks()
+        except discord.Forbidden:
+            self.plan.add_problem(phase, "Unable to create or update webhooks: missing permissions", True)
+            return
+        current_urls = {webhook.url for webhook in current_webhooks}
+        for webhook in self.data["webhooks"]:
+            if webhook["url"] in current_urls:
+                phase.add_note(f"  {SYMB_SKIP} Webhook {webhook['name']} already exists")
+            else:
+                phase.add_step(f"Create webhook {webhook['name']}", partial(self._create_webhook, webhook))
+        if self.args.delete_old_webhooks:
+            backup_urls = {webhook["url"] for webhook in self.data["webhooks"]}
+            for webhook in current_webhooks:
+                if webhook.url not in backup_urls:
+                    phase.add_step(
+                        f"Delete webhook {webhook.name}", partial(self._delete, webhook, f"Webhook {webhook.name}")
+                    )
+
+    async def _create_webhook(self, webhook: AnyStrDict):
+        logs: list[str] = []
+        try:
+            icon = await url_to_byte(webhook["avatar"])
+        except aiohttp.ClientError:
+            logs.append(f"  {SYMB_ERROR} Unable to get avatar of webhook {webhook['name']}:"\
+                        " the image has probably been deleted from Discord cache")
+            icon = None
+        channel = self.channels.get(webhook["channel"])
+        if not isinstance(channel, discord.TextChannel):
+            raise ValueError("unable to get the text channel")
+        await channel.create_webhook(name=webhook["name"], avatar=icon)
+        logs.append(self._ok(f"Webhook {webhook['name']} created"))
+        return "\n".join(logs)
@@ -1,9 +1,9 @@
+import asyncio
 import json
 import time
 from typing import Any, Literal
 
 import discord
-from cachetools import TTLCache
 from discord import app_commands
 from discord.ext import commands, tasks
 
@@ -19,27 +19,117 @@ from .src.config_paginator import ServerConfigPaginator
 from .src.converters import (AllRepresentation, from_input, from_raw,
                              to_display, to_raw)
 
+# minimum delay between two renames of the same membercounter channel
+MEMBERCOUNTER_COOLDOWN = 5*60
+# maximum number of membercounter channels refreshed per minute, and at the same time
+MEMBERCOUNTER_RENAMES_BUDGET = 50
+MEMBERCOUNTER_CONCURRENCY = 5
+
 
 class ServerConfig(commands.Cog):
     "Commands and events related to the bot configuration on a server"
     def __init__(self, bot: Axobot):
         self.bot = bot
         self.file = "serverconfig"
-        self.cache = TTLCache[tuple[int, str], Any](maxsize=10_000, ttl=60) # 1min cache
+        # converted config values of each loaded guild, filled with defaults on demand
+        self.cache: dict[int, dict[str, Any]] = {}
+        # raw config values of each loaded guild, as stored in the database
+        self.raw_cache: dict[int, dict[str, str]] = {}
         self.enable_caching = True
+        self._snapshot_loads: dict[int, asyncio.Task[dict[str, str]]] = {}
+        # cache performance counters, reset by BotStats
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.snapshot_loads_count = 0
+        self.snapshot_loads_duration = 0.0
+        # end of the rename cooldown of each recently refreshed membercounter
         self.membercounter_pending: dict[int, int] = {}
+        # guilds whose member count changed since their last membercounter refresh
+        self.membercounter_dirty: set[int] = set()
+        # guilds with a membercounter channel, or None until the first reconciliation
+        self.membercounter_guilds: set[int] | None = None
         self.embed_color = 0x3fb9ef
         self.log_color = 0x1b5fb1
         self.max_members_for_nicknames = 3_000
 
     async def cog_load(self):
         self.update_every_membercounter.start() # pylint: disable=no-member
+        self.reconcile_membercounters.start() # pylint: disable=no-member
 
     async def cog_unload(self):
         self.update_every_membercounter.cancel() # pylint: disable=no-member
+        self.reconcile_membercounters.cancel() # pylint: disable=no-member
 
     async def clear_cache(self):
         self.cache.clear()
+        self.raw_cache.clear()
+        self._snapshot_loads.clear()
+
+    def invalidate_guild_cache(self, guild_id: int):
+        "Forget about the cached config of a guild, to reload it on next access"
+        self.cache.pop(guild_id, None)
+        self.raw_cache.pop(guild_id, None)
+        self._snapshot_loads.pop(guild_id, None)
+
+    async def get_guild_snapshot(self, guild_id: int) -> dict[str, str]:
+        """Get the raw config values of a guild, loading all of them in a single query if needed
+        Only the options stored in the database are included"""
+        if self.enable_caching:
+            if guild_id in self.raw_cache:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        return await self._get_guild_snapshot(guild_id)
+
+    async def _get_guild_snapshot(self, guild_id: int) -> dict[str, str]:
+        "Same as get_guild_snapshot, without updating the cache counters"
+        if not self.enable_caching:
+            return await self.db_get_guild(guild_id) or {}
+        if (snapshot := self.raw_cache.get(guild_id)) is not None:
+            return snapshot
+        if (task := self._snapshot_loads.get(guild_id)) is None:
+            task = asyncio.create_task(self._load_guild_snapshot(guild_id))
+            self._snapshot_loads[guild_id] = task
+        try:
+            snapshot = await asyncio.shield(task)
+        finally:
+            # forget about the task once done, even if it failed, so that the next call tries again
+            is_current_load = self._snapshot_loads.get(guild_id) is task and task.done()
+            if is_current_load:
+                del self._snapshot_loads[guild_id]
+        # only keep it if the guild config has not been edited in the meantime
+        if is_current_load:
+            self.raw_cache[guild_id] = snapshot
+            self.cache[guild_id] = {}
+        return snapshot
+
+    async def _load_guild_snapshot(self, guild_id: int) -> dict[str, str]:
+        "Fetch the raw config values of a guild and measure the loading time"
+        start = time.perf_counter()
+        snapshot = await self.db_get_guild(guild_id) or {}
+        self.snapshot_loads_count += 1
+        self.snapshot_loads_duration += time.perf_counter() - start
+        return snapshot
+
+    async def warm_up_cache(self):
+        "Load the config of every guild in a single query"
+        if not self.enable_caching or not self.bot.database_online:
+            return
+        start = time.perf_counter()
+        snapshots: dict[int, dict[str, str]] = {guild.id: {} for guild in self.bot.guilds}
+        query = "SELECT `guild_id`, `option_name`, `value` FROM `serverconfig` WHERE `beta` = %s"
+        async with self.bot.db_main.read(query, (self.bot.beta,)) as query_results:
+            for row in query_results:
+                if (snapshot := snapshots.get(row["guild_id"])) is not None:
+                    snapshot[row["option_name"]] = row["value"]
+        for guild_id, snapshot in snapshots.items():
+            # don't override any snapshot loaded or edited in the meantime
+            if guild_id not in self.raw_cache and guild_id not in self._snapshot_loads:
+                self.raw_cache[guild_id] = snapshot
+                self.cache[guild_id] = {}
+        self.bot.log.info(
+            "[serverconfig] Config cache warmed up for %s guilds in %.1fs", len(snapshots), time.perf_counter() - start
+        )
 
     async def get_options_list(self):
         return await self.bot.get_options_list()
@@ -50,29 +140,44 @@ class ServerConfig(commands.Cog):
         "Return the value of a server config option without any transformation"
         if option_name not in await self.get_options_list():
             raise ValueError(f"Option {option_name} does not exist")
+        if self.enable_caching and self.bot.database_online:
+            if guild_id in self.raw_cache:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+        return await self._get_raw_option(guild_id, option_name)
+
+    async def _get_raw_option(self, guild_id: int, option_name: str):
+        "Same as get_raw_option, without checking the option name nor updating the cache counters"
         if not self.bot.database_online:
             return await to_raw(option_name, (await self.get_options_list())[option_name]["default"], self.bot)
-        if (value := await self.db_get_value(guild_id, option_name)) is None:
+        if (value := (await self._get_guild_snapshot(guild_id)).get(option_name)) is None:
             value = await to_raw(option_name, (await self.get_options_list())[option_name]["default"], self.bot)
         return value
 
     async def get_option(self, guild: int | discord.Guild, option_name: str):
         "Return the formated value of a server config option"
         guild_id = guild if isinstance(guild, int) else guild.id
-        if self.enable_caching:
-            try:
-                return self.cache[(guild_id, option_name)]
-            except KeyError:
-                pass
+        if self.enable_caching and option_name in (guild_values := self.cache.get(guild_id, {})):
+            self.cache_hits += 1
+            return guild_values[option_name]
         resolved_guild = guild if isinstance(guild, discord.Guild) else self.bot.get_guild(guild_id)
         if resolved_guild is None:
             value = (await self.get_options_list())[option_name]["default"]
         else:
-            if (raw_value := await self.get_raw_option(guild_id, option_name)) is None:
+            if option_name not in await self.get_options_list():
+                raise ValueError(f"Option {option_name} does not exist")
+            if self.enable_caching and self.bot.database_online:
+                # only the conversion is missing if the raw value is cached
+                if guild_id in self.raw_cache:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            if (raw_value := await self._get_raw_option(guild_id, option_name)) is None:
                 return None
             value = await from_raw(option_name, raw_value, resolved_guild, self.bot)
-        if self.enable_caching:
-            self.cache[(guild_id, option_name)] = value
+        if self.enable_caching and (guild_values := self.cache.get(guild_id)) is not None:
+            guild_values[option_name] = value
         return value
 
     async def set_option(self, guild_id: int, option_name: str, value: Any):
@@ -85,7 +190,12 @@ class ServerConfig(commands.Cog):
             raise ValueError(f"Invalid value for option {option_name}: {value}")
         if await self.db_set_value(guild_id, option_name, raw):
             if self.enable_caching:
-                self.cache[(guild_id, option_name)] = value
+                self._snapshot_loads.pop(guild_id, None)
+                if (snapshot := self.raw_cache.get(guild_id)) is not None:
+                    snapshot[option_name] = raw
+                    # the converted value will be computed on next access
+                    self.cache[guild_id].pop(option_name, None)
+            self.bot.dispatch("config_option_change", guild_id, option_name, raw)
             return True
         return False
 
@@ -96,8 +206,12 @@ class ServerConfig(commands.Cog):
         if not self.bot.database_online:
             return False
         if await self.db_delete_option(guild_id, option_name):
-            if self.enable_caching and (guild_id, option_name) in self.cache:
-                self.cache.pop((guild_id, option_name))
+            if self.enable_caching:
+                self._snapshot_loads.pop(guild_id, None)
+                if (snapshot := self.raw_cache.get(guild_id)) is not None:
+                    snapshot.pop(option_name, None)
+                    self.cache[guild_id].pop(option_name, None)
+            self.bot.dispatch("config_option_change", guild_id, option_name, None)
             return True
         return False
 
@@ -106,9 +220,8 @@ class ServerConfig(commands.Cog):
         if not self.bot.database_online:
             return False
         await self.db_delete_guild(guild_id)
-        for option_name in (await self.get_options_list()):
-            if self.enable_caching and (guild_id, option_name) in self.cache:
-                self.cache.pop((guild_id, option_name))
+        self.invalidate_guild_cache(guild_id)
+        self.bot.dispatch("config_option_change", guild_id, None, None)
         return True
 
     async def get_guild_config(self, guild_id: int, with_defaults: bool) -> AnyStrDict:
@@ -170,22 +283,103 @@ class ServerConfig(commands.Cog):
         member_role_ids = {role.id for role in member.roles}
         return any(role in member_role_ids for role in roles_ids)
 
+    # ---- CACHE INVALIDATION ----
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        "Reset the config cache after a (re)connection, and fill it again if enabled"
+        # cached channels and roles objects are replaced by new ones on reconnection
+        await self.clear_cache()
+        if self.bot.config_warmup_enabled:
+            try:
+                await self.warm_up_cache()
+            except Exception as err:
+                self.bot.dispatch("error", err, "While warming up the server config cache")
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        "Drop the converted config values of a guild when it becomes available again, as they may be outdated"
+        self.cache.get(guild.id, {}).clear()
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        "Forget about the config of a guild the bot left"
+        self.invalidate_guild_cache(guild.id)
+        self.membercounter_dirty.discard(guild.id)
+        self.membercounter_pending.pop(guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        "Drop the converted config values of a guild when one of its channels is deleted"
+        self.cache.get(channel.guild.id, {}).clear()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        "Drop the converted config values of a guild when one of its roles is deleted"
+        self.cache.get(role.guild.id, {}).clear()
+
+    @commands.Cog.listener()
+    async def on_guild_emojis_update(self, guild: discord.Guild, _before: Any, _after: Any):
+        "Drop the converted config values of a guild when its emojis are edited"
+        self.cache.get(guild.id, {}).clear()
+
     # ---- MEMBERCOUNTER CHANNELS ----
 
+    def mark_membercounter_dirty(self, guild_id: int):
+        "Schedule a refresh of the membercounter channel of a guild, if it has one"
+        if self.membercounter_guilds is None or guild_id in self.membercounter_guilds:
+            self.membercounter_dirty.add(guild_id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        "Schedule a membercounter refresh when a member joins"
+        self.mark_membercounter_dirty(member.guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        "Schedule a membercounter refresh when a member leaves"
+        self.mark_membercounter_dirty(member.guild.id)
+
+    @commands.Cog.listener()
+    async def on_config_option_change(self, guild_id: int, option_name: str | None, raw_value: str | None):
+        "Keep track of the guilds with a membercounter, and refresh it when its channel or language changes"
+        if option_name not in {None, "membercounter", "language"}:
+            return
+        if self.membercounter_guilds is not None and option_name in {None, "membercounter"}:
+            if raw_value is None:
+                self.membercounter_guilds.discard(guild_id)
+            else:
+                self.membercounter_guilds.add(guild_id)
+        self.membercounter_pending.pop(guild_id, None)
+        self.mark_membercounter_dirty(guild_id)
+
     @tasks.loop(minutes=1)
     async def update_every_membercounter(self):
-        "Update all pending membercounter channels"
+        "Update the membercounter channels of the guilds whose member count changed, once their cooldown is over"
         if not self.bot.database_online:
             return
-        i = 0
         now = time.time()
-        for guild_id in await self.db_get_guilds_with_membercounter():
+        for guild_id, cooldown_end in list(self.membercounter_pending.items()):
+            if cooldown_end < now:
+                del self.membercounter_pending[guild_id]
+        # changes made during the cooldown are coalesced into the next refresh
+        due_guilds = [guild_id for guild_id in self.membercounter_dirty if guild_id not in self.membercounter_pending]
+        # guilds above the budget stay dirty until the next pass
+        due_guilds = due_guilds[:MEMBERCOUNTER_RENAMES_BUDGET]
+        self.membercounter_dirty.difference_update(due_guilds)
+        semaphore = asyncio.Semaphore(MEMBERCOUNTER_CONCURRENCY)
+
+        async def refresh(guild_id: int):
             if (guild := self.bot.get_guild(guild_id)) is None:
-                continue
-            if guild_id in self.membercounter_pending and self.membercounter_pending[guild_id] < now:
-                del self.membercounter_pending[guild.id]
-            if await self.update_memberchannel(guild):
-                i += 1
+                return False
+            async with semaphore:
+                try:
+                    return await self.update_memberchannel(guild)
+                except Exception as err: # pylint: disable=broad-except
+                    self.bot.dispatch("error", err, f"Updating membercounter channel in guild {guild_id}")
+                    return False
+
+        i = sum(await asyncio.gather(*(refresh(guild_id) for guild_id in due_guilds)))
         if i > 0:
             log_text = f"[MEMBERCOUNTER] {i} channels refreshed"
             emb = discord.Embed(description=log_text, color=5011628, timestamp=self.bot.utcnow())
@@ -198,6 +392,26 @@ class ServerConfig(commands.Cog):
         "Error handler for the update_every_membercounter loop"
         self.bot.dispatch("error", error, "Membercounter update loop")
 
+    @tasks.loop(hours=6)
+    async def reconcile_membercounters(self):
+        "Reload the list of guilds with a membercounter, and schedule a refresh of all of them"
+        if not self.bot.database_online:
+            return
+        self.membercounter_guilds = set(await self.db_get_guilds_with_membercounter())
+        self.membercounter_dirty.intersection_update(self.membercounter_guilds)
+        self.membercounter_dirty.update(
+            guild_id for guild_id in self.membercounter_guilds if self.bot.get_guild(guild_id) is not None
+        )
+
+    @reconcile_membercounters.before_loop
+    async def before_reconcile_membercounters(self):
+        await self.bot.wait_until_ready()
+
+    @reconcile_membercounters.error
+    async def reconcile_membercounters_error(self, error: BaseException):
+        "Error handler for the reconcile_membercounters loop"
+        self.bot.dispatch("error", error, "Membercounter reconciliation loop")
+
     async def update_memberchannel(self, guild: discord.Guild):
         "Update a membercounter channel for a specific guild"
         # If we already did an update recently: abort
@@ -219,7 +433,7 @@ class ServerConfig(commands.Cog):
             return False
         try:
             await channel.edit(name=text, reason=await self.bot._(guild.id, "logs.reason.memberchan"))
-            self.membercounter_pending[guild.id] = round(time.time()) + 5*60 # cooldown 5min
+            self.membercounter_pending[guild.id] = round(time.time()) + MEMBERCOUNTER_COOLDOWN
             return True
         except (discord.Forbidden, discord.NotFound):
             pass
@@ -262,17 +476,30 @@ class ServerConfig(commands.Cog):
         async with self.bot.db_main.read(query, (option_name, self.bot.beta)) as query_results:
             for row in query_results:
                 guild_id, raw_value = row["guild_id"], row["value"]
-                if self.enable_caching and (cache_value := self.cache.get((guild_id, option_name), None)):
+                guild_values = self.cache.get(guild_id) if self.enable_caching else None
+                if guild_values is not None and (cache_value := guild_values.get(option_name, None)):
                     result[guild_id] = cache_value
                 elif guild := self.bot.get_guild(guild_id):
                     value = await from_raw(option_name, raw_value, guild, self.bot)
                     if value is None:
                         continue
-                    if self.enable_caching:
-                        self.cache[(guild_id, option_name)] = value
                     result[guild_id] = value
         return result
 
+    async def db_get_raw_values(self, guild_ids: list[int], option_name: str) -> dict[int, str]:
+        "Get the raw value of an option for several guilds in a single query, ignoring unset values"
+        if option_name not in (await self.get_options_list()):
+            raise ValueError(f"Option {option_name} does not exist")
+        if not self.bot.database_online:
+            raise RuntimeError("Database is offline")
+        if not guild_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(guild_ids))
+        query = "SELECT `guild_id`, `value` FROM `serverconfig` WHERE `option_name` = %s AND `beta` = %s "\
+            f"AND `guild_id` IN ({placeholders})"
+        async with self.bot.db_main.read(query, (option_name, self.bot.beta, *guild_ids)) as query_results:
+            return {row["guild_id"]: row["value"] for row in query_results}
+
     async def db_get_guild(self, guild_id: int) -> dict[str, str] | None:
         "Get a guild from the database"
         if not self.bot.database_online:
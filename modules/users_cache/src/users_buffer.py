@@ -0,0 +1,73 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, NamedTuple
+
+from cachetools import TTLCache
+from mysql.connector import DatabaseError
+
+if TYPE_CHECKING:
+    from modules.users_cache.users_cache import UsersCache
+
+
+class UserSnapshot(NamedTuple):
+    "The cached data of a user, as written in the database"
+    user_id: int
+    username: str
+    global_name: str
+    avatar_hash: str | None
+    is_bot: bool
+
+
+class UsersWriteBuffer:
+    """Coalesce users snapshots in memory, and write them to the database in batches
+
+    Only the latest snapshot of each user is kept until the next flush. Once written, a snapshot is not written again
+    before `save_interval` seconds unless it changed, and this throttle map is bounded in size."""
+
+    def __init__(self, cog: "UsersCache", max_pending: int, save_interval: int, max_throttled: int):
+        self.cog = cog
+        self.max_pending = max_pending
+        self.pending: dict[int, UserSnapshot] = {}
+        # last written snapshot of recently saved users
+        self.last_saved: TTLCache[int, UserSnapshot] = TTLCache(maxsize=max_throttled, ttl=save_interval)
+        # number of snapshots received, rows written, flushes and flushes duration since the last stats collection
+        self.buffered_count = 0
+        self.flushed_count = 0
+        self.flushes_count = 0
+        self.flushes_duration = 0.0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def add(self, snapshot: UserSnapshot):
+        "Register a user snapshot, unless it was recently saved, and trigger a flush if too many rows are waiting"
+        if self.last_saved.get(snapshot.user_id) == snapshot:
+            return
+        self.pending[snapshot.user_id] = snapshot
+        self.buffered_count += 1
+        if len(self.pending) >= self.max_pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        "Write every pending snapshot to the database"
+        async with self._flush_lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+            start = time.perf_counter()
+            rows = list(pending.values())
+            # rows that can't be written are dropped, and will be queued again the next time these users are seen
+            try:
+                await self.cog.db_upsert_users(rows)
+            except DatabaseError as err:
+                # 1020: record changed since last read, newer data will be written next time
+                if err.errno != 1020:
+                    self.cog.bot.dispatch("error", err, "When flushing users cache buffer")
+                return
+            except Exception as err: # pylint: disable=broad-except
+                self.cog.bot.dispatch("error", err, "When flushing users cache buffer")
+                return
+            for row in rows:
+                self.last_saved[row.user_id] = row
+            self.flushed_count += len(rows)
+            self.flushes_count += 1
+            self.flushes_duration += time.perf_counter() - start
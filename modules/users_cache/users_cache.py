@@ -1,12 +1,16 @@
+import asyncio
 import time
-from collections import defaultdict
 
 import discord
 from discord.ext import commands, tasks
-from mysql.connector import DatabaseError
 
 from core.bot_classes import Axobot
 
+from .src.users_buffer import UserSnapshot, UsersWriteBuffer
+
+# number of members queued at once when seeding the cache at startup
+SEED_CHUNK_SIZE = 5_000
+
 
 class UsersCache(commands.Cog):
     "Cache usernames and avatars into our database"
@@ -14,35 +18,75 @@ class UsersCache(commands.Cog):
     def __init__(self, bot: Axobot):
         self.bot = bot
         self.file = "users_cache"
-        self.last_save: dict[int, int] = defaultdict(int)
+        # users snapshots waiting to be written, each user being saved at most once every 30min unless they change
+        self.users_buffer = UsersWriteBuffer(self, max_pending=2_000, save_interval=60*30, max_throttled=200_000)
+        self.seeded = False
 
     async def cog_load(self):
         # pylint: disable=no-member
         self.delete_old_cache_loop.start()
+        self.users_flush_loop.start()
 
     async def cog_unload(self):
         # pylint: disable=no-member
         if self.delete_old_cache_loop.is_running():
             self.delete_old_cache_loop.stop()
+        if self.users_flush_loop.is_running():
+            self.users_flush_loop.stop()
+        if self.bot.database_online:
+            await self.users_buffer.flush()
+
+    async def db_upsert_users(self, users: list[UserSnapshot]):
+        "Insert or update several users at once"
+        for i in range(0, len(users), 1000):
+            chunk = users[i:i+1000]
+            query = "INSERT INTO `users_cache` (`user_id`, `username`, `global_name`, `avatar_hash`, `is_bot`, `last_seen`) \
+VALUES " + ", ".join(["(%s, %s, %s, %s, %s, CURRENT_TIMESTAMP())"] * len(chunk)) + " ON DUPLICATE KEY UPDATE \
+`username` = VALUES(`username`), `global_name` = VALUES(`global_name`), `avatar_hash` = VALUES(`avatar_hash`), \
+`is_bot` = VALUES(`is_bot`), `last_seen` = VALUES(`last_seen`);"
+            args = tuple(value for user in chunk for value in user)
+            async with self.bot.db_main.write(query, args):
+                pass
 
     async def register_user(self, user: discord.User | discord.Member):
-        "Register a user into our database"
-        if (user.global_name is None and not user.bot) or time.time() - self.last_save[user.id] < 60*30:
+        "Register a user into our database, in the next batch of users"
+        if user.global_name is None and not user.bot:
             return
-        self.last_save[user.id] = int(time.time())
-        avatar_hash = user.avatar.key if user.avatar else None
-        global_name = user.global_name or user.name
-        query = "INSERT INTO `users_cache` (`user_id`, `username`, `global_name`, `avatar_hash`, `is_bot`, `last_seen`) \
-VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP()) ON DUPLICATE KEY UPDATE `username` = VALUES(`username`), \
-`global_name` = VALUES(`global_name`), `avatar_hash` = VALUES(`avatar_hash`), `is_bot` = VALUES(`is_bot`), \
-`last_seen` = VALUES(`last_seen`);"
-        try:
-            async with self.bot.db_main.write(query, (user.id, user.name, global_name, avatar_hash, user.bot)):
-                pass
-        except DatabaseError as err:
-            if err.errno != 1020:
-                raise err
+        self.users_buffer.add(UserSnapshot(
+            user.id,
+            user.name,
+            user.global_name or user.name,
+            user.avatar.key if user.avatar else None,
+            user.bot,
+        ))
 
+    async def seed_from_members(self):
+        "Register every member the bot can see, by chunks of members"
+        start = time.perf_counter()
+        count = 0
+        for guild in self.bot.guilds:
+            for member in guild.members:
+                # members of several guilds are coalesced by the buffer, then skipped once saved
+                await self.register_user(member)
+                count += 1
+                if count % SEED_CHUNK_SIZE == 0:
+                    await self.users_buffer.flush()
+                    # let other events be handled between chunks
+                    await asyncio.sleep(0)
+        await self.users_buffer.flush()
+        self.bot.log.info(
+            "[users_cache] Cache seeded from %s guild members in %.1fs", count, time.perf_counter() - start
+        )
+
+    @tasks.loop(seconds=5)
+    async def users_flush_loop(self):
+        "Write the buffered users snapshots to the database"
+        if self.bot.database_online:
+            await self.users_buffer.flush()
+
+    @users_flush_loop.error
+    async def on_users_flush_loop_error(self, error: BaseException):
+        self.bot.dispatch("error", error, "Users cache flush loop has stopped")
 
     @tasks.loop(hours=24)
     async def delete_old_cache_loop(self):
@@ -51,6 +95,16 @@ VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP()) ON DUPLICATE KEY UPDATE `userna
         async with self.bot.db_main.write(query):
             pass
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        "Seed the cache with every visible member if enabled"
+        if self.bot.users_cache_seeding_enabled and self.bot.database_online and not self.seeded:
+            self.seeded = True
+            try:
+                await self.seed_from_members()
+            except Exception as err:
+                self.bot.dispatch("error", err, "While seeding the users cache")
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         "Use messages event to update user data"
@@ -31,8 +31,6 @@ class Welcomer(commands.Cog):
         """Main function called when a member joins a server"""
         if not self.bot.database_online:
             return
-        if (serverconfig_cog := self.bot.get_cog("ServerConfig")):
-            await serverconfig_cog.update_memberchannel(member.guild)
         if "MEMBER_VERIFICATION_GATE_ENABLED" not in member.guild.features:
             await self.send_msg(member, "welcome")
             self.bot.loop.create_task(self.give_roles(member))
@@ -59,8 +57,6 @@ class Welcomer(commands.Cog):
         """Fonction principale appelée lorsqu'un membre quitte un serveur"""
         if not self.bot.database_online:
             return
-        if (serverconfig_cog := self.bot.get_cog("ServerConfig")):
-            await serverconfig_cog.update_memberchannel(member.guild)
         if "MEMBER_VERIFICATION_GATE_ENABLED" not in member.guild.features or not member.pending:
             await self.send_msg(member, "leave")
 
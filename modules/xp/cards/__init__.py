@@ -1,3 +1,4 @@
-from .generator import CardGeneration
+from .generator import (CardGeneration, get_card_cache_key, preload_card_assets,
+                        render_card)
 
-__all__ = ["CardGeneration"]
+__all__ = ["CardGeneration", "get_card_cache_key", "preload_card_assets", "render_card"]
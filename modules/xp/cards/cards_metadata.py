@@ -1,5 +1,6 @@
 import json
 import os
+from functools import lru_cache
 from typing import Literal
 
 from .card_types import (CardData, CardMetaData, ColorsData, TextData,
@@ -49,6 +50,13 @@ V3_CARDS = {
 JSON_DATA_FILE = os.path.dirname(__file__) + "/cards_data.json"
 
 
+@lru_cache(maxsize=1)
+def _load_cards_data():
+    "Load the cards metadata and colors once, they must not be edited"
+    with open(JSON_DATA_FILE, "r", encoding="utf8") as file:
+        return json.load(file)
+
+
 def get_card_meta(card_name: str) -> CardMetaData:
     """Return the metadata for the card"""
     if card_name in V1_CARDS:
@@ -57,15 +65,11 @@ def get_card_meta(card_name: str) -> CardMetaData:
         version = "v3"
     else:
         raise ValueError(f"Unknown card type: {card_name}")
-    with open(JSON_DATA_FILE, "r", encoding="utf8") as file:
-        cards_data = json.load(file)
-    return cards_data["meta"][version]
+    return _load_cards_data()["meta"][version]
 
 def get_card_colors(card_name: str) -> ColorsData:
     "Return the colors for the card"
-    with open(JSON_DATA_FILE, "r", encoding="utf8") as file:
-        cards_data = json.load(file)
-    colors = cards_data["colors"]
+    colors = _load_cards_data()["colors"]
     if card_name in colors:
         return colors[card_name]
     return colors["default"]
@@ -1,14 +1,55 @@
+import hashlib
+from io import BytesIO
 from typing import Literal
 
 from PIL import Image, ImageDraw, ImageFont, ImageSequence
 from PIL.GifImagePlugin import GifImageFile
 
-from .cards_metadata import get_card_data
+from core.caching.image_assets import image_assets
+
+from .card_types import CardData
+from .cards_metadata import V1_CARDS, V3_CARDS, get_card_data, get_card_meta
 
 CARD_SIZE = (1021, 340)
 
 Rect = tuple[tuple[int, int], tuple[int, int]]
 
+
+def get_card_model_path(card_name: str):
+    "Get the path of the background image of a card"
+    return "./assets/card-models/" + card_name + ".png"
+
+def get_xp_bar_width(data: CardData):
+    "Get the width of the xp bar, in pixels"
+    min_width = 28
+    bar_pos_1, bar_pos_2 = data["xp_bar_position"]
+    max_width = bar_pos_2[0] - bar_pos_1[0]
+    return max(min_width, round(max_width*data["xp_percent"]))
+
+def get_card_cache_key(card_name: str, translation_map: dict[str, str], username: str, avatar_key: str,
+                       animated: bool, level: int, rank: int | Literal['?'], participants: int,
+                       xp_to_current_level: int, xp_to_next_level: int, total_xp: int):
+    """Get a hash of every input changing the pixels of a card, to reuse an identical card already rendered
+    Only the texts displayed by the card style are used, and the xp progress only through the xp bar width"""
+    data = get_card_data(card_name, translation_map, username,
+                         level, rank, participants, xp_to_current_level, xp_to_next_level, total_xp)
+    visual_inputs = (
+        card_name,
+        avatar_key,
+        animated,
+        sorted((text_key, text["label"]) for text_key, text in data["texts"].items()),
+        get_xp_bar_width(data),
+    )
+    return hashlib.sha256(repr(visual_inputs).encode()).hexdigest()
+
+def preload_card_assets():
+    "Load every card background, and the fonts at their default size, in the current process"
+    card_names = sorted(V1_CARDS | V3_CARDS)
+    image_assets.preload_images([get_card_model_path(card_name) for card_name in card_names], CARD_SIZE)
+    for card_name in card_names:
+        for text_meta in get_card_meta(card_name)["texts"].values():
+            image_assets.get_font("./assets/fonts/" + text_meta["font"], text_meta["font_size"])
+
 class CardGeneration:
     "Generate a card from a card type and a user avatar"
 
@@ -26,7 +67,6 @@ class CardGeneration:
         self.avatar = avatar
         self.data = get_card_data(card_name, translation_map, username,
                                   level, rank, participants, xp_to_current_level, xp_to_next_level, total_xp)
-        self.fonts_cache: dict[tuple[str, int], ImageFont.FreeTypeFont] = {}
         if isinstance(self.avatar, GifImageFile):
             self.skip_second_frames = self.avatar.n_frames > 60 and self.avatar.info["duration"] < 30
             self.result = [
@@ -59,24 +99,14 @@ class CardGeneration:
             self.result.paste(self.avatar, self.data["avatar_position"])
 
     def _find_max_text_size(self, text: str, rect: Rect, font_name: str, font_size: int):
-        while True:
-            if (font_name, font_size) in self.fonts_cache:
-                font = self.fonts_cache[(font_name, font_size)]
-            else:
-                try:
-                    font = ImageFont.truetype(font_name, font_size)
-                except OSError:
-                    raise ValueError(f"Font {font_name} not found") from None
-                self.fonts_cache[(font_name, font_size)] = font
-            # Measure the size of the text when rendered with the current font
+        "Find the biggest font, up to font_size, with which the text fits within the rectangle"
+        def measure(font: ImageFont.FreeTypeFont):
             text_box = font.getbbox(text)
-            text_width, text_height = text_box[2] - text_box[0], text_box[3] - text_box[1]
-            # If the text fits within the rectangle, we're done
-            if text_width <= (rect[1][0] - rect[0][0]) and text_height <= (rect[1][1] - rect[0][1]):
-                break
-            # Otherwise, reduce the font size and try again
-            font_size = round(font_size*0.8)
-        return font, font_size
+            return text_box[2] - text_box[0], text_box[3] - text_box[1]
+
+        box_size = (rect[1][0] - rect[0][0], rect[1][1] - rect[0][1])
+        font = image_assets.fit_font(font_name, font_size, 1, box_size, measure)
+        return font, font.size
 
     def _add_text(self):
         """Add text to the destination image"""
@@ -122,12 +152,10 @@ class CardGeneration:
 
     def _draw_xp_bar(self):
         "Place the xp bar on the card"
-        min_width = 28
         bar_pos_1, bar_pos_2 = self.data["xp_bar_position"]
         bar_x = bar_pos_1[0]
         bar_y = bar_pos_1[1]
-        max_width = bar_pos_2[0] - bar_pos_1[0]
-        width = max(min_width, round(max_width*self.data["xp_percent"]))
+        width = get_xp_bar_width(self.data)
         height = bar_pos_2[1] - bar_pos_1[1]
         radius = min(width, height) // 2
         if isinstance(self.result, list):
@@ -148,7 +176,7 @@ class CardGeneration:
 
     def draw_card(self):
         "Do the magic"
-        background_img = Image.open("./assets/card-models/" + self.data["type"] + ".png").resize(CARD_SIZE)
+        background_img = image_assets.get_image(get_card_model_path(self.data["type"]), CARD_SIZE)
 
         self._paste_avatar()
         if isinstance(self.result, list):
@@ -169,6 +197,25 @@ class CardGeneration:
         multiplier = 2 if self.skip_second_frames else 1
         return [frame.info.get("duration", default_duration) * multiplier for frame in self.result]
 
+def render_card(card_name: str, translation_map: dict[str, str], username: str, avatar: bytes, level: int,
+                rank: int | Literal['?'], participants: int, xp_to_current_level: int, xp_to_next_level: int,
+                total_xp: int) -> bytes:
+    """Generate a card inside a render worker, and encode it
+    The result is an animated GIF if the avatar is a GIF, a PNG otherwise"""
+    with Image.open(BytesIO(avatar)) as avatar_img:
+        generator = CardGeneration(card_name, translation_map, username, avatar_img,
+                                   level, rank, participants, xp_to_current_level, xp_to_next_level, total_xp)
+        generated_card = generator.draw_card()
+        result = BytesIO()
+        if isinstance(generated_card, list):
+            generated_card[0].save(
+                result, format="GIF",
+                save_all=True, append_images=generated_card[1:], duration=generator.get_durations(), loop=0, disposal=2
+            )
+        else:
+            generated_card.save(result, format="PNG")
+    return result.getvalue()
+
 def main():
     "Try it and see"
     try:
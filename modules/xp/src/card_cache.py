@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+class CachedCard(NamedTuple):
+    "A rendered rank card"
+    data: bytes
+    file_ext: str
+
+
+class RankCardCache:
+    """Rendered rank cards kept in memory, indexed by a hash of everything that changes their pixels
+
+    Once the cached cards exceed the bytes budget, the least recently used ones are evicted.
+    Cards bigger than a fraction of the budget (like long animated cards) are not cached, so that a single one can't
+    evict every other card."""
+
+    def __init__(self, max_bytes: int, max_card_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_card_bytes = max_card_bytes
+        self.nbytes = 0
+        self._cards: OrderedDict[str, CachedCard] = OrderedDict()
+        # number of cache hits, misses and evicted cards since the last stats collection
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._cards)
+
+    def get(self, key: str) -> CachedCard | None:
+        "Get a cached card from its visual key, and mark it as recently used"
+        if (card := self._cards.get(key)) is None:
+            self.misses += 1
+            return None
+        self._cards.move_to_end(key)
+        self.hits += 1
+        return card
+
+    def add(self, key: str, card: CachedCard):
+        "Cache a rendered card, evicting the least recently used ones if the budget is exceeded"
+        if len(card.data) > self.max_card_bytes:
+            return
+        if (previous := self._cards.pop(key, None)) is not None:
+            self.nbytes -= len(previous.data)
+        self._cards[key] = card
+        self.nbytes += len(card.data)
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._cards.popitem(last=False)
+            self.nbytes -= len(evicted.data)
+            self.evictions += 1
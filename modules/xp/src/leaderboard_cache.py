@@ -0,0 +1,143 @@
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Iterable, Literal, NamedTuple
+
+from .rank_index import RankIndex
+
+SystemId = int | Literal["global"]
+
+
+class SystemLeaderboard:
+    """Cached xp of every member of one xp system (global or guild)
+
+    Data is stored in parallel integer arrays sorted by user ID, instead of one Python object per member,
+    and users are found by binary search. A RankIndex of the same users is kept in sync."""
+
+    __slots__ = ("_user_ids", "_xp", "_last_xp_time", "index", "last_access")
+
+    def __init__(self, items: Iterable[tuple[int, int, int]] = ()):
+        "Create a leaderboard from (user ID, xp, last xp timestamp) tuples"
+        sorted_items = sorted(items)
+        self._user_ids = array('q', (item[0] for item in sorted_items))
+        self._xp = array('q', (item[1] for item in sorted_items))
+        self._last_xp_time = array('q', (item[2] for item in sorted_items))
+        self.index = RankIndex((item[0], item[1]) for item in sorted_items)
+        self.last_access = time.monotonic()
+
+    def __len__(self):
+        return len(self._user_ids)
+
+    def __contains__(self, user_id: int):
+        return self._slot(user_id) is not None
+
+    @property
+    def nbytes(self) -> int:
+        "Memory used by the leaderboard columns and its rank index, in bytes"
+        return len(self._user_ids) * 8 * 3 + self.index.nbytes
+
+    def _slot(self, user_id: int) -> int | None:
+        "Get the position of a user in the columns, or None if they are not cached"
+        slot = bisect_left(self._user_ids, user_id)
+        if slot < len(self._user_ids) and self._user_ids[slot] == user_id:
+            return slot
+        return None
+
+    def get_xp(self, user_id: int) -> int | None:
+        "Get the cached xp of a user"
+        if (slot := self._slot(user_id)) is None:
+            return None
+        return self._xp[slot]
+
+    def get_last_xp_time(self, user_id: int) -> int | None:
+        "Get the timestamp of the last xp gain of a user"
+        if (slot := self._slot(user_id)) is None:
+            return None
+        return self._last_xp_time[slot]
+
+    def set(self, user_id: int, xp: int, timestamp: int | None = None) -> int | None:
+        """Set the xp of a user, and optionally their last xp gain timestamp
+        Returns the previously cached xp of the user, if any"""
+        slot = bisect_left(self._user_ids, user_id)
+        if slot < len(self._user_ids) and self._user_ids[slot] == user_id:
+            previous_xp = self._xp[slot]
+            self._xp[slot] = xp
+            if timestamp is not None:
+                self._last_xp_time[slot] = timestamp
+        else:
+            previous_xp = None
+            self._user_ids.insert(slot, user_id)
+            self._xp.insert(slot, xp)
+            self._last_xp_time.insert(slot, round(time.time()) - 60 if timestamp is None else timestamp)
+        self.index.move(user_id, previous_xp, xp)
+        return previous_xp
+
+    def items(self) -> Iterable[tuple[int, int]]:
+        "Iterate over the (user ID, xp) pairs of the leaderboard"
+        return zip(self._user_ids, self._xp)
+
+
+class LeaderboardCacheStats(NamedTuple):
+    "Memory usage of the leaderboard cache"
+    systems: int
+    members: int
+    nbytes: int
+
+
+class LeaderboardCache:
+    """Leaderboards of every loaded xp system
+
+    The global leaderboard is always kept, while guild leaderboards are evicted once unused for too long,
+    or when too many of them are loaded (least recently used first)."""
+
+    def __init__(self, max_guilds: int, idle_timeout: int):
+        self.max_guilds = max_guilds
+        self.idle_timeout = idle_timeout
+        self.global_leaderboard = SystemLeaderboard()
+        self._guilds: OrderedDict[int, SystemLeaderboard] = OrderedDict()
+
+    def __contains__(self, system_id: SystemId):
+        return system_id == "global" or system_id in self._guilds
+
+    def get(self, system_id: SystemId) -> SystemLeaderboard | None:
+        "Get a loaded leaderboard, and mark it as recently used"
+        if system_id == "global":
+            return self.global_leaderboard
+        if (leaderboard := self._guilds.get(system_id)) is not None:
+            self._guilds.move_to_end(system_id)
+            leaderboard.last_access = time.monotonic()
+        return leaderboard
+
+    def load(self, system_id: SystemId, items: Iterable[tuple[int, int, int]]) -> SystemLeaderboard:
+        "Replace a leaderboard with the given (user ID, xp, last xp timestamp) tuples"
+        leaderboard = SystemLeaderboard(items)
+        if system_id == "global":
+            self.global_leaderboard = leaderboard
+            return leaderboard
+        self._guilds[system_id] = leaderboard
+        self._guilds.move_to_end(system_id)
+        while len(self._guilds) > self.max_guilds:
+            self._guilds.popitem(last=False)
+        return leaderboard
+
+    def drop(self, system_id: int):
+        "Forget about a guild leaderboard, to reload it later"
+        self._guilds.pop(system_id, None)
+
+    def evict_idle(self) -> int:
+        "Remove the guild leaderboards unused since the idle timeout, and return how many were removed"
+        limit = time.monotonic() - self.idle_timeout
+        expired = [guild_id for guild_id, leaderboard in self._guilds.items() if leaderboard.last_access < limit]
+        for guild_id in expired:
+            del self._guilds[guild_id]
+        return len(expired)
+
+    def get_stats(self) -> LeaderboardCacheStats:
+        "Get the number of cached leaderboards and members, and their memory usage"
+        leaderboards = [self.global_leaderboard, *self._guilds.values()]
+        return LeaderboardCacheStats(
+            systems=len(leaderboards),
+            members=sum(len(leaderboard) for leaderboard in leaderboards),
+            nbytes=sum(leaderboard.nbytes for leaderboard in leaderboards),
+        )
@@ -0,0 +1,84 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import neg
+from typing import Iterable
+
+
+class RankIndex:
+    """Sorted index of users by xp, used to answer rank and leaderboard queries without scanning every user
+
+    Users are stored in two parallel arrays sorted by descending xp then descending user ID, so that the position of
+    a user is found by binary search. The index does not know the xp of each user by itself: callers must provide it,
+    usually from a LeaderboardCache."""
+
+    __slots__ = ("_xp", "_user_ids")
+
+    def __init__(self, items: Iterable[tuple[int, int]] = ()):
+        sorted_items = sorted(
+            ((user_id, xp) for user_id, xp in items if xp > 0),
+            key=lambda item: (item[1], item[0]),
+            reverse=True
+        )
+        self._xp = array('q', (xp for _, xp in sorted_items))
+        self._user_ids = array('q', (user_id for user_id, _ in sorted_items))
+
+    def __len__(self):
+        return len(self._user_ids)
+
+    @property
+    def nbytes(self) -> int:
+        "Memory used by the index columns, in bytes"
+        return (len(self._xp) + len(self._user_ids)) * 8
+
+    def copy(self) -> "RankIndex":
+        "Get an independent copy of the index, which won't follow the later changes"
+        index = RankIndex()
+        index._xp = array('q', self._xp) # pylint: disable=protected-access
+        index._user_ids = array('q', self._user_ids) # pylint: disable=protected-access
+        return index
+
+    def _position(self, user_id: int, xp: int) -> int:
+        "Get the position where a (user, xp) pair is or would be in the index"
+        # xp and user IDs are sorted in descending order, so we search for their opposite
+        low = bisect_left(self._xp, -xp, key=neg)
+        high = bisect_right(self._xp, -xp, low, key=neg)
+        return bisect_left(self._user_ids, -user_id, low, high, key=neg)
+
+    def contains(self, user_id: int, xp: int) -> bool:
+        "Check if a user is indexed with the given xp"
+        position = self._position(user_id, xp)
+        return position < len(self._user_ids) and self._user_ids[position] == user_id and self._xp[position] == xp
+
+    def add(self, user_id: int, xp: int):
+        "Add a user to the index, ignored if its xp is not positive"
+        if xp <= 0:
+            return
+        position = self._position(user_id, xp)
+        self._xp.insert(position, xp)
+        self._user_ids.insert(position, user_id)
+
+    def remove(self, user_id: int, xp: int):
+        "Remove a user from the index, given its currently indexed xp"
+        if self.contains(user_id, xp):
+            position = self._position(user_id, xp)
+            del self._xp[position]
+            del self._user_ids[position]
+
+    def move(self, user_id: int, previous_xp: int | None, xp: int):
+        "Update the xp of a user, given its previously indexed xp (or None if it was not indexed)"
+        if previous_xp == xp:
+            return
+        if previous_xp is not None:
+            self.remove(user_id, previous_xp)
+        self.add(user_id, xp)
+
+    def rank_of(self, user_id: int, xp: int) -> int | None:
+        "Get the 1-based rank of a user given its xp, or None if they are not indexed"
+        if not self.contains(user_id, xp):
+            return None
+        return self._position(user_id, xp) + 1
+
+    def top(self, offset: int = 0, limit: int | None = None) -> list[tuple[int, int]]:
+        "Get a slice of the leaderboard, as (user ID, xp) pairs sorted by descending xp"
+        end = None if limit is None else offset + limit
+        return list(zip(self._user_ids[offset:end], self._xp[offset:end]))
@@ -10,6 +10,9 @@ from core.bot_classes import Axobot
 from core.paginator import Paginator
 from core.type_utils import UserOrMember
 
+from .leaderboard_cache import SystemLeaderboard
+from .rank_index import RankIndex
+
 if TYPE_CHECKING:
     from modules.xp.xp import XpSystemType
 
@@ -34,16 +37,14 @@ class TopPaginator(Paginator):
             level: int
             xp: int
             xp_label: str
-        class RawData(TypedDict):
-            "Raw data for the leaderboard"
-            xp: int
-            user_id: int
 
         self.guild = guild
         self.scope = scope
         self.page = start_page
-        self.raw_data: list[RawData] = []
-        self.positions: list[Position | None] = []
+        self.leaderboard = SystemLeaderboard()
+        self.index = RankIndex()
+        # map of leaderboard position (0-based) -> displayed data
+        self.positions: dict[int, Position] = {}
         if (xp_cog := client.get_cog("Xp")) is None:
             raise ValueError("Xp cog not found, cannot create TopPaginator")
         self.cog = xp_cog
@@ -78,21 +79,15 @@ class TopPaginator(Paginator):
     @cached(Cache(maxsize=1)) # cache as long as possible, as it should never change for one same Paginator
     async def get_user_rank(self) -> FieldData:
         "Get the embed field content corresponding to the user's rank"
-        pos = [(i+1, pos) for i, pos in enumerate(self.positions) if pos is not None and pos["user_id"] == self.user.id]
         field_name = "__" + await self.client._(self.guild, "xp.top-your") + "__"
-        if len(pos) == 0:
-            # fetch from raw data
-            pos = [(i+1, pos) for i, pos in enumerate(self.raw_data) if pos["user_id"] == self.user.id]
-            if len(pos) == 0:
-                value = await self.client._(self.guild, "xp.1-no-xp")
-            else:
-                rank = pos[0][0]
-                level = await self.cog.calc_level(pos[0][1]["xp"], self.used_system)
-                xp_label = self.convert_average(pos[0][1]["xp"])
-                value = f"**#{rank} |** `lvl {level[0]}` **|** `xp {xp_label}`"
+        xp = self.leaderboard.get_xp(self.user.id)
+        rank = None if xp is None else self.index.rank_of(self.user.id, xp)
+        if rank is None or xp is None:
+            value = await self.client._(self.guild, "xp.1-no-xp")
         else:
-            rank, data = pos[0]
-            value = f"**#{rank} |** `lvl {data['level']}` **|** `xp {data['xp_label']}`"
+            level = await self.cog.calc_level(xp, self.used_system)
+            xp_label = self.convert_average(xp)
+            value = f"**#{rank} |** `lvl {level[0]}` **|** `xp {xp_label}`"
         return {
             "name": field_name,
             "value": value,
@@ -108,42 +103,30 @@ class TopPaginator(Paginator):
                 "xp_type"
             ) # pyright: ignore[reportAttributeAccessIssue]
         if self.guild is None or self.used_system == "global":
-            if self.scope == "global":
-                if len(self.cog.leaderboard_cache["global"]) == 0:
-                    await self.cog.db_load_cache(None)
-                self.raw_data = [
-                    {"user_id": user_id, "xp": data[1]}
-                    for user_id, data in self.cog.leaderboard_cache["global"].items()
-                ]
+            self.leaderboard = await self.cog.get_leaderboard("global")
+            if self.scope == "global" or self.guild is None:
+                self.index = self.leaderboard.index
             else:
-                self.raw_data = [
-                    {"user_id": int(row["userID"]), "xp": row["xp"]}
-                    for row in await self.cog.db_get_top(10000, guild=self.guild)
-                ]
-                if len(self.raw_data) == 0:
+                self.index = self.cog.get_guild_members_index(self.guild)
+                if len(self.index) == 0:
                     raise ValueError("No data found for the global leaderboard")
         else:
-            if not self.guild.id in self.cog.leaderboard_cache.keys():
-                await self.cog.db_load_cache(self.guild.id)
-            self.raw_data = [
-                    {"user_id": user_id, "xp": data[1]}
-                    for user_id, data in self.cog.leaderboard_cache[self.guild.id].items()
-                ]
-        self.raw_data.sort(key=lambda x: x["xp"], reverse=True)
-        self.max_page = ceil(len(self.raw_data)/20)
-        self.positions = [None for _ in range(len(self.raw_data))]
+            self.leaderboard = await self.cog.get_leaderboard(self.guild.id)
+            self.index = self.leaderboard.index
+        # work on a snapshot, so that xp changes don't shift users between pages already displayed
+        self.index = self.index.copy()
+        self.max_page = ceil(len(self.index)/20)
 
     async def _load_page(self):
         "Load the user data for the current page"
-        i = (self.page-1)*20
-        for data in self.raw_data[(self.page-1)*20:self.page*20]:
-            if self.positions[i] is not None:
-                i += 1
+        offset = (self.page-1)*20
+        for i, (user_id, user_xp) in enumerate(self.index.top(offset, 20), start=offset):
+            if i in self.positions:
                 continue
-            user = self.client.get_user(data["user_id"])
+            user = self.client.get_user(user_id)
             if user is None:
                 try:
-                    user = await self.client.fetch_user(data["user_id"])
+                    user = await self.client.fetch_user(user_id)
                 except discord.NotFound:
                     user = await self.client._(self.guild, "xp.del-user")
             if isinstance(user, discord.User):
@@ -154,16 +137,15 @@ class TopPaginator(Paginator):
                     user_name = "__" + user_name + "__"
             else:
                 user_name = user
-            level = await self.cog.calc_level(data["xp"], self.used_system)
-            xp = self.convert_average(data["xp"])
+            level = await self.cog.calc_level(user_xp, self.used_system)
+            xp = self.convert_average(user_xp)
             self.positions[i] = {
                 "username": user_name,
-                "user_id": data["user_id"],
+                "user_id": user_id,
                 "level": level[0],
-                "xp": data["xp"],
+                "xp": user_xp,
                 "xp_label": xp
             }
-            i += 1
 
     async def get_page_content(self, interaction: discord.Interaction | None, page: int):
         "Get the content of a page"
@@ -172,9 +154,10 @@ class TopPaginator(Paginator):
         await self._load_page()
         txt = []
         i = (page-1)*20
-        for row in self.positions[(page-1)*20:page*20]:
-            if row is None:
-                raise ValueError("Row data is None, this should not happen")
+        for position in range((page-1)*20, min(page*20, len(self.index))):
+            if (row := self.positions.get(position)) is None:
+                # the leaderboard changed since the page was loaded
+                break
             i += 1
             username = row["username"]
             lvl = row["level"]
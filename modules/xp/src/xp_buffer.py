@@ -0,0 +1,73 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from modules.xp.xp import Xp
+
+# delay after a failed flush before a full buffer can trigger another early flush, in seconds
+FAILED_FLUSH_COOLDOWN = 60
+
+class XpWriteBuffer:
+    """Accumulate XP gains in memory, and write them to the database in batches
+
+    Gains are coalesced per (guild, user) pair, where a guild ID of None means the global table,
+    and flushed as one multi-row upsert per table."""
+
+    def __init__(self, cog: "Xp", max_pending: int):
+        self.cog = cog
+        self.max_pending = max_pending
+        self.pending: dict[tuple[int | None, int], int] = {}
+        # number of XP gains received and rows written since the last stats collection
+        self.buffered_count = 0
+        self.flushed_count = 0
+        # number of flushes started since the buffer creation, to detect reads overlapping a flush
+        self.flushes_started = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+        # monotonic time of the last failed write, as the buffer stays full while the database is down
+        self._last_failure = -FAILED_FLUSH_COOLDOWN
+
+    def add(self, guild_id: int | None, user_id: int, points: int):
+        "Register some XP to add to a user, and trigger a flush if too many rows are waiting"
+        key = (guild_id, user_id)
+        self.pending[key] = self.pending.get(key, 0) + points
+        self.buffered_count += 1
+        if (
+            len(self.pending) >= self.max_pending
+            and (self._flush_task is None or self._flush_task.done())
+            and time.monotonic() - self._last_failure >= FAILED_FLUSH_COOLDOWN
+        ):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    @property
+    def is_flushing(self):
+        "Whether some XP gains are being written to the database, and may be missing from both the buffer and the DB"
+        return self._flush_lock.locked()
+
+    def get_pending(self, guild_id: int | None, user_id: int) -> int:
+        "Get the amount of XP not yet written to the database for a user"
+        return self.pending.get((guild_id, user_id), 0)
+
+    async def flush(self):
+        "Write every pending XP gain to the database"
+        async with self._flush_lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, {}
+            self.flushes_started += 1
+            rows_per_table: dict[int | None, list[tuple[int, int]]] = defaultdict(list)
+            for (guild_id, user_id), points in pending.items():
+                rows_per_table[guild_id].append((user_id, points))
+            for guild_id, rows in rows_per_table.items():
+                try:
+                    await self.cog.db_add_xp_batch(guild_id, rows)
+                except Exception as err: # pylint: disable=broad-except
+                    # keep them for the next flush
+                    for user_id, points in rows:
+                        self.pending[guild_id, user_id] = self.pending.get((guild_id, user_id), 0) + points
+                    self._last_failure = time.monotonic()
+                    self.cog.bot.dispatch("error", err, f"When flushing XP buffer for table {guild_id or 'global'}")
+                else:
+                    self.flushed_count += len(rows)
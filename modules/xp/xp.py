@@ -1,7 +1,6 @@
 import asyncio
 import datetime
 import logging
-import os
 import random
 import re
 import string
@@ -12,11 +11,12 @@ from typing import Any, Literal, Optional
 
 import aiohttp
 import discord
+from cachetools import LRUCache
 from discord import app_commands
 from discord.channel import VocalGuildChannel
 from discord.ext import commands, tasks
 from mysql.connector.errors import ProgrammingError as MySQLProgrammingError
-from PIL import Image, ImageFont
+from PIL import ImageFont
 
 from core.bot_classes import Axobot
 from core.safedict import SafeDict
@@ -28,9 +28,14 @@ from core.type_utils import (AnyStrDict, GuildMessage, UserOrMember,
 from modules.languages.languages import SourceType as TranslationSourceType
 from modules.serverconfig.src.converters import GuildMessageableChannel
 
-from .cards import CardGeneration
+from .cards import get_card_cache_key, preload_card_assets, render_card
+from .src.card_cache import CachedCard, RankCardCache
+from .src.leaderboard_cache import (LeaderboardCache, SystemId,
+                                    SystemLeaderboard)
+from .src.rank_index import RankIndex
 from .src.top_paginator import LeaderboardScope, TopPaginator
 from .src.types import DbRoleReward, DbUserRank, UserVoiceConnection
+from .src.xp_buffer import XpWriteBuffer
 from .src.xp_math import (get_level_from_xp_global, get_level_from_xp_mee6,
                           get_xp_from_level_global, get_xp_from_level_mee6)
 
@@ -44,8 +49,14 @@ class Xp(commands.Cog):
         self.file = "xp"
         self.log = logging.getLogger("bot.xp")
 
-        # map userId -> (last xp timestamp, xp count)
-        self.leaderboard_cache: dict[int | Literal["global"], dict[int, tuple[int, int]]] = {"global": {}}
+        # xp and last xp timestamp of each user, per xp system (guild leaderboards are evicted after 2h without use)
+        self.leaderboard_cache = LeaderboardCache(max_guilds=2000, idle_timeout=2*3600)
+        # global leaderboard restricted to the members of a guild, per guild ID
+        self.guild_members_indexes: LRUCache[int, RankIndex] = LRUCache(maxsize=64)
+        # xp gains waiting to be written to the database
+        self.xp_buffer = XpWriteBuffer(self, max_pending=500)
+        # rendered rank cards, reused while nothing visible on them changes
+        self.cards_cache = RankCardCache(max_bytes=64 * 1024**2, max_card_bytes=4 * 1024**2)
         # set of users suspected of cheating
         self._suspicious_users: set[int] | None = None
         # map of (guildId, userId) -> voice connection data
@@ -91,9 +102,11 @@ class Xp(commands.Cog):
 
     async def cog_load(self):
         # pylint: disable=no-member
+        self.bot.render_pool.register_initializer(preload_card_assets)
         self.voice_xp_loop.start()
         self.xp_decay_loop.start()
-        self.clear_cards_loop.start()
+        self.xp_flush_loop.start()
+        self.cache_eviction_loop.start()
 
     async def cog_unload(self):
         # pylint: disable=no-member
@@ -101,8 +114,12 @@ class Xp(commands.Cog):
             self.voice_xp_loop.stop()
         if self.xp_decay_loop.is_running():
             self.xp_decay_loop.stop()
-        if self.clear_cards_loop.is_running():
-            self.clear_cards_loop.stop()
+        if self.xp_flush_loop.is_running():
+            self.xp_flush_loop.stop()
+        if self.cache_eviction_loop.is_running():
+            self.cache_eviction_loop.stop()
+        if self.bot.database_online:
+            await self.xp_buffer.flush()
 
     async def is_suspicious_user(self, user_id: int) -> bool:
         "Check if a user is suspected of cheating xp"
@@ -133,6 +150,21 @@ class Xp(commands.Cog):
         if self.bot.database_online:
             await self.db_remove_rr_from_role(role.guild.id, role.id)
 
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        """Add the new member to the guild view of the global leaderboard"""
+        if (index := self.guild_members_indexes.get(member.guild.id)) is not None:
+            if (xp := self.leaderboard_cache.global_leaderboard.get_xp(member.id)) is not None:
+                if not index.contains(member.id, xp):
+                    index.add(member.id, xp)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        """Remove the member from the guild view of the global leaderboard"""
+        if (index := self.guild_members_indexes.get(member.guild.id)) is not None:
+            if (xp := self.leaderboard_cache.global_leaderboard.get_xp(member.id)) is not None:
+                index.remove(member.id, xp)
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
         """Register voice activity for potential XP rewards"""
@@ -244,14 +276,13 @@ class Xp(commands.Cog):
 
     async def register_written_xp__global(self, msg: GuildMessage):
         """Global xp type"""
-        if msg.author.id in self.leaderboard_cache["global"]:
-            if time.time() - self.leaderboard_cache["global"][msg.author.id][0] < self.classic_xp_cooldown:
-                return
+        last_xp_time = self.leaderboard_cache.global_leaderboard.get_last_xp_time(msg.author.id)
+        if last_xp_time is not None and time.time() - last_xp_time < self.classic_xp_cooldown:
+            return
         content = msg.clean_content
         if len(content) < self.minimal_size or await self.check_spam(content):
             return
-        if len(self.leaderboard_cache["global"]) == 0:
-            await self.db_load_cache(None)
+        await self.get_leaderboard("global")
         giv_points = await self.calc_xp(msg)
         if giv_points == 0:
             return
@@ -264,11 +295,9 @@ class Xp(commands.Cog):
 
     async def register_written_xp__mee6(self, msg: GuildMessage, rate: float):
         """MEE6-like xp type"""
-        if msg.guild.id not in self.leaderboard_cache:
-            await self.db_load_cache(msg.guild.id)
-        if msg.author.id in self.leaderboard_cache[msg.guild.id]:
-            if time.time() - self.leaderboard_cache[msg.guild.id][msg.author.id][0] < self.mee6_xp_cooldown:
-                return
+        last_xp_time = (await self.get_leaderboard(msg.guild.id)).get_last_xp_time(msg.author.id)
+        if last_xp_time is not None and time.time() - last_xp_time < self.mee6_xp_cooldown:
+            return
         giv_points = round(random.randint(15,25) * rate)
         prev_points = await self.get_member_xp(msg.author, msg.guild.id)
         await self.db_set_xp(msg.author.id, giv_points, "add", msg.guild.id)
@@ -279,11 +308,9 @@ class Xp(commands.Cog):
 
     async def register_written_xp__local(self, msg: GuildMessage, rate: float):
         """Local xp type"""
-        if msg.guild.id not in self.leaderboard_cache:
-            await self.db_load_cache(msg.guild.id)
-        if msg.author.id in self.leaderboard_cache[msg.guild.id]:
-            if time.time() - self.leaderboard_cache[msg.guild.id][msg.author.id][0] < self.classic_xp_cooldown:
-                return
+        last_xp_time = (await self.get_leaderboard(msg.guild.id)).get_last_xp_time(msg.author.id)
+        if last_xp_time is not None and time.time() - last_xp_time < self.classic_xp_cooldown:
+            return
         content = msg.clean_content
         if len(content) < self.minimal_size or await self.check_spam(content):
             return
@@ -317,10 +344,11 @@ class Xp(commands.Cog):
                     return True
         return False
 
-    async def get_member_xp(self, member: discord.Member, system_id: int | Literal["global"]):
+    async def get_member_xp(self, member: discord.Member, system_id: SystemId):
         "Get the current member XP value from the cache, or fetch from database"
-        if member.id in self.leaderboard_cache.get(system_id, {}):
-            return self.leaderboard_cache[system_id][member.id][1]
+        if (leaderboard := self.leaderboard_cache.get(system_id)) is not None:
+            if (xp := leaderboard.get_xp(member.id)) is not None:
+                return xp
         if system_id == "global":
             return await self.db_get_xp(member.id, None) or 0
         return await self.db_get_xp(member.id, member.guild.id) or 0
@@ -335,13 +363,55 @@ class Xp(commands.Cog):
     ):
         """Update the XP cache, check for new level reached, and if need be send levelup/give role rewards"""
         system_id = "global" if system == "global" else member.guild.id
-        self.leaderboard_cache[system_id][member.id] = (round(time.time()), prev_points+points_to_give)
-        new_lvl, _, _ = await self.calc_level(self.leaderboard_cache[system_id][member.id][1], system)
+        self.set_cached_xp(system_id, member.id, prev_points+points_to_give, round(time.time()), member.guild.id)
+        new_lvl, _, _ = await self.calc_level(prev_points+points_to_give, system)
         ex_lvl, _, _ = await self.calc_level(prev_points, system)
         if 0 < ex_lvl < new_lvl:
             await self.send_levelup(member, channel, new_lvl)
             await self.give_rr(member, new_lvl, await self.db_list_rr(member.guild.id))
 
+    def set_cached_xp(self, system_id: SystemId, user_id: int, xp: int, timestamp: int | None = None,
+                      guild_id: int | None = None):
+        """Update the xp of a user in the leaderboard cache and in the matching rank indexes
+        timestamp is the time of the xp gain, if any, and guild_id the guild where it was earned"""
+        if (leaderboard := self.leaderboard_cache.get(system_id)) is None:
+            # will be loaded from the database when needed
+            return
+        previous_xp = leaderboard.set(user_id, xp, timestamp)
+        if system_id == "global":
+            for members_guild_id, index in self.guild_members_indexes.items():
+                if previous_xp is not None and index.contains(user_id, previous_xp):
+                    index.move(user_id, previous_xp, xp)
+                elif members_guild_id == guild_id:
+                    index.add(user_id, xp)
+                elif not previous_xp and self._is_guild_member(members_guild_id, user_id):
+                    # users without xp yet are in no index, even for the other guilds they belong to
+                    index.add(user_id, xp)
+
+    def _is_guild_member(self, guild_id: int, user_id: int) -> bool:
+        "Check if a user is a cached member of a guild"
+        return (guild := self.bot.get_guild(guild_id)) is not None and guild.get_member(user_id) is not None
+
+    async def get_leaderboard(self, system_id: SystemId) -> SystemLeaderboard:
+        "Get the cached leaderboard of an xp system, loading it from the database if needed"
+        leaderboard = self.leaderboard_cache.get(system_id)
+        if leaderboard is None or (system_id == "global" and len(leaderboard) == 0):
+            leaderboard = await self.db_load_cache(None if system_id == "global" else system_id)
+        return leaderboard
+
+    def get_guild_members_index(self, guild: discord.Guild) -> RankIndex:
+        """Get the global leaderboard restricted to the members of a guild
+        The global leaderboard is expected to be loaded already"""
+        if (members_index := self.guild_members_indexes.get(guild.id)) is None:
+            global_leaderboard = self.leaderboard_cache.global_leaderboard
+            members_index = RankIndex(
+                (member.id, xp)
+                for member in guild.members
+                if (xp := global_leaderboard.get_xp(member.id)) is not None
+            )
+            self.guild_members_indexes[guild.id] = members_index
+        return members_index
+
     async def send_levelup(self, member: discord.Member, channel: discord.abc.GuildChannel | discord.Thread | None, lvl: int):
         """Envoie le message de levelup"""
         if self.bot.zombie_mode:
@@ -512,22 +582,25 @@ class Xp(commands.Cog):
 
 
     async def db_set_xp(self, user_id: int, points: int, action: Literal["add", "set"]="add", guild_id: int | None=None):
-        """Ajoute/reset de l'xp à un utilisateur dans la database"""
+        """Ajoute/reset de l'xp à un utilisateur dans la database
+        Added xp is buffered and written later by the xp flush loop"""
         try:
             if not self.bot.database_online:
                 await self.bot.unload_module("xp")
                 return None
             if points <= 0:
                 return True
+            if action == "add":
+                self.xp_buffer.add(guild_id, user_id, points)
+                return True
+            # make sure no pending gain will be applied after the new value
+            await self.xp_buffer.flush()
             if guild_id is None:
                 db = self.bot.db_main
             else:
                 db = self.bot.db_xp
             table = await self.get_table_name(guild_id)
-            if action == "add":
-                query = f"INSERT INTO `{table}` (`userID`,`xp`) VALUES (%(u)s, %(p)s) ON DUPLICATE KEY UPDATE xp = xp + %(p)s;"
-            else:
-                query = f"INSERT INTO `{table}` (`userID`,`xp`) VALUES (%(u)s, %(p)s) ON DUPLICATE KEY UPDATE xp = %(p)s;"
+            query = f"INSERT INTO `{table}` (`userID`,`xp`) VALUES (%(u)s, %(p)s) ON DUPLICATE KEY UPDATE xp = %(p)s;"
             async with db.write(query, {'p': points, 'u': user_id}):
                 pass
             return True
@@ -535,11 +608,28 @@ class Xp(commands.Cog):
             self.bot.dispatch("error", err)
             return False
 
+    async def db_add_xp_batch(self, guild_id: int | None, rows: list[tuple[int, int]]):
+        "Add xp to several users at once, as (user ID, xp) pairs"
+        if guild_id is None:
+            db = self.bot.db_main
+        else:
+            db = self.bot.db_xp
+        table = await self.get_table_name(guild_id)
+        for i in range(0, len(rows), 1000):
+            chunk = rows[i:i+1000]
+            query = f"INSERT INTO `{table}` (`userID`,`xp`) VALUES " + ", ".join(["(%s, %s)"] * len(chunk)) \
+                + " ON DUPLICATE KEY UPDATE xp = xp + VALUES(xp);"
+            args = tuple(value for row in chunk for value in row)
+            async with db.write(query, args):
+                pass
+
     async def db_remove_user(self, user_id :int, guild_id: int | None=None):
         "Removes a user from the xp table"
         if not self.bot.database_online:
             await self.bot.unload_module("xp")
             return
+        # make sure no pending gain will be applied after the deletion
+        await self.xp_buffer.flush()
         if guild_id is None:
             db = self.bot.db_main
         else:
@@ -560,18 +650,27 @@ class Xp(commands.Cog):
             db = self.bot.db_xp
         table = await self.get_table_name(guild_id, False)
         if table is None:
-            return None
+            return self.xp_buffer.get_pending(guild_id, user_id) or None
+        flushes_started = self.xp_buffer.flushes_started
+        was_flushing = self.xp_buffer.is_flushing
         query = f"SELECT `xp` FROM `{table}` WHERE `userID` = %s AND `banned` = 0"
         async with db.read(query, (user_id,), fetchone=True) as query_result:
-            if query_result:
-                g = "global" if guild_id is None else guild_id
-                if isinstance(g, int) and g not in self.leaderboard_cache:
-                    await self.db_load_cache(g)
-                if user_id in self.leaderboard_cache[g].keys():
-                    self.leaderboard_cache[g][user_id] = (self.leaderboard_cache[g][user_id][0], query_result["xp"])
-                else:
-                    self.leaderboard_cache[g][user_id] = (round(time.time())-60, query_result["xp"])
-        return query_result["xp"] if query_result else None
+            pass
+        pending_xp = self.xp_buffer.get_pending(guild_id, user_id)
+        if not query_result:
+            return pending_xp or None
+        xp = query_result["xp"] + pending_xp
+        g: SystemId = "global" if guild_id is None else guild_id
+        if was_flushing or self.xp_buffer.is_flushing or self.xp_buffer.flushes_started != flushes_started:
+            # gains being flushed may be missing from the read value: never cache it, nor return less than the cache
+            if (leaderboard := self.leaderboard_cache.get(g)) is not None \
+                    and (cached_xp := leaderboard.get_xp(user_id)) is not None:
+                xp = max(xp, cached_xp)
+            return xp
+        if isinstance(g, int) and g not in self.leaderboard_cache:
+            await self.db_load_cache(g)
+        self.set_cached_xp(g, user_id, xp)
+        return xp
 
     async def db_get_users_count(self, guild_id: int | None = None) -> int:
         """Get the number of ranked users in a guild (or in the global database)"""
@@ -589,11 +688,14 @@ class Xp(commands.Cog):
         async with db.read(query, fetchone=True, astuple=True) as query_result:
             return query_result[0]
 
-    async def db_load_cache(self, guild_id: int | None):
+    async def db_load_cache(self, guild_id: int | None) -> SystemLeaderboard:
         "Load the XP cache for a given guild (or the global cache)"
         if not self.bot.database_online:
             await self.bot.unload_module("xp")
-            return
+            return SystemLeaderboard()
+        # make sure the loaded values include every pending gain
+        await self.xp_buffer.flush()
+        system_id: SystemId = "global" if guild_id is None else guild_id
         if guild_id is None:
             self.log.info("Loading XP cache (global)")
             db = self.bot.db_main
@@ -602,56 +704,43 @@ class Xp(commands.Cog):
             self.log.info("Loading XP cache (guild %s)", guild_id)
             table = await self.get_table_name(guild_id, False)
             if table is None:
-                self.leaderboard_cache[guild_id] = {}
-                return
+                return self.leaderboard_cache.load(guild_id, [])
             db = self.bot.db_xp
             query = f"SELECT `userID`,`xp` FROM `{table}` WHERE `banned`=0"
-        async with db.read(query) as rows:
+        async with db.read(query, astuple=True) as rows:
             pass
+        # keep the last xp timestamps of the previous cache, if any
+        previous_leaderboard = self.leaderboard_cache.get(system_id)
+        default_timestamp = round(time.time())-60
+        leaderboard = self.leaderboard_cache.load(system_id, (
+            (
+                user_id,
+                int(xp),
+                (previous_leaderboard and previous_leaderboard.get_last_xp_time(user_id)) or default_timestamp
+            )
+            for user_id, xp in rows
+        ))
         if guild_id is None:
-            self.leaderboard_cache["global"].clear()
-            for row in rows:
-                self.leaderboard_cache["global"][row["userID"]] = (round(time.time())-60, int(row["xp"]))
-        else:
-            if guild_id not in self.leaderboard_cache:
-                self.leaderboard_cache[guild_id] = {}
-            for row in rows:
-                self.leaderboard_cache[guild_id][row["userID"]] = (round(time.time())-60, int(row["xp"]))
+            self.guild_members_indexes.clear()
+        return leaderboard
 
     async def db_get_top(self, limit: int | None = None, guild: discord.Guild | None = None) -> list[AnyStrDict]:
-        "Get the top of the guild (or the global top)"
+        """Get the top of the guild (or the global top)
+        For guilds using the global xp system, only the guild members are included"""
         try:
             if not self.bot.database_online:
                 await self.bot.unload_module("xp")
                 return []
             if guild is not None and await self.bot.get_config(guild.id, "xp_type") != "global":
-                db = self.bot.db_xp
-                table = await self.get_table_name(guild.id, False)
-                query = f"SELECT * FROM `{table}`ORDER BY `xp` DESC"
-            else:
-                db = self.bot.db_main
-                query = f"SELECT * FROM `{self.table}` ORDER BY `xp` DESC"
-            try:
-                async with db.read(query) as rows:
-                    pass
-            except MySQLProgrammingError as err:
-                raise err
-            result: list[dict[str, Any]]
-            if guild is None:
-                result = rows
-                if limit is not None:
-                    result = result[:limit]
+                index = (await self.get_leaderboard(guild.id)).index
             else:
-                result = []
-                ids = [x.id for x in guild.members]
-                i = 0
-                if limit is None:
-                    limit = len(rows)
-                while len(result) < limit and i < len(rows):
-                    if rows[i]["userID"] in ids:
-                        result.append(rows[i])
-                    i += 1
-            return result
+                index = (await self.get_leaderboard("global")).index
+                if guild is not None:
+                    index = self.get_guild_members_index(guild)
+            return [
+                {"userID": user_id, "xp": xp}
+                for user_id, xp in index.top(0, limit)
+            ]
         except Exception as err:
             self.bot.dispatch("error", err)
             return []
@@ -663,37 +752,18 @@ class Xp(commands.Cog):
                 await self.bot.unload_module("xp")
                 return None
             if guild is not None and await self.bot.get_config(guild.id, "xp_type") != "global":
-                db = self.bot.db_xp
-                table = await self.get_table_name(guild.id, False)
-                query = f"SELECT `userID`,`xp`, @curRank := @curRank + 1 AS rank FROM `{table}` p, \
-                    (SELECT @curRank := 0) r WHERE `banned`='0' ORDER BY xp desc;"
+                leaderboard = await self.get_leaderboard(guild.id)
             else:
-                db = self.bot.db_main
-                query = f"SELECT `userID`,`xp`, @curRank := @curRank + 1 AS rank FROM `{self.table}` p, \
-                    (SELECT @curRank := 0) r WHERE `banned`='0' ORDER BY xp desc;"
-            try:
-                async with db.read(query) as rows:
-                    pass
-            except MySQLProgrammingError as err:
-                # if err.errno == 1146:
-                #     return {"rank": 0, "xp": 0}
-                raise err
-            userdata: DbUserRank | None = None
-            i = 0
-            users = set()
-            if guild is not None:
-                users = {x.id for x in guild.members}
-            for row in rows:
-                if (guild is not None and row["userID"] in users) or guild is None:
-                    i += 1
-                if row["userID"]== user_id:
-                    userdata = DbUserRank(
-                        userID=row["userID"],
-                        xp=row["xp"],
-                        rank=round(row["rank"])
-                    )
-                    break
-            return userdata
+                leaderboard = await self.get_leaderboard("global")
+            if (xp := leaderboard.get_xp(user_id)) is None:
+                return None
+            if (rank := leaderboard.index.rank_of(user_id, xp)) is None:
+                return None
+            return DbUserRank(
+                userID=user_id,
+                xp=xp,
+                rank=rank
+            )
         except Exception as err:
             self.bot.dispatch("error", err)
 
@@ -778,8 +848,8 @@ class Xp(commands.Cog):
                         raise ValueError(f"XP decay query returned 'None' row count for guild {guild_id}")
                     users_count += row_count
                     # if xp has been edited, invalidate cache
-                    if row_count > 0 and guild_id in self.leaderboard_cache:
-                        del self.leaderboard_cache[guild_id]
+                    if row_count > 0:
+                        self.leaderboard_cache.drop(guild_id)
                 # remove members with 0xp or less
                 async with self.bot.db_xp.write(cleanup_query.format(table=guild_id), returnrowcount=True) as row_count:
                     self.log.info("xp decay: removed %s members from guild %s", row_count, guild_id)
@@ -803,35 +873,31 @@ class Xp(commands.Cog):
     async def on_xp_decay_loop_error(self, error: BaseException):
         self.bot.dispatch("error", error, "XP decay loop has stopped  <@279568324260528128>")
 
-    @tasks.loop(hours=1)
-    async def clear_cards_loop(self, delete_all: bool=False):
-        """Delete outdated rank cards
-
-        A card is 'outdated' if the user generated another card with more total xp,
-        so we sort the files list by total xp (descending) and keep only the first card of each user"""
-        folder_path = "./assets/cards/"
-        files = os.listdir(folder_path)
-        done: set[str] = set()
-        for f in sorted([f.split('-') for f in files if not f.startswith('.')], key=lambda f: int(f[1]), reverse=True):
-            if delete_all or f[0] in done:
-                os.remove(folder_path + "-".join(f))
-            else:
-                done.add(f[0])
+    @tasks.loop(seconds=10)
+    async def xp_flush_loop(self):
+        "Write the buffered xp gains to the database"
+        if self.bot.database_online:
+            await self.xp_buffer.flush()
 
-    @clear_cards_loop.before_loop
-    async def before_clear_cards_loop(self):
-        await self.bot.wait_until_ready()
+    @xp_flush_loop.error
+    async def on_xp_flush_loop_error(self, error: BaseException):
+        self.bot.dispatch("error", error, "XP flush loop has stopped  <@279568324260528128>")
 
-    @clear_cards_loop.error
-    async def on_clear_cards_loop_error(self, error: BaseException):
-        self.bot.dispatch("error", error, "XP decay loop has stopped  <@279568324260528128>")
+    @tasks.loop(minutes=10)
+    async def cache_eviction_loop(self):
+        "Remove the unused guild leaderboards from the cache"
+        if evicted_count := self.leaderboard_cache.evict_idle():
+            self.log.debug("Evicted %s guild leaderboards from the XP cache", evicted_count)
 
+    @cache_eviction_loop.error
+    async def on_cache_eviction_loop_error(self, error: BaseException):
+        self.bot.dispatch("error", error, "XP cache eviction loop has stopped  <@279568324260528128>")
 
     async def get_image_from_url(self, url: str):
-        "Download an image from an url"
+        "Download an image from an url, as raw bytes"
         async with aiohttp.ClientSession() as session:
             async with session.get(url) as response:
-                return Image.open(BytesIO(await response.read()))
+                return await response.read()
 
 
     @app_commands.command(name="rank")
@@ -915,33 +981,22 @@ class Xp(commands.Cog):
             # if the user has animated cards enabled, we generate a gif card
             static = False
         file_ext = "png" if static else "gif"
-        filepath = f"./assets/cards/{user.id}-{xp}-{style}.{file_ext}"
-        # check if the card has already been generated, and return it if it is the case
-        if os.path.isfile(filepath):
-            return discord.File(filepath)
+        cache_key = get_card_cache_key(
+            style, translation_map, user.display_name, user.display_avatar.key, not static,
+            levels_info[0], rank, ranks_nb, levels_info[2], levels_info[1], xp
+        )
+        # check if an identical card has already been generated, and return it if it is the case
+        if (cached_card := self.cards_cache.get(cache_key)) is not None:
+            return discord.File(BytesIO(cached_card.data), filename=f"{user.id}-{xp}-{rank}.{cached_card.file_ext}")
         self.log.debug("Generating new XP card for user %s (xp=%s - style=%s - static=%s)", user.id, xp, style, static)
         user_avatar = await self.get_image_from_url(user.display_avatar.replace(format=file_ext, size=256).url)
-        card_generator = CardGeneration(
-            card_name=style,
-            translation_map=translation_map,
-            username=user.display_name,
-            avatar=user_avatar,
-            level=levels_info[0],
-            rank=rank,
-            participants=ranks_nb,
-            xp_to_current_level=levels_info[2],
-            xp_to_next_level=levels_info[1],
-            total_xp=xp
+        generated_card = await self.bot.render_pool.submit(
+            "xp_card", render_card,
+            style, translation_map, user.display_name, user_avatar,
+            levels_info[0], rank, ranks_nb, levels_info[2], levels_info[1], xp
         )
-        generated_card = card_generator.draw_card()
-        if isinstance(generated_card, list):
-            generated_card[0].save(
-                filepath,
-                save_all=True, append_images=generated_card[1:], duration=card_generator.get_durations(), loop=0, disposal=2
-            )
-        else:
-            generated_card.save(filepath)
-        card_image = discord.File(filepath, filename=f"{user.id}-{xp}-{rank}.{file_ext}")
+        self.cards_cache.add(cache_key, CachedCard(generated_card, file_ext))
+        card_image = discord.File(BytesIO(generated_card), filename=f"{user.id}-{xp}-{rank}.{file_ext}")
 
         # update our internal stats for the number of cards generated
         if users_cog := self.bot.get_cog("Users"):
@@ -1115,9 +1170,8 @@ class Xp(commands.Cog):
         # confirm success
         await interaction.followup.send(await self.bot._(interaction, "xp.change-xp-ok", user=str(user), xp=xp))
         # update cache
-        if interaction.guild_id not in self.leaderboard_cache:
-            await self.db_load_cache(interaction.guild_id)
-        self.leaderboard_cache[interaction.guild_id][user.id] = (round(time.time()), xp)
+        await self.get_leaderboard(interaction.guild_id)
+        self.set_cached_xp(interaction.guild_id, user.id, xp, round(time.time()))
         # send internal logs of the change
         desc = f"XP of user {user} `{user.id}` edited (from {prev_xp} to {xp}) in server `{interaction.guild_id}`"
         self.log.info(desc)
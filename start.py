@@ -26,7 +26,8 @@ async def main():
     log = setup_logger()
     log.info("Starting bot")
 
-    client = Axobot(case_insensitive=True, status=discord.Status("online"))
+    client = Axobot(case_insensitive=True, status=discord.Status("online"),
+                    max_messages_per_guild=args.max_messages_per_guild)
 
     async def on_ready():
         print("\nBot connected")
@@ -85,6 +86,10 @@ async def main():
         client.rss_enabled = False
     if args.count_open_files:
         client.files_count_enabled = True
+    if args.warm_config_cache:
+        client.config_warmup_enabled = True
+    if args.seed_users_cache:
+        client.users_cache_seeding_enabled = True
 
     client.add_listener(on_ready)
 